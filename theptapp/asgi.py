@@ -3,6 +3,17 @@ ASGI config for mytrainerapp project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is what the web dyno serves (gunicorn with uvicorn workers, see the
+Procfile): the notification push stream (``trainer:notification_stream``)
+and the async views (check_notifications, booking_list, client_detail) run
+on the event loop, so many open tabs polling the badge don't each hold a
+worker thread. That relies on every middleware in settings.MIDDLEWARE
+being async-capable (see trainer/middleware.py); one sync-only entry
+makes Django run the whole chain in a thread again. Locally: ``uvicorn theptapp.asgi:application --reload``.
+
+theptapp/wsgi.py still works; the async views then run one request at a
+time per thread, and the navbar badge falls back to polling.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
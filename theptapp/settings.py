@@ -29,8 +29,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover everything below (trainer/metrics.py)
+    'trainer.metrics.MetricsMiddleware',
+    'trainer.middleware.QueryCountMiddleware',
+    'trainer.middleware.ReadReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise, async-capable so ASGI requests stay on the event loop
+    'trainer.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -41,13 +46,21 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'theptapp.urls'
 WSGI_APPLICATION = 'theptapp.wsgi.application'
+ASGI_APPLICATION = 'theptapp.asgi.application'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compile each template once per process; the dev autoreloader
+            # still clears it when a template file changes
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -61,11 +74,16 @@ TEMPLATES = [
 # ──────────────────────────────
 # DATABASE – BULLETPROOF FOR HEROKU-24
 # ──────────────────────────────
+# The web dyno serves ASGI (Procfile), where each request's queries run on
+# a different thread and persistent connections would pile up unused, so
+# connections are closed at the end of every request
+CONN_MAX_AGE = 0
+
 # Force Postgres on Heroku, SQLite only locally
 if 'DYNO' in os.environ:  # On Heroku dyno
     DATABASES = {
         'default': dj_database_url.config(
-            conn_max_age=600,
+            conn_max_age=CONN_MAX_AGE,
             ssl_require=True
         )
     }
@@ -74,6 +92,43 @@ else:  # Local development
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # A file (not shared in-memory) test DB, so threaded tests wait
+            # on SQLite's busy timeout instead of failing with "table is locked"
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Read replicas: READ_REPLICA_URLS is a comma-separated list of database
+# URLs. GET requests read from them unless the user wrote within the last
+# REPLICA_PIN_SECONDS (trainer/routers.py). Locally, a copy of db.sqlite3
+# stands in for a lagging replica: READ_REPLICA_URLS=sqlite:///replica.sqlite3
+READ_REPLICAS = []
+for number, url in enumerate(filter(None, config('READ_REPLICA_URLS', default='').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = dj_database_url.parse(
+        url.strip(), conn_max_age=CONN_MAX_AGE, ssl_require='DYNO' in os.environ)
+    # Tests run against the primary's test database
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    READ_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['trainer.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = 10
+
+# ──────────────────────────────
+# CACHE – shared Redis when REDIS_URL is set, per-process memory otherwise
+# ──────────────────────────────
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            # Django's backends, counting hits and misses for /metrics
+            'BACKEND': 'trainer.metrics.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'trainer.metrics.LocMemCache',
         }
     }
 
@@ -92,6 +147,30 @@ MEDIA_ROOT = BASE_DIR / 'media'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Outbound messages – sent by `manage.py run_jobs`, never in the request
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='noreply@theptapp.com')
+SMS_BACKEND = config('SMS_BACKEND', default='trainer.sms.ConsoleBackend')
+SMS_FILE_PATH = config('SMS_FILE_PATH', default=str(BASE_DIR / 'sms.log'))
+# Done jobs older than this are removed by `manage.py purge_jobs`
+JOB_RETENTION_DAYS = config('JOB_RETENTION_DAYS', default=14, cast=int)
+# Hours before a confirmed session that `manage.py send_reminders` texts/emails
+REMINDER_WINDOWS = (24, 2)
+# Read notifications older than this are removed by `manage.py purge_notifications`
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+# Events of one type for one recipient within this many minutes share a
+# notification (trainer/digests.py)
+NOTIFICATION_DIGEST_MINUTES = config('NOTIFICATION_DIGEST_MINUTES', default=30, cast=int)
+# Finished sessions older than this move to BookingArchive (`manage.py archive_bookings`)
+BOOKING_ARCHIVE_DAYS = config('BOOKING_ARCHIVE_DAYS', default=180, cast=int)
+# /metrics (trainer/metrics.py): each worker writes its totals under
+# METRICS_DIR every METRICS_FLUSH_SECONDS. Superusers can view it; a scraper
+# sends "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default='')
+METRICS_FLUSH_SECONDS = 5
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # Misc
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LANGUAGE_CODE = 'en-us'
@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
-from trainer.views import CustomLoginView, CustomLogoutView
+from trainer.views import CustomLoginView, CustomLogoutView, metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,4 +11,5 @@ urlpatterns = [
          name='home'),
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', CustomLogoutView.as_view(), name='logout'),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
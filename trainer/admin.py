@@ -1,16 +1,78 @@
 # trainer/admin.py
-from django.contrib import admin
-from .models import Booking, Notification
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Q
+
+from . import bulk, digests
+from .models import (
+    AvailabilityException, Booking, BookingArchive, Job, Notification,
+    TrainerAvailability, WorkingHours,
+)
+from .pagination import EstimatedCountPaginator
+from .phones import normalize_phone
+from .search import search
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = (
-        'client_name', 'client_contact', 'date', 'time',
+        'client_name', 'client_contact', 'trainer', 'date', 'time',
         'status', 'created_at')
-    list_filter = ('status', 'date')
-    search_fields = ('client_name', 'client_contact', 'notes')
+    list_filter = ('status',)
+    list_select_related = ('trainer',)
+    # Drill-down ranges on booking_date_idx instead of a date list_filter
+    date_hierarchy = 'date'
+    search_fields = ('client_name', 'notes')
     readonly_fields = ('created_at',)
+    # One (estimated) count per page, not an exact filtered + total pair
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('confirm_bookings', 'cancel_bookings')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        # A phone number in any format is an exact match on the indexed
+        # E.164 column rather than a text scan
+        phone = normalize_phone(search_term)
+        if phone:
+            return queryset.filter(client_phone=phone), False
+        # Full-text index instead of icontains over search_fields
+        return search(queryset, search_term), False
+
+    @admin.action(description='Confirm selected pending bookings')
+    def confirm_bookings(self, request, queryset):
+        # Only pending -> confirmed, which can't clash with another active booking
+        updated = self._set_status(request, queryset.filter(status='pending'), 'confirmed')
+        self.message_user(request, f"{updated} booking(s) confirmed.", messages.SUCCESS)
+
+    @admin.action(description='Cancel selected bookings')
+    def cancel_bookings(self, request, queryset):
+        updated = self._set_status(
+            request, queryset.filter(status__in=Booking.ACTIVE_STATUSES), 'cancelled')
+        self.message_user(request, f"{updated} booking(s) cancelled.", messages.SUCCESS)
+
+    def _set_status(self, request, queryset, status):
+        with transaction.atomic():
+            # Read before the UPDATE, while the status filter still matches
+            changing = queryset.exclude(status=status).exclude(trainer=request.user)
+            rows = list(changing.order_by('date', 'time').values(*bulk.ROW_FIELDS))
+            updated = bulk.set_status(queryset, status)
+            _tell_trainers(request, 'booking_updated', rows)
+        return updated
+
+    def save_model(self, request, obj, form, change):
+        # Bookings are only announced when someone else touches them
+        if not change:
+            kind = 'booking_created'
+        elif {'status', 'date', 'time'} & set(form.changed_data):
+            kind = 'booking_updated'
+        else:
+            kind = None
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            if kind:
+                _tell_trainers(request, kind, [obj])
 
     def get_queryset(self, request):
         qs = super().get_queryset(request)
@@ -19,13 +81,91 @@ class BookingAdmin(admin.ModelAdmin):
         return qs.none()  # optional: hide from non-staff
 
 
+def _tell_trainers(request, notification_type, bookings):
+    """A digest for each trainer of ``bookings``, except the admin user."""
+    def recipient(booking):
+        trainer_id = booking['trainer_id'] if isinstance(booking, dict) else booking.trainer_id
+        return trainer_id if trainer_id != request.user.pk else None
+    digests.record_bookings(notification_type, bookings, recipient)
+
+
+@admin.register(BookingArchive)
+class BookingArchiveAdmin(admin.ModelAdmin):
+    """Read-only: rows only get here through trainer.archive."""
+    list_display = ('client_name', 'trainer', 'date', 'time', 'status', 'reason', 'archived_at')
+    list_filter = ('reason', 'status')
+    list_select_related = ('trainer',)
+    raw_id_fields = ('trainer', 'client', 'series')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = (
         'recipient', 'notification_type', 'client_name', 
-        'booking_date', 'is_read', 'created_at'
+        'booking_date', 'event_count', 'is_read', 'created_at'
     )
-    list_filter = ('notification_type', 'is_read', 'created_at')
+    list_filter = ('notification_type', 'is_read')
+    list_select_related = ('recipient',)
+    date_hierarchy = 'created_at'
     search_fields = ('recipient__username', 'client_name', 'message')
-    readonly_fields = ('created_at',)
-    list_editable = ('is_read',)
\ No newline at end of file
+    readonly_fields = ('created_at', 'event_count', 'bookings', 'window_start')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Set-based actions rather than list_editable, which saves row by row
+    actions = ('mark_read', 'mark_unread')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        # Full-text index for the text, an exact indexed match for usernames
+        matches = search(queryset, search_term).values('pk')
+        return queryset.filter(
+            Q(pk__in=matches) | Q(recipient__username=search_term.strip())), False
+
+    def save_model(self, request, obj, form, change):
+        # Toggling is_read closes the digest, as bulk.mark_read does
+        if 'is_read' in form.changed_data:
+            obj.window_start = None
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Mark selected notifications as read')
+    def mark_read(self, request, queryset):
+        updated = bulk.mark_read(queryset)
+        self.message_user(request, f"{updated} notification(s) marked as read.", messages.SUCCESS)
+
+    @admin.action(description='Mark selected notifications as unread')
+    def mark_unread(self, request, queryset):
+        updated = bulk.mark_read(queryset, is_read=False)
+        self.message_user(request, f"{updated} notification(s) marked as unread.", messages.SUCCESS)
+
+
+class WorkingHoursInline(admin.TabularInline):
+    model = WorkingHours
+    extra = 1
+
+
+class AvailabilityExceptionInline(admin.TabularInline):
+    model = AvailabilityException
+    extra = 0
+
+
+@admin.register(TrainerAvailability)
+class TrainerAvailabilityAdmin(admin.ModelAdmin):
+    list_display = ('trainer', 'session_minutes')
+    list_select_related = ('trainer',)
+    inlines = (WorkingHoursInline, AvailabilityExceptionInline)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'locked_at', 'last_error')
@@ -0,0 +1,118 @@
+# trainer/archive.py
+"""
+Hot/cold split for bookings.
+
+Every booking used to stay in the live Booking table forever, so the hot
+queries (upcoming sessions, pending badges, the reminder sweep) paid for
+years of history in their indexes. Finished sessions (confirmed or
+cancelled, older than BOOKING_ARCHIVE_DAYS) are moved to BookingArchive
+instead, and bookings deleted through booking_delete are kept there as
+cancelled rather than lost.
+
+archive_bookings() works like the notification purge: small batches walked
+forward by primary key, each copied and deleted in its own short
+transaction. A run that is stopped loses at most the batch in flight, which
+rolls back, and the next run carries on from whatever is left.
+
+Moving a row is not a change to the booking. The live rows are removed with
+an ordinary delete(), so cascades (the booking's Reminder rows) and other
+receivers still run, but inside moving() the trainer's own post_delete
+handler stands aside: BookingStat keeps counting archived sessions (see
+stats.rebuild), and the search index and cached rows are told once per
+batch here.
+"""
+import datetime
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .fragments import forget_row
+from .models import Booking, BookingArchive
+
+DEFAULT_ARCHIVE_DAYS = 180
+ARCHIVE_BATCH_SIZE = 500
+FINISHED_STATUSES = ('confirmed', 'cancelled')
+
+_moving = ContextVar('archive_moving', default=False)
+
+FIELDS = [
+    'id', 'trainer_id', 'client_id', 'client_name', 'client_contact', 'client_phone',
+    'date', 'time', 'notes', 'status', 'created_at', 'updated_at', 'series_id',
+]
+
+
+def cutoff(days=None, today=None):
+    """The date before which finished sessions are archived."""
+    if days is None:
+        days = getattr(settings, 'BOOKING_ARCHIVE_DAYS', DEFAULT_ARCHIVE_DAYS)
+    return (today or timezone.localdate()) - datetime.timedelta(days=days)
+
+
+@contextmanager
+def moving():
+    """Deletes of Booking rows in this block are moves to the archive."""
+    token = _moving.set(True)
+    try:
+        yield
+    finally:
+        _moving.reset(token)
+
+
+def is_moving():
+    return _moving.get()
+
+
+def archivable(before):
+    return Booking.objects.filter(status__in=FINISHED_STATUSES, date__lt=before)
+
+
+def _copy(rows, **overrides):
+    # ignore_conflicts: a row already copied by an earlier run stays as it is
+    BookingArchive.objects.bulk_create(
+        [BookingArchive(**{**row, **overrides}) for row in rows], ignore_conflicts=True)
+
+
+def archive_bookings(before, batch_size=ARCHIVE_BATCH_SIZE, pause=0.0, dry_run=False):
+    """Move finished sessions dated before ``before`` to BookingArchive; returns the count."""
+    candidates = archivable(before).order_by('id').values_list('id', flat=True)
+    moved = 0
+    last_id = 0
+    while True:
+        ids = list(candidates.filter(id__gt=last_id)[:batch_size])
+        if not ids:
+            return moved
+        last_id = ids[-1]
+
+        if dry_run:
+            moved += len(ids)
+            continue
+
+        with transaction.atomic():
+            # Re-read under the lock: a row may have been edited since
+            rows = list(archivable(before).filter(id__in=ids)
+                        .select_for_update().values(*FIELDS))
+            _copy(rows)
+            ids = [row['id'] for row in rows]
+            with moving():
+                deleted = Booking.objects.filter(id__in=ids).delete()[1]
+            moved += deleted.get(Booking._meta.label, 0)
+            search.reindex(Booking, ids)
+        for row in rows:
+            forget_row(row['id'], row['updated_at'])
+        if pause:
+            time.sleep(pause)
+
+
+def keep_deleted(bookings):
+    """Copy ``bookings`` (a queryset about to be deleted) to the archive as cancelled."""
+    _copy(bookings.order_by().values(*FIELDS), status='cancelled', reason='deleted')
+
+
+def history(client):
+    """A client's archived bookings, shaped like the live ones for the tables."""
+    return BookingArchive.objects.filter(client=client).select_related('client')
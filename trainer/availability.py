@@ -0,0 +1,208 @@
+# trainer/availability.py
+"""
+Free-slot search over trainers' working hours.
+
+Each trainer's diary is laid out as a boolean grid of
+(trainer, day, 15-minute slot). Working hours and exceptions switch slots
+open, bookings switch them busy, and a sliding-window sum finds every start
+time where a whole session fits. Everything is loaded in a fixed handful of
+queries and computed with NumPy, so a month across many trainers costs
+about the same as a single day.
+"""
+import datetime
+
+import numpy as np
+from django.utils import timezone
+
+from .models import Booking, TrainerAvailability
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+# Offered start times fall on this grid (e.g. 09:00, 09:30, 10:00)
+START_STEP_MINUTES = 30
+MAX_SEARCH_DAYS = 62
+
+
+def _slot(value):
+    """Slot index for a time (rounded down)."""
+    return (value.hour * 60 + value.minute) // SLOT_MINUTES
+
+
+def _slot_end(value):
+    """Slot index just past a time (rounded up); midnight means end of day."""
+    if value == datetime.time(0):
+        return SLOTS_PER_DAY
+    return -(-(value.hour * 60 + value.minute) // SLOT_MINUTES)
+
+
+def _session_slots(availability):
+    """How many slots one of the trainer's sessions covers."""
+    return -(-availability.session_minutes // SLOT_MINUTES)
+
+
+def _running_totals(grid):
+    """
+    Cumulative sums along the slot axis, with a leading zero.
+
+    ``totals[..., b] - totals[..., a]`` counts the open slots in ``a:b``,
+    so a session of ``n`` slots fits at ``a`` when that equals ``n``.
+    """
+    totals = np.zeros(grid.shape[:-1] + (SLOTS_PER_DAY + 1,), dtype=np.int32)
+    np.cumsum(grid, axis=-1, out=totals[..., 1:])
+    return totals
+
+
+def _weekdays(days):
+    # 1970-01-01 (day 0) was a Thursday, so shift to make Monday 0
+    return (days.astype('int64') + 3) % 7
+
+
+def load_availabilities(trainer_ids):
+    return list(
+        TrainerAvailability.objects
+        .filter(trainer_id__in=trainer_ids)
+        .prefetch_related('hours', 'exceptions')
+    )
+
+
+def open_grid(availabilities, start, end):
+    """
+    Boolean (trainer, day, slot) grid of when each trainer is working.
+
+    Returns the grid and the numpy day axis it was built for.
+    """
+    days = np.arange(
+        np.datetime64(start, 'D'),
+        np.datetime64(end, 'D') + 1,
+    )
+    weekly = np.zeros((len(availabilities), 7, SLOTS_PER_DAY), dtype=bool)
+    for t, availability in enumerate(availabilities):
+        for hours in availability.hours.all():
+            weekly[t, hours.weekday, _slot(hours.start_time):_slot_end(hours.end_time)] = True
+
+    grid = weekly[:, _weekdays(days), :]
+
+    # Exceptions override the weekly pattern; apply time-off after extra hours
+    for t, availability in enumerate(availabilities):
+        exceptions = sorted(
+            (e for e in availability.exceptions.all() if start <= e.date <= end),
+            key=lambda e: e.is_available,
+            reverse=True,
+        )
+        for exception in exceptions:
+            d = (exception.date - start).days
+            first = _slot(exception.start_time) if exception.start_time else 0
+            last = _slot_end(exception.end_time) if exception.end_time else SLOTS_PER_DAY
+            grid[t, d, first:last] = exception.is_available
+
+    return grid, days
+
+
+def busy_grid(availabilities, start, end, exclude_booking=None):
+    """Boolean (trainer, day, slot) grid of time held by active bookings."""
+    n_days = (end - start).days + 1
+    index = {a.trainer_id: t for t, a in enumerate(availabilities)}
+
+    bookings = Booking.objects.filter(
+        trainer_id__in=index,
+        date__range=(start, end),
+        status__in=Booking.ACTIVE_STATUSES,
+    )
+    if exclude_booking is not None:
+        bookings = bookings.exclude(pk=exclude_booking)
+    rows = list(bookings.values_list('trainer_id', 'date', 'time'))
+
+    # Mark +1 where each booking starts and -1 where it ends, then cumsum
+    edges = np.zeros((len(availabilities), n_days, SLOTS_PER_DAY + 1), dtype=np.int32)
+    if rows:
+        trainer_ids, dates, times = zip(*rows)
+        t = np.fromiter((index[i] for i in trainer_ids), dtype=np.intp, count=len(rows))
+        d = (np.array(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.intp)
+        s = np.fromiter((_slot(value) for value in times), dtype=np.intp, count=len(rows))
+        length = np.array([_session_slots(a) for a in availabilities], dtype=np.intp)[t]
+        np.add.at(edges, (t, d, s), 1)
+        np.add.at(edges, (t, d, np.minimum(s + length, SLOTS_PER_DAY)), -1)
+
+    return np.cumsum(edges, axis=2)[:, :, :SLOTS_PER_DAY] > 0
+
+
+def free_slots(trainer_ids, start, end, exclude_booking=None, now=None):
+    """
+    Find every bookable session start for ``trainer_ids`` between two dates.
+
+    Returns ``{trainer_id: {date: [time, ...]}}``. Trainers who haven't set
+    up availability are left out. ``exclude_booking`` ignores one booking's
+    own slot, so editing a booking can offer its current time back.
+    """
+    now = timezone.localtime(now)
+    if end < start or end < now.date():
+        return {}
+    availabilities = load_availabilities(trainer_ids)
+    if not availabilities:
+        return {}
+
+    grid, days = open_grid(availabilities, start, end)
+    grid &= ~busy_grid(availabilities, start, end, exclude_booking)
+
+    # Never offer slots that have already started
+    if start <= now.date():
+        today = (now.date() - start).days
+        grid[:, :today, :] = False
+        grid[:, today, :_slot_end(now.time())] = False
+
+    # Sliding-window sum: a start is free when the whole session fits
+    padded = _running_totals(grid)
+    step = START_STEP_MINUTES // SLOT_MINUTES
+
+    result = {}
+    for t, availability in enumerate(availabilities):
+        length = _session_slots(availability)
+        if not 0 < length <= SLOTS_PER_DAY:
+            continue
+        window = padded[t, :, length:] - padded[t, :, :-length]
+        starts = window == length
+        starts[:, np.arange(starts.shape[1]) % step != 0] = False
+
+        slots = {}
+        for d, s in zip(*np.nonzero(starts)):
+            minutes = int(s) * SLOT_MINUTES
+            slots.setdefault(days[d].item(), []).append(
+                datetime.time(minutes // 60, minutes % 60))
+        result[availability.trainer_id] = slots
+
+    return result
+
+
+def outside_hours(trainer_id, dates, time):
+    """
+    The subset of ``dates`` where a session at ``time`` doesn't fit working hours.
+
+    Checks a whole recurring series against one grid. Trainers without
+    availability set up are treated as always working.
+    """
+    closed = slots_outside_hours(trainer_id, [(date, time) for date in dates])
+    return [date for date, _ in closed]
+
+
+def slots_outside_hours(trainer_id, slots):
+    """
+    The ``(date, time)`` pairs in ``slots`` where a session doesn't fit.
+
+    Every slot the session touches must be open, as free_slots() requires,
+    so a session running past the end of the day's hours is outside them.
+    An off-grid start covers from its slot to the slot its end rounds up to.
+    """
+    availabilities = load_availabilities([trainer_id])
+    if not availabilities or not slots:
+        return []
+    start = min(date for date, _ in slots)
+    grid, _ = open_grid(availabilities, start, max(date for date, _ in slots))
+    totals = _running_totals(grid[0])
+    session = max(availabilities[0].session_minutes, 1)
+    days = np.array([(date - start).days for date, _ in slots], dtype=np.intp)
+    minutes = np.array([time.hour * 60 + time.minute for _, time in slots], dtype=np.intp)
+    first = minutes // SLOT_MINUTES
+    last = -(-(minutes + session) // SLOT_MINUTES)
+    fits = (last <= SLOTS_PER_DAY) & (
+        totals[days, np.minimum(last, SLOTS_PER_DAY)] - totals[days, first] == last - first)
+    return [slot for slot, ok in zip(slots, fits) if not ok]
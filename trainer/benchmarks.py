@@ -0,0 +1,303 @@
+# trainer/benchmarks.py
+"""
+Latency and query-count benchmarks for the busiest views.
+
+For each data size a synthetic studio is seeded with trainer.loadgen, each
+view is requested through Django's test client as a trainer would, and the
+timings are summarised as percentiles. Everything runs inside a transaction
+that is rolled back, against a private in-memory cache, so a run leaves the
+database as it found it and results from different commits are comparable
+(same seed, same data).
+
+Two scenarios time booking_list: as it normally runs, and with the cache
+cleared before every request, so the gap is what the cached table rows
+save (see the benchmark_booking_list command).
+
+run_pollers() instead compares the sync (WSGI) and async (ASGI) request
+paths under many concurrent pollers. The pollers run in other threads and
+can't see an open transaction, so it commits its data and is meant for a
+throwaway test database (see the benchmark_pollers command).
+"""
+import asyncio
+import datetime
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+import django
+import numpy as np
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import loadgen
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+DEFAULT_REPEAT = 30
+PERCENTILES = (50, 90, 95, 99)
+# Bookings per trainer, so bigger sizes mean more trainers as well as more rows
+BOOKINGS_PER_TRAINER = 2500
+COLD_BOOKING_LIST = 'trainer:booking_list (cold cache)'
+
+benchmark_settings = override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                        'LOCATION': 'benchmark'}},
+    SECURE_SSL_REDIRECT=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+
+
+@dataclass
+class Scenario:
+    """One view to time; ``request(studio, i)`` gives (method, url, data)."""
+    name: str
+    request: Callable
+    expected_status: int = 200
+    # Called untimed before each request, with the same arguments
+    before: Callable = None
+
+
+def _clear_cache(studio, i):
+    caches['default'].clear()
+
+
+def _new_booking(studio, i):
+    # A fresh slot after the seeded calendar for every request
+    hours = list(loadgen.HOUR_WEIGHTS)
+    date = datetime.date.today() + datetime.timedelta(
+        days=loadgen.FUTURE_DAYS + 1 + i // len(hours))
+    return 'post', reverse('trainer:booking_create'), {
+        'client': studio.clients[0].pk,
+        'client_contact': '087 123 4567',
+        'date': date.isoformat(),
+        'time': f'{hours[i % len(hours)]:02d}:00',
+        'status': 'confirmed',
+        'notes': 'Benchmark',
+    }
+
+
+SCENARIOS = [
+    Scenario('trainer:booking_list',
+             lambda studio, i: ('get', reverse('trainer:booking_list'), None)),
+    Scenario(COLD_BOOKING_LIST,
+             lambda studio, i: ('get', reverse('trainer:booking_list'), None),
+             before=_clear_cache),
+    Scenario('trainer:check_notifications',
+             lambda studio, i: ('get', reverse('trainer:check_notifications'), None)),
+    # clients[0] is the most regular client, so this is the longest history
+    Scenario('trainer:client_detail',
+             lambda studio, i: ('get', reverse('trainer:client_detail', args=[studio.clients[0].pk]), None)),
+    Scenario('trainer:notifications_list',
+             lambda studio, i: ('get', reverse('trainer:notifications_list'), None)),
+    Scenario('trainer:booking_create', _new_booking, expected_status=302),
+]
+
+
+def summarise(timings):
+    """Latency percentiles (ms) for one scenario."""
+    summary = {f'p{p}': round(float(v), 3)
+               for p, v in zip(PERCENTILES, np.percentile(timings, PERCENTILES))}
+    summary['mean'] = round(float(np.mean(timings)), 3)
+    summary['max'] = round(float(np.max(timings)), 3)
+    return summary
+
+
+def _check_status(scenario, response):
+    if response.status_code != scenario.expected_status:
+        raise RuntimeError(
+            f"{scenario.name} returned {response.status_code}, "
+            f"expected {scenario.expected_status}.")
+
+
+def measure(client, scenario, studio, repeat):
+    """Time ``repeat`` requests after one warm-up; returns a result dict."""
+    timings, queries = [], []
+    for i in range(repeat + 1):
+        method, url, data = scenario.request(studio, i)
+        if scenario.before:
+            scenario.before(studio, i)
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = (time.perf_counter() - started) * 1000
+        _check_status(scenario, response)
+        if i:  # The first request compiles templates and fills caches
+            timings.append(elapsed)
+            queries.append(len(ctx.captured_queries))
+    return {
+        'view': scenario.name,
+        'requests': repeat,
+        'latency_ms': summarise(timings),
+        'queries': {'min': min(queries), 'max': max(queries)},
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def report(label, results, **options):
+    """The JSON document a benchmark command writes: results plus where they came from."""
+    return {
+        'label': label,
+        'commit': _commit(),
+        'created_at': timezone.now().isoformat(),
+        'database': connection.vendor,
+        'django': django.get_version(),
+        'python': sys.version.split()[0],
+        **options,
+        'results': results,
+    }
+
+
+def studio_shape(size):
+    """Seed arguments for a studio with ``size`` bookings and notifications."""
+    return {
+        'trainers': max(1, -(-size // BOOKINGS_PER_TRAINER)),
+        'clients': max(10, size // 50),
+        'bookings': size,
+        'notifications': size,
+    }
+
+
+@benchmark_settings
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, views=None, seed=1, progress=None):
+    """Benchmark every scenario (or those named in ``views``) at each size."""
+    scenarios = [s for s in SCENARIOS if not views or s.name in views]
+    results = []
+    for size in sizes:
+        with transaction.atomic():
+            started = time.perf_counter()
+            studio = loadgen.seed(prefix='bench', seed=seed, **studio_shape(size))
+            if progress:
+                progress(f"size {size}: seeded in {time.perf_counter() - started:.1f}s")
+
+            for scenario in scenarios:
+                client = Client()
+                client.force_login(studio.trainers[0])
+                result = measure(client, scenario, studio, repeat)
+                results.append({'size': size, **result})
+                if progress:
+                    progress(f"size {size}: {scenario.name} p50 "
+                             f"{result['latency_ms']['p50']:.2f} ms, "
+                             f"{result['queries']['max']} queries")
+            transaction.set_rollback(True)
+    return results
+
+
+# -- Concurrent pollers: sync (WSGI) against async (ASGI) --
+
+POLL_VIEWS = ('trainer:check_notifications', 'trainer:booking_list', 'trainer:client_detail')
+DEFAULT_CONCURRENCY = (1, 10, 50)
+DEFAULT_POLLS = 20
+DEFAULT_POLL_SIZE = 10000
+
+
+def _logged_in(client_class, studio, count):
+    # Logging in writes a session, so do it up front on this thread
+    clients = []
+    for i in range(count):
+        client = client_class()
+        client.force_login(studio.trainers[i % len(studio.trainers)])
+        clients.append(client)
+    return clients
+
+
+def _poll_result(mode, scenario, concurrency, timings, elapsed):
+    return {
+        'view': scenario.name,
+        'mode': mode,
+        'concurrency': concurrency,
+        'requests': len(timings),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        'latency_ms': summarise(timings),
+    }
+
+
+def poll_sync(scenario, studio, concurrency, polls):
+    """``concurrency`` threads, each polling ``polls`` times through WSGI."""
+
+    def poller(client):
+        timings = []
+        try:
+            for i in range(polls):
+                method, url, data = scenario.request(studio, i)
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                timings.append((time.perf_counter() - started) * 1000)
+                _check_status(scenario, response)
+        finally:
+            connections.close_all()
+        return timings
+
+    clients = _logged_in(Client, studio, concurrency)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = [t for result in pool.map(poller, clients) for t in result]
+    return _poll_result('sync', scenario, concurrency, timings, time.perf_counter() - started)
+
+
+def poll_async(scenario, studio, concurrency, polls):
+    """``concurrency`` tasks on one event loop, each polling ``polls`` times through ASGI."""
+
+    async def poller(client):
+        timings = []
+        for i in range(polls):
+            method, url, data = scenario.request(studio, i)
+            started = time.perf_counter()
+            response = await getattr(client, method)(url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+            _check_status(scenario, response)
+        return timings
+
+    async def pollers(clients):
+        return await asyncio.gather(*(poller(client) for client in clients))
+
+    clients = _logged_in(AsyncClient, studio, concurrency)
+    started = time.perf_counter()
+    timings = [t for result in asyncio.run(pollers(clients)) for t in result]
+    return _poll_result('async', scenario, concurrency, timings, time.perf_counter() - started)
+
+
+@benchmark_settings
+# Replicas aren't part of the test database
+@override_settings(READ_REPLICAS=[])
+def run_pollers(size=DEFAULT_POLL_SIZE, concurrency=DEFAULT_CONCURRENCY, polls=DEFAULT_POLLS,
+                views=None, seed=1, progress=None):
+    """
+    Sync against async throughput for each poll view at each concurrency.
+
+    Seeds and commits a studio of ``size`` bookings: run it against a test
+    database, never a real one.
+    """
+    scenarios = [s for s in SCENARIOS if s.name in POLL_VIEWS and (not views or s.name in views)]
+    started = time.perf_counter()
+    studio = loadgen.seed(prefix='bench', seed=seed, **studio_shape(size))
+    if progress:
+        progress(f"size {size}: seeded in {time.perf_counter() - started:.1f}s")
+
+    results = []
+    for scenario in scenarios:
+        # Compile the templates before anything is timed
+        measure(*_logged_in(Client, studio, 1), scenario, studio, repeat=1)
+        for count in concurrency:
+            for poll in (poll_sync, poll_async):
+                result = poll(scenario, studio, count, polls)
+                results.append({'size': size, **result})
+                if progress:
+                    progress(f"{scenario.name} {result['mode']} x{count}: "
+                             f"{result['throughput_rps']} req/s, "
+                             f"p95 {result['latency_ms']['p95']:.2f} ms")
+    return results
@@ -0,0 +1,254 @@
+# trainer/booking_io.py
+"""
+Bulk export and import of bookings.
+
+Exports stream rows straight from a server-side cursor
+(``QuerySet.iterator``) so memory stays flat however many bookings there
+are. Imports validate each row with BookingForm's own fields — including
+validate_irish_phone — and insert valid rows with one ``bulk_create`` per
+batch. The trainer gets one "new bookings" digest for the lot.
+"""
+import csv
+import json
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from . import digests, search, stats
+from .availability import slots_outside_hours
+from .forms import BookingForm
+from .models import Booking
+from .notifications import badge_changed_on_commit
+
+EXPORT_FIELDS = [
+    'id', 'trainer', 'client', 'client_name', 'client_contact',
+    'date', 'time', 'status', 'notes', 'created_at',
+]
+IMPORT_FIELDS = ['client', 'client_name', 'client_contact', 'date', 'time', 'status', 'notes']
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
+
+
+class Echo:
+    """File-like object whose write() just hands the line back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one plain dict per booking, reading ``chunk_size`` rows at a time."""
+    rows = queryset.order_by('id').values_list(
+        'id', 'trainer__username', 'client__username', 'client_name',
+        'client_contact', 'date', 'time', 'status', 'notes', 'created_at',
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        record = dict(zip(EXPORT_FIELDS, row))
+        record['date'] = record['date'].isoformat()
+        record['time'] = record['time'].strftime('%H:%M')
+        record['created_at'] = record['created_at'].isoformat()
+        yield record
+
+
+def csv_lines(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for record in export_rows(queryset, chunk_size):
+        yield writer.writerow([
+            '' if record[field] is None else record[field] for field in EXPORT_FIELDS
+        ])
+
+
+def ndjson_lines(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    for record in export_rows(queryset, chunk_size):
+        yield json.dumps(record) + '\n'
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
+
+
+class InvalidRow(str):
+    """Stands in for a line read_rows() couldn't parse; the text says why."""
+
+
+def read_rows(fileobj, fmt):
+    """
+    Yield ``(line_number, row)`` from a CSV or NDJSON file.
+
+    A row is normally a dict. An NDJSON line that isn't JSON comes back as
+    an InvalidRow, and one that isn't an object as whatever it parsed to;
+    BookingImporter reports both as rejected rows.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(fileobj)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(fileobj, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, InvalidRow(f"Not valid JSON: {exc.msg}.")
+
+
+class BookingImporter:
+    """
+    Validate and insert booking rows for one trainer.
+
+    ``run()`` returns ``(created, errors)`` where ``errors`` is a list of
+    ``(line_number, {field: [messages]})`` for every rejected row.
+    """
+
+    def __init__(self, trainer, batch_size=IMPORT_BATCH_SIZE, dry_run=False):
+        self.trainer = trainer
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # One unbound form gives us the exact field validators BookingForm uses
+        self.fields = BookingForm(user=trainer).fields
+        self.created = 0
+        self.errors = []
+
+    def run(self, rows):
+        batch = []
+        for line_number, row in rows:
+            if isinstance(row, InvalidRow):
+                self.errors.append((line_number, {'row': [str(row)]}))
+                continue
+            if not isinstance(row, dict):
+                self.errors.append((line_number, {'row': ["Expected an object of column values."]}))
+                continue
+            batch.append((line_number, row))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+        return self.created, self.errors
+
+    def _clients(self, batch):
+        """Non-staff users named in the batch, by username and email (one query)."""
+        names = {str(row.get('client') or '').strip() for _, row in batch} - {''}
+        if not names:
+            return {}
+        users = User.objects.filter(
+            Q(username__in=names) | Q(email__in=names), is_staff=False)
+        lookup = {}
+        for user in users:
+            lookup[user.username] = user
+            if user.email:
+                lookup.setdefault(user.email, user)
+        return lookup
+
+    def _clean_row(self, row, clients):
+        """Run BookingForm's field validation on one raw row."""
+        cleaned, errors = {}, {}
+        for name in ('date', 'time', 'status', 'notes', 'client_contact'):
+            raw = row.get(name)
+            if name == 'status' and not raw:
+                raw = 'pending'
+            try:
+                cleaned[name] = self.fields[name].clean('' if raw is None else str(raw))
+            except ValidationError as exc:
+                errors[name] = exc.messages
+
+        client_ref = str(row.get('client') or '').strip()
+        client = clients.get(client_ref)
+        if client_ref and client is None:
+            errors['client'] = [f"No client with username or email '{client_ref}'."]
+        client_name = (
+            (client.get_full_name() or client.username) if client
+            else str(row.get('client_name') or '').strip()
+        )
+        if not client_name and not client_ref:
+            errors['client_name'] = ["Give a client or a client_name."]
+
+        cleaned.update(
+            client=client,
+            client_name=client_name[:100],
+            client_contact=cleaned.get('client_contact', '').strip(),
+        )
+        return cleaned, errors
+
+    def _import_batch(self, batch):
+        clients = self._clients(batch)
+        candidates = []
+        for line_number, row in batch:
+            cleaned, errors = self._clean_row(row, clients)
+            if errors:
+                self.errors.append((line_number, errors))
+            else:
+                candidates.append((line_number, cleaned))
+
+        candidates = self._drop_unavailable(candidates)
+        bookings = [
+            (line_number, Booking(trainer=self.trainer, **cleaned))
+            for line_number, cleaned in candidates
+        ]
+        if self.dry_run or not bookings:
+            self.created += len(bookings)
+            return
+
+        try:
+            with transaction.atomic():
+                Booking.objects.bulk_create([booking for _, booking in bookings])
+                search.reindex(Booking, [booking.pk for _, booking in bookings])
+        except IntegrityError:
+            # Someone took a slot since we checked; find the row(s) one by one
+            self._insert_individually(bookings)
+        else:
+            self.created += len(bookings)
+        digests.record_bookings(
+            'booking_created', [b for _, b in bookings if b.pk], lambda b: b.trainer_id)
+        badge_changed_on_commit(*{b.client_id for _, b in bookings})
+        stats.refresh_days(self.trainer.pk, {b.date for _, b in bookings})
+
+    def _drop_unavailable(self, candidates):
+        """Reject rows outside working hours or clashing with an active booking."""
+        active = [
+            (line_number, c) for line_number, c in candidates
+            if c['status'] in Booking.ACTIVE_STATUSES
+        ]
+        slots = [(c['date'], c['time']) for _, c in active]
+        closed = set(slots_outside_hours(self.trainer.pk, slots))
+
+        taken = set()
+        if slots:
+            taken = set(
+                Booking.objects.filter(
+                    trainer=self.trainer,
+                    date__in={date for date, _ in slots},
+                    status__in=Booking.ACTIVE_STATUSES,
+                ).values_list('date', 'time')
+            )
+
+        rejected = set()
+        for line_number, c in active:
+            slot = (c['date'], c['time'])
+            if slot in closed:
+                self.errors.append((line_number, {'time': ["Outside the trainer's working hours."]}))
+            elif slot in taken:
+                self.errors.append((line_number, {'time': ["The trainer already has a booking at this time."]}))
+            else:
+                # Later rows in the same file can't take this slot either
+                taken.add(slot)
+                continue
+            rejected.add(line_number)
+
+        return [(n, c) for n, c in candidates if n not in rejected]
+
+    def _insert_individually(self, bookings):
+        for line_number, booking in bookings:
+            try:
+                with transaction.atomic():
+                    booking.save()
+            except IntegrityError:
+                self.errors.append((line_number, {'time': ["The trainer already has a booking at this time."]}))
+            else:
+                self.created += 1
@@ -0,0 +1,151 @@
+# trainer/bulk.py
+"""
+Set-based booking writes.
+
+Changing many bookings one save() at a time costs a query (and a round of
+signal work) per row. These helpers do it with a single UPDATE instead,
+then do what the post_save receivers would have done for every affected
+row at once: refresh the clients' badges and the trainers' BookingStat
+days. updated_at is bumped so cached rows re-render. Notifications about
+the change go through trainer.digests, one row per recipient.
+"""
+import datetime
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import stats
+from .availability import slots_outside_hours
+from .models import Booking
+from .notifications import badge_changed_on_commit
+
+# What apply() returns for each booking it changed, as it was beforehand
+ROW_FIELDS = (
+    'pk', 'trainer_id', 'client_id', 'client_name', 'client_contact',
+    'client__email', 'date', 'time',
+)
+
+
+class OutsideHours(Exception):
+    """A reschedule would move bookings (``ids``) outside working hours."""
+
+    def __init__(self, ids):
+        super().__init__(f"Outside working hours: {', '.join(map(str, ids))}")
+        self.ids = ids
+
+
+def set_status(bookings, status):
+    """
+    Move ``bookings`` to ``status`` in one UPDATE; returns the rows changed.
+
+    Callers narrow ``bookings`` to the transitions that are allowed, e.g.
+    only pending bookings may be confirmed, so the one-active-booking-per-slot
+    constraint can't be broken by a bulk confirm.
+    """
+    changing = bookings.exclude(status=status).order_by()
+    with transaction.atomic():
+        # What the signals would need, read as sets rather than per row
+        days = defaultdict(set)
+        for trainer_id, date in changing.values_list('trainer_id', 'date').distinct():
+            days[trainer_id].add(date)
+        client_ids = set(changing.values_list('client_id', flat=True).distinct())
+
+        updated = changing.update(status=status, updated_at=timezone.now())
+        for trainer_id, dates in days.items():
+            stats.refresh_days(trainer_id, dates)
+        badge_changed_on_commit(*client_ids)
+    return updated
+
+
+def mark_read(notifications, is_read=True):
+    """Mark ``notifications`` read (or unread) in one UPDATE; returns the count."""
+    changing = notifications.exclude(is_read=is_read).order_by()
+    # Either way the digest is closed (see Notification.window_start): a
+    # read one takes no more events, and one marked unread again must not
+    # clash with the open digest of its window
+    changes = {'is_read': is_read, 'window_start': None}
+    with transaction.atomic():
+        recipients = set(changing.values_list('recipient_id', flat=True).distinct())
+        updated = changing.update(**changes)
+        badge_changed_on_commit(*recipients)
+    return updated
+
+
+def apply(bookings, status=None, shift=datetime.timedelta(0), time=None):
+    """
+    Change every row of ``bookings`` with one UPDATE; returns the old rows.
+
+    Run it inside a transaction: the rows are locked as they are read, so
+    the returned list is exactly what the UPDATE changed. ``shift`` moves
+    the dates, ``time`` sets the start time, ``status`` the status.
+
+    booking_unique_active_slot is checked row by row as the UPDATE goes,
+    not against the final state, so a move onto slots the batch itself is
+    vacating (consecutive days shifted by a day) is done one date at a
+    time, furthest along the move first. Only a real clash then raises
+    IntegrityError.
+    """
+    rows = list(
+        bookings.select_for_update(of=('self',)).order_by().values(*ROW_FIELDS))
+    if not rows:
+        return rows
+
+    changes = {'updated_at': timezone.now()}
+    if status:
+        changes['status'] = status
+    if shift:
+        changes['date'] = F('date') + shift
+    if time:
+        changes['time'] = time
+    if (shift or time) and _lands_on_own_slots(rows, shift, time):
+        by_date = defaultdict(list)
+        for row in rows:
+            by_date[row['date']].append(row['pk'])
+        # Rows on one date never move onto each other's old slots (a zero
+        # shift that does is a real clash), so each date is one UPDATE
+        for date in sorted(by_date, reverse=shift > datetime.timedelta(0)):
+            Booking.objects.filter(pk__in=by_date[date]).update(**changes)
+    else:
+        Booking.objects.filter(pk__in=[row['pk'] for row in rows]).update(**changes)
+
+    days = defaultdict(set)
+    for row in rows:
+        days[row['trainer_id']].update({row['date'], row['date'] + shift})
+    for trainer_id, dates in days.items():
+        stats.refresh_days(trainer_id, dates)
+    badge_changed_on_commit(*{row['client_id'] for row in rows})
+    return rows
+
+
+def _lands_on_own_slots(rows, shift, time):
+    """Whether any row moves onto the old slot of another row in ``rows``."""
+    slots = {(row['trainer_id'], row['date'], row['time']): row['pk'] for row in rows}
+    return any(
+        slots.get((row['trainer_id'], row['date'] + shift, time or row['time']), row['pk'])
+        != row['pk']
+        for row in rows
+    )
+
+
+def reschedule(bookings, shift=datetime.timedelta(0), time=None):
+    """
+    apply() a move, refusing slots outside the trainers' working hours.
+
+    Raises OutsideHours, so the caller's transaction rolls the move back,
+    and IntegrityError when a new slot is already taken.
+    """
+    rows = apply(bookings, shift=shift, time=time)
+    moved = defaultdict(dict)
+    for row in rows:
+        moved[row['trainer_id']][(row['date'] + shift, time or row['time'])] = row['pk']
+    closed = [
+        slots[slot]
+        for trainer_id, slots in moved.items()
+        for slot in slots_outside_hours(trainer_id, list(slots))
+    ]
+    if closed:
+        raise OutsideHours(sorted(closed))
+    return rows
+
@@ -0,0 +1,47 @@
+# trainer/clients.py
+"""
+Client search for the booking form's autocomplete.
+
+Every whitespace-separated term must prefix-match the client's first name,
+last name, username or email, case-insensitively. The 0013 migration
+indexes those columns for exactly this lookup (NOCASE indexes on SQLite,
+pg_trgm GIN indexes on PostgreSQL), and results are capped, so a search
+costs about the same with fifty clients or fifty thousand.
+"""
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 25
+MAX_TERMS = 4
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'username', 'email')
+
+
+def clients():
+    """Everyone a trainer can book: non-staff users."""
+    return User.objects.filter(is_staff=False)
+
+
+def label(user):
+    return user.get_full_name() or user.username
+
+
+def search_clients(query, limit=DEFAULT_LIMIT):
+    """Up to ``limit`` clients matching ``query``, or none for short queries."""
+    terms = query.split()[:MAX_TERMS]
+    if len(''.join(terms)) < MIN_QUERY_LENGTH:
+        return []
+
+    matches = clients()
+    for term in terms:
+        any_field = Q()
+        for field in SEARCH_FIELDS:
+            any_field |= Q(**{f'{field}__istartswith': term})
+        matches = matches.filter(any_field)
+
+    return list(
+        matches.order_by('first_name', 'last_name', 'username')
+        .only('id', 'first_name', 'last_name', 'username', 'email')[:min(limit, MAX_LIMIT)]
+    )
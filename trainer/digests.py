@@ -0,0 +1,136 @@
+# trainer/digests.py
+"""
+Notifications as coalesced digests.
+
+Every notification goes through ``record()``. Instead of a row per event,
+events of one type for one recipient within the same NOTIFICATION_DIGEST_MINUTES
+window are folded into a single unread row: its ``event_count`` goes up,
+the booking joins its ``bookings`` list (the newest MAX_DIGEST_BOOKINGS are
+kept) and the message is rewritten to cover them all. A client cancelling
+twenty sessions, or an import of two hundred, is one row and one badge
+entry for the trainer, so writes grow with recipients, not events.
+
+The unread digest for (recipient, type, window) is unique in the database
+(notification_open_digest), which makes ``record()`` an upsert: update the
+open digest under a row lock, or insert it, and if a concurrent writer
+inserted first, update theirs. Once the trainer has read a digest, later
+events in the same window start a new one.
+"""
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import search
+from .models import Notification
+
+DEFAULT_DIGEST_MINUTES = 30
+MAX_DIGEST_BOOKINGS = 20
+# Distinct client names spelled out in a digest's message
+NAMES_SHOWN = 3
+
+MESSAGES = {
+    # (one event, several events)
+    'booking_cancelled': ("{name} has cancelled their booking", "{count} bookings cancelled"),
+    'booking_created': ("New booking for {name}", "{count} new bookings"),
+    'booking_updated': ("{name}'s booking has changed", "{count} bookings changed"),
+}
+
+
+def window_start(now=None):
+    """The start of the digest window ``now`` falls in."""
+    now = now or timezone.now()
+    minutes = getattr(settings, 'NOTIFICATION_DIGEST_MINUTES', DEFAULT_DIGEST_MINUTES)
+    seconds = int(now.timestamp()) // (minutes * 60) * (minutes * 60)
+    return datetime.datetime.fromtimestamp(seconds, tz=datetime.timezone.utc)
+
+
+def event(booking):
+    """What a digest keeps about one booking: a Booking or a values() row."""
+    get = booking.get if isinstance(booking, dict) else lambda name: getattr(booking, name, None)
+    date, time = get('date'), get('time')
+    return {
+        'id': get('pk') or get('id'),
+        'client_name': get('client_name') or '',
+        'date': date.isoformat() if hasattr(date, 'isoformat') else date,
+        'time': time.isoformat(timespec='minutes') if hasattr(time, 'isoformat') else time,
+    }
+
+
+def _message(notification_type, count, events):
+    one, several = MESSAGES[notification_type]
+    if count == 1:
+        return one.format(name=events[0]['client_name'] or 'Client')
+    names = list(dict.fromkeys(e['client_name'] for e in events if e['client_name']))
+    text = several.format(count=count)
+    if names:
+        shown = ', '.join(names[:NAMES_SHOWN])
+        text += f" ({shown}{' and others' if len(names) > NAMES_SHOWN else ''})"
+    return text
+
+
+def _fill(digest, events, now):
+    """Describe the digest's events, newest last, on ``digest``."""
+    latest = events[-1]
+    digest.bookings = (digest.bookings + events)[-MAX_DIGEST_BOOKINGS:]
+    digest.message = _message(digest.notification_type, digest.event_count, digest.bookings)
+    digest.client_name = latest['client_name']
+    digest.booking_date = latest['date'] and datetime.date.fromisoformat(latest['date'])
+    digest.booking_time = latest['time'] and datetime.time.fromisoformat(latest['time'])
+    digest.created_at = now
+
+
+def record(notification_type, recipient_id, events, now=None):
+    """
+    Fold ``events`` (see event()) into the recipient's open digest; returns it.
+
+    Call inside the transaction making the change, so the notification
+    commits with it.
+    """
+    if notification_type not in MESSAGES:
+        raise ValueError(f"Unknown notification type '{notification_type}'")
+    now = now or timezone.now()
+    key = {
+        'recipient_id': recipient_id,
+        'notification_type': notification_type,
+        'window_start': window_start(now),
+        'is_read': False,
+    }
+    with transaction.atomic():
+        digest = Notification.objects.select_for_update().filter(**key).first()
+        if digest is None:
+            digest = Notification(**key, event_count=len(events))
+            _fill(digest, events, now)
+            try:
+                with transaction.atomic():
+                    digest.save(force_insert=True)
+                return digest
+            except IntegrityError:
+                # Opened by someone else since our SELECT; add to theirs
+                digest = Notification.objects.select_for_update().get(**key)
+        digest.event_count += len(events)
+        _fill(digest, events, now)
+        digest.save(update_fields=[
+            'event_count', 'bookings', 'message', 'client_name',
+            'booking_date', 'booking_time', 'created_at',
+        ])
+        # The message changed; new rows are indexed by the post_save signal
+        search.reindex(Notification, [digest.pk])
+    return digest
+
+
+def record_bookings(notification_type, bookings, recipient):
+    """
+    record() each booking for ``recipient(booking)``: one digest per recipient.
+
+    Bookings whose recipient is None are skipped.
+    """
+    events = defaultdict(list)
+    for booking in bookings:
+        recipient_id = recipient(booking)
+        if recipient_id:
+            events[recipient_id].append(event(booking))
+    return [record(notification_type, recipient_id, found)
+            for recipient_id, found in events.items()]
@@ -0,0 +1,64 @@
+# trainer/events.py
+"""
+In-process pub/sub used to push notification updates to open SSE streams.
+
+Each ASGI worker keeps its own subscriber registry, so a push only reaches
+tabs connected to the same process. Tabs on other workers (or on a plain
+WSGI deployment) still catch up through the check_notifications poll.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+# Only the latest badge snapshot matters, so a slow tab just drops old ones
+QUEUE_SIZE = 5
+
+_subscribers = defaultdict(set)
+_lock = threading.Lock()
+
+
+def subscribe(user_id):
+    """Register the running event loop for pushes to ``user_id``."""
+    subscription = (asyncio.get_running_loop(), asyncio.Queue(QUEUE_SIZE))
+    with _lock:
+        _subscribers[user_id].add(subscription)
+    return subscription
+
+
+def unsubscribe(user_id, subscription):
+    with _lock:
+        subs = _subscribers.get(user_id)
+        if subs is None:
+            return
+        subs.discard(subscription)
+        if not subs:
+            del _subscribers[user_id]
+
+
+def has_subscribers(user_id):
+    with _lock:
+        return bool(_subscribers.get(user_id))
+
+
+def _deliver(queue, payload):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(payload)
+
+
+def publish(user_id, payload):
+    """
+    Fan ``payload`` out to every open stream for ``user_id``.
+
+    Safe to call from sync views running in worker threads: delivery is
+    handed to each subscriber's own event loop.
+    """
+    with _lock:
+        subs = list(_subscribers.get(user_id, ()))
+    for loop, queue in subs:
+        try:
+            loop.call_soon_threadsafe(_deliver, queue, payload)
+        except RuntimeError:
+            # Loop already closed — the stream's finally block will clean up
+            pass
+    return len(subs)
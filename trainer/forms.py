@@ -2,35 +2,77 @@
 from django import forms
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-import re
-from .models import Booking
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.urls import reverse_lazy
+from django.utils import timezone
+from django.utils.html import format_html
+import datetime
+from . import search, stats
+from .availability import outside_hours
+from .clients import MIN_QUERY_LENGTH, clients, label
+from .models import Booking, BookingSeries
+from .notifications import badge_changed_on_commit
+from .phones import normalize_phone
 
 
 def validate_irish_phone(value):
     """Validate Irish phone number format."""
     if not value:  # Allow empty since it's optional
         return
-    
-    # Remove common formatting characters
-    cleaned = re.sub(r'[\s\-().]', '', value)
-    
-    # Irish phone patterns:
-    # +353 followed by 9 digits (country code format)
-    # 0 followed by 9 digits (local format)
-    # 3 or 4 digits followed by variable length
-    irish_patterns = [
-        r'^\+353[0-9]{9}$',  # International format: +353 + 9 digits
-        r'^0[0-9]{9}$',      # Local format: 0 + 9 digits
-        r'^353[0-9]{9}$',    # Alternative international: 353 + 9 digits
-    ]
-    
-    is_valid = any(re.match(pattern, cleaned) for pattern in irish_patterns)
-    if not is_valid:
+
+    # Accepts +353 / 353 / 0 followed by 9 digits, ignoring spaces,
+    # dashes, dots and brackets (patterns are compiled once in phones.py)
+    if not normalize_phone(value):
         raise ValidationError(
             'Please enter a valid Irish phone number. Examples: +353 1 234 5678 or 087 123 4567'
         )
 
 
+SLOT_TAKEN_MESSAGE = "This slot has just been taken. Please pick another time."
+MAX_OCCURRENCES = 52
+
+SCOPE_CHOICES = [
+    ('this', 'Only this session'),
+    ('following', 'This and all following sessions'),
+]
+
+
+class ClientAutocomplete(forms.HiddenInput):
+    """
+    The chosen client's id in a hidden input, picked with a search box.
+
+    Renders only the selected client (if any) instead of an <option> per
+    client; the script in booking_form.html fills in matches from
+    ``trainer:client_search`` as the trainer types.
+    """
+
+    def __init__(self, attrs=None, search_url=reverse_lazy('trainer:client_search')):
+        super().__init__(attrs)
+        self.search_url = search_url
+
+    def selected_label(self, value):
+        if not value:
+            return ''
+        try:
+            user = clients().only('first_name', 'last_name', 'username').get(pk=value)
+        except (User.DoesNotExist, ValueError, TypeError):
+            return ''
+        return label(user)
+
+    def render(self, name, value, attrs=None, renderer=None):
+        hidden = super().render(name, value, attrs, renderer)
+        return format_html(
+            '<div class="client-autocomplete position-relative" data-url="{}" data-min-length="{}">'
+            '{}'
+            '<input type="search" class="form-control" value="{}" autocomplete="off" '
+            'placeholder="Start typing a name or email…" aria-label="Search clients">'
+            '<div class="list-group position-absolute w-100 shadow-sm" style="z-index: 1000;"></div>'
+            '</div>',
+            self.search_url, MIN_QUERY_LENGTH, hidden, self.selected_label(value),
+        )
+
+
 class BookingForm(forms.ModelForm):
     # This is the field that appears in the booking form
     client_contact = forms.CharField(
@@ -47,14 +89,40 @@ class BookingForm(forms.ModelForm):
         help_text="Optional – enter Irish phone number for text reminders (e.g., +353 87 123 4567 or 087 123 4567)",
     )
 
+    # Recurrence — only offered when a trainer creates a booking
+    repeat = forms.ChoiceField(
+        choices=[('', 'Does not repeat')] + BookingSeries.FREQUENCIES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    occurrences = forms.IntegerField(
+        min_value=2,
+        max_value=MAX_OCCURRENCES,
+        required=False,
+        label="Number of sessions",
+        widget=forms.NumberInput(attrs={'class': 'form-control'}),
+    )
+    repeat_until = forms.DateField(
+        required=False,
+        label="Or repeat until",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+
+    # Only offered when editing a booking that belongs to a series
+    scope = forms.ChoiceField(
+        choices=SCOPE_CHOICES,
+        initial='this',
+        required=False,
+        label="Apply changes to",
+        widget=forms.RadioSelect(attrs={'class': 'form-check-input'}),
+    )
+
     class Meta:
         model = Booking
         fields = ['client', 'date', 'time', 'status', 'notes', 'client_contact']
         
         widgets = {
-            'client': forms.Select(attrs={
-                'class': 'form-select'
-            }),
+            'client': ClientAutocomplete(),
             'date': forms.DateInput(attrs={
                 'type': 'date',
                 'class': 'form-control'
@@ -78,10 +146,10 @@ class BookingForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.user = user
 
-        # Only trainers can choose a client
+        # Only trainers can choose a client. The choice is validated with a
+        # single pk lookup; clients are never all loaded (see ClientAutocomplete)
         if user and user.is_staff:
-            self.fields['client'].queryset = User.objects.filter(is_staff=False).order_by('first_name', 'last_name')
-            self.fields['client'].empty_label = "— Select a client —"
+            self.fields['client'].queryset = clients()
             self.fields['client'].required = True
         else:
             # Clients can't pick who they book with — remove the field
@@ -95,6 +163,163 @@ class BookingForm(forms.ModelForm):
         if not (user and user.is_staff):
             self.fields.pop('status', None)
 
+        # Series are created once and then edited through `scope`
+        if self.instance.pk or not (user and user.is_staff):
+            for name in ('repeat', 'occurrences', 'repeat_until'):
+                self.fields.pop(name, None)
+        if not self.instance.series_id:
+            self.fields.pop('scope', None)
+
+    @property
+    def applies_to_following(self):
+        return self.cleaned_data.get('scope') == 'following'
+
+    def _following(self):
+        """The series occurrences from the edited booking onwards, as saved."""
+        return Booking.objects.filter(
+            series_id=self.instance.series_id,
+            date__gte=self.initial.get('date', self.instance.date),
+        )
+
+    def _occurrence_dates(self, date):
+        """Every date this form will write to, given the new ``date``."""
+        if self.applies_to_following:
+            shift = date - self.initial['date']
+            return [d + shift for d in self._following().values_list('date', flat=True)]
+
+        frequency = self.cleaned_data.get('repeat')
+        if not frequency:
+            return [date]
+
+        occurrences = self.cleaned_data.get('occurrences')
+        until = self.cleaned_data.get('repeat_until')
+        if not occurrences and not until:
+            self.add_error('occurrences', "Enter how many sessions, or an end date.")
+            return [date]
+        if until and until <= date:
+            self.add_error('repeat_until', "The end date must be after the first session.")
+            return [date]
+
+        step = datetime.timedelta(days=BookingSeries.INTERVAL_DAYS[frequency])
+        dates = []
+        while len(dates) < (occurrences or MAX_OCCURRENCES) and (not until or date <= until):
+            dates.append(date)
+            date += step
+        return dates
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date = cleaned_data.get('date')
+        time = cleaned_data.get('time')
+        trainer = self.instance.trainer if self.instance.pk else self.user
+        if not (date and time):
+            return cleaned_data
+
+        self.occurrence_dates = dates = self._occurrence_dates(date)
+
+        if self.applies_to_following:
+            interval = BookingSeries.INTERVAL_DAYS[self.instance.series.frequency]
+            shift = (date - self.initial['date']).days
+            if shift and shift % interval == 0:
+                # Would collide with the series' own slots mid-UPDATE
+                self.add_error('date', "To move a series by whole weeks, cancel the following "
+                                       "sessions and create a new series.")
+
+        # Only trainers who've set up availability are held to their hours
+        if trainer and trainer.is_staff:
+            closed = outside_hours(trainer.pk, dates, time)
+            if closed:
+                self.add_error('time', "This time is outside the trainer's working hours on "
+                                       + ", ".join(f"{d:%b %d}" for d in closed) + ".")
+
+        # Friendly early check; the unique constraint is what actually holds
+        status = cleaned_data.get('status', self.instance.status)
+        if trainer and status in Booking.ACTIVE_STATUSES:
+            clashes = Booking.objects.filter(
+                trainer=trainer, date__in=dates, time=time,
+                status__in=Booking.ACTIVE_STATUSES,
+            )
+            if self.applies_to_following:
+                clashes = clashes.exclude(pk__in=self._following())
+            else:
+                clashes = clashes.exclude(pk=self.instance.pk)
+            taken = sorted(clashes.values_list('date', flat=True))
+            if taken:
+                self.add_error('time', "The trainer already has a booking at this time on "
+                                       + ", ".join(f"{d:%b %d}" for d in taken) + ".")
+
+        return cleaned_data
+
+    def save_booking(self, booking):
+        """
+        Save ``booking``, turning a lost race for its slot into a form error.
+
+        Two requests can both pass clean() for the same slot; the database's
+        booking_unique_active_slot constraint lets only one insert win. The
+        loser gets SLOT_TAKEN_MESSAGE on the time field and False back, so
+        the view can re-render the form for another try.
+
+        A repeating booking creates the whole series, and an edit scoped to
+        "this and following" rewrites the later occurrences too — either
+        way in one transaction, so a clash on any date saves nothing.
+        """
+        try:
+            with transaction.atomic():
+                if self.cleaned_data.get('repeat'):
+                    self._create_series(booking)
+                elif self.applies_to_following:
+                    self._update_following(booking)
+                else:
+                    booking.save()
+        except IntegrityError:
+            self.add_error('time', SLOT_TAKEN_MESSAGE)
+            return False
+        return True
+
+    def _create_series(self, booking):
+        """Insert every occurrence in one bulk_create."""
+        booking.series = BookingSeries.objects.create(
+            trainer=booking.trainer,
+            frequency=self.cleaned_data['repeat'],
+        )
+        occurrences = []
+        for date in self.occurrence_dates:
+            occurrence = Booking(**{
+                f.attname: getattr(booking, f.attname)
+                for f in Booking._meta.concrete_fields if not f.primary_key
+            })
+            occurrence.date = date
+            occurrences.append(occurrence)
+        Booking.objects.bulk_create(occurrences)
+        # bulk_create skips the signals that refresh the badge, stats and search
+        badge_changed_on_commit(booking.client_id)
+        search.reindex(Booking, [occurrence.pk for occurrence in occurrences])
+        stats.refresh_days(booking.trainer_id, self.occurrence_dates)
+
+    def _update_following(self, booking):
+        """Apply the edit to this and later occurrences in one UPDATE."""
+        following = self._following()
+        pks, client_ids, dates = [], set(), set()
+        for pk, client_id, date in following.values_list('pk', 'client_id', 'date'):
+            pks.append(pk)
+            client_ids.add(client_id)
+            dates.add(date)
+        shift = booking.date - self.initial['date']
+        following.update(
+            date=F('date') + shift if shift else F('date'),
+            time=booking.time,
+            status=booking.status,
+            notes=booking.notes,
+            client=booking.client,
+            client_name=booking.client_name,
+            client_contact=booking.client_contact,
+            client_phone=normalize_phone(booking.client_contact),
+            updated_at=timezone.now(),
+        )
+        badge_changed_on_commit(booking.client_id, *client_ids)
+        stats.refresh_days(booking.trainer_id, dates | {date + shift for date in dates})
+        search.reindex(Booking, pks)
+
     def save(self, commit=True):
         """Trim and persist contact number alongside default save."""
         instance = super().save(commit=False)
@@ -0,0 +1,36 @@
+# trainer/fragments.py
+"""
+Cached booking rows.
+
+Each row of the booking tables is rendered once per booking version by
+``{% cache %}`` in trainer/booking_row.html, keyed by the booking's pk, its
+``updated_at``, whether the viewer is staff (the action buttons differ) and
+whether it is an archived row (which has none).
+A changed booking gets a new key, so a list render is mostly cache reads.
+The signals drop the superseded fragments straight away instead of leaving
+them to expire.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+
+ROW_FRAGMENT = 'booking_row'
+
+
+def _cache():
+    # The {% cache %} tag prefers a 'template_fragments' cache when configured
+    name = 'template_fragments' if 'template_fragments' in settings.CACHES else 'default'
+    return caches[name]
+
+
+def row_keys(pk, version, archived=False):
+    """Every cache key a booking row can be stored under for one version."""
+    return [
+        make_template_fragment_key(ROW_FRAGMENT, [pk, version, is_staff, archived])
+        for is_staff in (True, False)
+    ]
+
+
+def forget_row(pk, version):
+    if pk is not None and version is not None:
+        _cache().delete_many(row_keys(pk, version))
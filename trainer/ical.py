@@ -0,0 +1,144 @@
+# trainer/ical.py
+"""
+iCalendar subscription feeds of a trainer's or client's sessions.
+
+Calendar apps poll a subscription URL every few minutes whether or not
+anything changed, so the feed is built to make an unchanged poll cheap:
+
+* the URL carries a signed token naming the user and the kind of feed, so
+  no query is needed to find whose feed it is;
+* one aggregate over the feed's rows (count and latest updated_at, on the
+  (trainer|client, date, time) indexes) gives the ETag and Last-Modified,
+  and a matching poll gets a 304 without building anything;
+* only a rolling window of sessions is included, not the whole history;
+* a changed feed is streamed event by event from a chunked iterator.
+
+Deleting a booking doesn't move the latest updated_at, which is why the
+count is part of the ETag too.
+"""
+import datetime
+import hashlib
+
+from django.core import signing
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Booking
+
+PAST_DAYS = 30
+FUTURE_DAYS = 180
+DEFAULT_SESSION_MINUTES = 60
+CHUNK_SIZE = 500
+
+KINDS = {'t': 'trainer', 'c': 'client'}
+STATUSES = {'pending': 'TENTATIVE', 'confirmed': 'CONFIRMED', 'cancelled': 'CANCELLED'}
+
+# Changing the salt revokes every feed URL handed out so far
+_signer = signing.Signer(salt='trainer.ical', sep='.')
+
+
+def make_token(user):
+    """The feed token for ``user``: their trainer feed if staff, else client."""
+    return _signer.sign(f"{'t' if user.is_staff else 'c'}{user.pk}")
+
+
+def read_token(token):
+    """(kind, user id) from a token; raises signing.BadSignature if forged."""
+    value = _signer.unsign(token)
+    if value[:1] not in KINDS or not value[1:].isdigit():
+        raise signing.BadSignature(token)
+    return KINDS[value[0]], int(value[1:])
+
+
+def window(today=None):
+    today = today or timezone.localdate()
+    return today - datetime.timedelta(days=PAST_DAYS), today + datetime.timedelta(days=FUTURE_DAYS)
+
+
+def bookings(kind, user_id, today=None):
+    """The rows in ``user_id``'s feed, in index order."""
+    start, end = window(today)
+    return Booking.objects.filter(
+        **{kind: user_id}, date__gte=start, date__lte=end).order_by('date', 'time')
+
+
+def state(kind, user_id, today=None):
+    """(ETag, Last-Modified) for the feed, from a single aggregate query."""
+    start, _ = window(today)
+    summary = bookings(kind, user_id, today).order_by().aggregate(
+        count=Count('id'), last=Max('updated_at'))
+    last_modified = summary['last'] or datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+    fingerprint = f"{kind}:{user_id}:{start}:{summary['count']}:{last_modified.isoformat()}"
+    return hashlib.md5(fingerprint.encode()).hexdigest(), last_modified
+
+
+# -- Rendering --
+
+def _escape(text):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Fold to 75-octet lines as RFC 5545 requires, without splitting characters."""
+    folded, current = [], ''
+    for char in line:
+        if len((current + char).encode()) > 75:
+            folded.append(current)
+            current = ' ' + char
+        else:
+            current += char
+    folded.append(current)
+    return '\r\n'.join(folded) + '\r\n'
+
+
+def _utc(value):
+    return value.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _event(row, kind, now):
+    start = timezone.make_aware(datetime.datetime.combine(row['date'], row['time']))
+    minutes = row['trainer__availability__session_minutes'] or DEFAULT_SESSION_MINUTES
+    if kind == 'trainer':
+        summary = f"Session with {row['client_name'] or 'client'}"
+    else:
+        trainer = ' '.join(filter(None, (row['trainer__first_name'], row['trainer__last_name'])))
+        summary = f"Session with {trainer or row['trainer__username'] or 'your trainer'}"
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:booking-{row['pk']}@theptapp",
+        f'DTSTAMP:{_utc(now)}',
+        f"LAST-MODIFIED:{_utc(row['updated_at'])}",
+        f'DTSTART:{_utc(start)}',
+        f'DTEND:{_utc(start + datetime.timedelta(minutes=minutes))}',
+        f'SUMMARY:{_escape(summary)}',
+        f"STATUS:{STATUSES.get(row['status'], 'CONFIRMED')}",
+    ]
+    if row['notes']:
+        lines.append(f"DESCRIPTION:{_escape(row['notes'])}")
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+
+def render(kind, user_id, today=None):
+    """Yield the feed as text, one event at a time."""
+    now = timezone.now()
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//theptapp//Bookings//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f"X-WR-CALNAME:{'Training sessions' if kind == 'trainer' else 'My sessions'}",
+        # Hint for clients that honour it: don't poll more than hourly
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+        'X-PUBLISHED-TTL:PT1H',
+    ))
+    rows = bookings(kind, user_id, today).values(
+        'pk', 'date', 'time', 'status', 'notes', 'client_name', 'updated_at',
+        'trainer__first_name', 'trainer__last_name', 'trainer__username',
+        'trainer__availability__session_minutes',
+    )
+    for row in rows.iterator(chunk_size=CHUNK_SIZE):
+        yield _event(row, kind, now)
+    yield 'END:VCALENDAR\r\n'
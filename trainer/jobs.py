@@ -0,0 +1,169 @@
+# trainer/jobs.py
+"""
+A small database-backed job queue (transactional outbox).
+
+``enqueue()`` writes a Job row inside the caller's transaction, so the job
+exists if and only if the booking change that caused it commits. The
+``run_jobs`` management command claims due jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED`` — several workers can run side by
+side without picking up the same job — and retries failures with
+exponential backoff. Finished jobs are deleted in small batches by
+``manage.py purge_jobs`` once they are older than ``JOB_RETENTION_DAYS``.
+"""
+import datetime
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import digests
+from .models import Job
+from .sms import send_sms
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+# A running job older than this is assumed to belong to a dead worker
+LEASE = datetime.timedelta(minutes=10)
+DEFAULT_RETENTION_DAYS = 14
+PURGE_BATCH_SIZE = 1000
+
+HANDLERS = {}
+
+
+def handler(kind):
+    """Register the function that runs jobs of ``kind``."""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, run_at=None, **payload):
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'")
+    return Job.objects.create(kind=kind, payload=payload, run_at=run_at or timezone.now())
+
+
+def enqueue_many(kind, payloads):
+    """Queue one job per payload dict with a single INSERT."""
+    if kind not in HANDLERS:
+        raise ValueError(f"No job handler registered for '{kind}'")
+    now = timezone.now()
+    return Job.objects.bulk_create(
+        [Job(kind=kind, payload=payload, run_at=now) for payload in payloads])
+
+
+def backoff(attempts):
+    """Seconds to wait before retry number ``attempts``, with jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(batch_size):
+    """Lock and mark up to ``batch_size`` due jobs as running."""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='queued', run_at__lte=now)
+                | Q(status='running', locked_at__lt=now - LEASE)
+            )
+            .order_by('run_at')[:batch_size]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status='running', locked_at=now)
+    return jobs
+
+
+def run(job):
+    """Run one claimed job and record the outcome."""
+    job.attempts += 1
+    try:
+        with transaction.atomic():
+            HANDLERS[job.kind](**job.payload)
+    except Exception as exc:
+        logger.exception("Job %s failed (attempt %d)", job, job.attempts)
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        if job.attempts >= job.max_attempts:
+            job.status = 'failed'
+        else:
+            job.status = 'queued'
+            job.run_at = timezone.now() + datetime.timedelta(seconds=backoff(job.attempts))
+    else:
+        job.status = 'done'
+        job.last_error = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'attempts', 'run_at', 'locked_at', 'last_error'])
+    return job.status == 'done'
+
+
+def run_due(batch_size=50):
+    """Claim and run one batch; returns how many jobs were attempted."""
+    jobs = claim(batch_size)
+    for job in jobs:
+        run(job)
+    return len(jobs)
+
+
+def cutoff(days=None, now=None):
+    """The instant before which finished jobs may be purged."""
+    if days is None:
+        days = getattr(settings, 'JOB_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return (now or timezone.now()) - datetime.timedelta(days=days)
+
+
+def purge(before, batch_size=PURGE_BATCH_SIZE, pause=0.0, dry_run=False):
+    """
+    Delete done jobs last due before ``before``; returns the count.
+
+    Failed jobs are kept for inspection. Each batch is deleted in its own
+    short transaction and batches walk forward by primary key, like the
+    notification purge in ``retention``.
+    """
+    # (status, run_at) is job_due_idx, the same index the workers claim with
+    done = Job.objects.filter(status='done', run_at__lt=before)
+    ids = done.order_by('id').values_list('id', flat=True)
+    purged = 0
+    last_id = 0
+    while True:
+        batch = list(ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return purged
+        last_id = batch[-1]
+
+        if dry_run:
+            purged += len(batch)
+            continue
+
+        with transaction.atomic():
+            purged += done.filter(id__in=batch).delete()[0]
+        if pause:
+            time.sleep(pause)
+
+
+@handler('notification.create')
+def create_notification(recipient_id, notification_type, bookings=(), client_name='',
+                        booking_date=None, booking_time=None, message=''):
+    # Jobs queued before digests carried one booking's fields (and a message)
+    events = list(bookings) or [
+        {'id': None, 'client_name': client_name, 'date': booking_date, 'time': booking_time}]
+    digests.record(notification_type, recipient_id, events)
+
+
+@handler('sms.send')
+def sms(to, body):
+    send_sms(to, body)
+
+
+@handler('email.send')
+def email(to, subject, body):
+    send_mail(subject, body, None, [to])
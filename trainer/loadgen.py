@@ -0,0 +1,224 @@
+# trainer/loadgen.py
+"""
+Synthetic data for load testing.
+
+Everything is written with bulk_create in batches, so a few hundred
+thousand rows take seconds rather than the minutes row-by-row saves would.
+The shape roughly follows a real studio rather than uniform noise, because
+uniform data hides the hot spots indexes and caches have to cope with:
+
+* sessions cluster before work (7-9) and after it (17-20), and weekends
+  are quieter;
+* a few regular clients account for most bookings (a Zipf-like weighting);
+* past sessions are mostly confirmed, upcoming ones are often still pending;
+* older notifications are mostly read, recent ones mostly unread.
+
+Bulk inserts skip model signals, so seed() finishes by rebuilding what the
+signals would have maintained: BookingStat and the search index.
+"""
+import datetime
+import itertools
+import random
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import search, stats
+from .models import Booking, Notification
+
+BATCH_SIZE = 2000
+# Days either side of today that bookings are spread over
+PAST_DAYS = 180
+FUTURE_DAYS = 60
+
+# Relative popularity of each hour of the working day
+HOUR_WEIGHTS = {
+    7: 8, 8: 7, 9: 4, 10: 3, 11: 3, 12: 5, 13: 4,
+    14: 2, 15: 2, 16: 3, 17: 7, 18: 9, 19: 8, 20: 4,
+}
+# Monday first; Saturday and Sunday are quiet
+WEEKDAY_WEIGHTS = (10, 10, 10, 10, 8, 4, 2)
+
+PAST_STATUSES = (('confirmed', 80), ('cancelled', 15), ('pending', 5))
+UPCOMING_STATUSES = (('pending', 45), ('confirmed', 45), ('cancelled', 10))
+
+FIRST_NAMES = (
+    'Aoife', 'Ciara', 'Niamh', 'Saoirse', 'Emma', 'Sarah', 'Conor', 'Sean',
+    'Jack', 'Darragh', 'Cian', 'Oisin', 'Liam', 'Roisin', 'Eoin', 'Grainne',
+)
+LAST_NAMES = (
+    'Murphy', 'Kelly', "O'Sullivan", 'Walsh', 'Smith', "O'Brien", 'Byrne',
+    'Ryan', "O'Connor", "O'Neill", 'Doyle', 'McCarthy', 'Gallagher', 'Lynch',
+)
+NOTES = (
+    '', '', 'Leg day', 'Upper body and core', 'Squats 5x5, deadlifts 3x5',
+    'Mobility and stretching', 'Conditioning circuit', 'Knee rehab - go easy',
+)
+
+
+@dataclass
+class SeedResult:
+    trainers: list
+    clients: list
+    bookings: int = 0
+    notifications: int = 0
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _users(prefix, kind, count, is_staff, password, rng):
+    users = []
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        users.append(User(
+            username=f'{prefix}-{kind}-{i}',
+            first_name=first,
+            last_name=last,
+            email=f'{prefix}-{kind}-{i}@example.com',
+            is_staff=is_staff,
+            password=password,
+        ))
+    return User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+
+
+def _slots(rng, today, wanted):
+    """Yield distinct (date, time) slots for one trainer, busiest first."""
+    # Go further back for big calendars, so at most about half the slots fill
+    past_days = max(PAST_DAYS, -(-2 * wanted // len(HOUR_WEIGHTS)) - FUTURE_DAYS)
+    days = [today + datetime.timedelta(days=offset)
+            for offset in range(-past_days, FUTURE_DAYS + 1)]
+    slots = [(day, hour) for day in days for hour in HOUR_WEIGHTS]
+    weights = [WEEKDAY_WEIGHTS[day.weekday()] * HOUR_WEIGHTS[hour] for day, hour in slots]
+    # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+    keyed = sorted(zip(slots, weights), key=lambda sw: rng.random() ** (1 / sw[1]), reverse=True)
+    for (day, hour), _ in keyed:
+        yield day, datetime.time(hour)
+
+
+def _bookings(trainers, clients, count, rng, today):
+    # Zipf-like: client k books about 1/(k+1) as often as the most regular
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(clients))))
+    per_trainer = [count // len(trainers)] * len(trainers)
+    for i in range(count % len(trainers)):
+        per_trainer[i] += 1
+
+    for trainer, wanted in zip(trainers, per_trainer):
+        slots = _slots(rng, today, wanted)
+        for _, (date, time) in zip(range(wanted), slots):
+            client = rng.choices(clients, cum_weights=cum_weights)[0]
+            statuses = PAST_STATUSES if date < today else UPCOMING_STATUSES
+            # Booked between a day and a month ahead of the session
+            created_at = timezone.make_aware(datetime.datetime.combine(
+                min(date, today) - datetime.timedelta(days=rng.randint(1, 30)), time))
+            yield Booking(
+                trainer=trainer,
+                client=client,
+                client_name=client.get_full_name(),
+                client_contact=f'08{rng.randint(3, 9)} {rng.randint(100, 999)} {rng.randint(1000, 9999)}',
+                date=date,
+                time=time,
+                status=_weighted(rng, statuses),
+                notes=rng.choice(NOTES),
+                created_at=created_at,
+                updated_at=created_at,
+            )
+
+
+def _notifications(trainers, clients, count, rng, now):
+    for _ in range(count):
+        age = datetime.timedelta(minutes=rng.expovariate(1 / (60 * 24 * 14)))
+        created_at = now - age
+        client = rng.choice(clients)
+        kind = _weighted(rng, (('booking_created', 3), ('booking_cancelled', 1)))
+        verb = 'booked' if kind == 'booking_created' else 'cancelled'
+        session = (created_at + datetime.timedelta(days=rng.randint(1, 14))).date()
+        yield Notification(
+            recipient=rng.choice(trainers),
+            notification_type=kind,
+            message=f'{client.get_full_name()} {verb} a session on {session:%d %b}',
+            client_name=client.get_full_name(),
+            booking_date=session,
+            booking_time=datetime.time(rng.choice(list(HOUR_WEIGHTS))),
+            # Older notifications have usually been seen
+            is_read=rng.random() < min(0.95, age.days / 7),
+            created_at=created_at,
+        )
+
+
+@contextmanager
+def _generated_timestamps(model):
+    """
+    Let bulk_create keep the generated created_at/updated_at values.
+
+    auto_now(_add) would stamp every row with "now", and putting the values
+    back with bulk_update afterwards costs more than the insert itself.
+    """
+    fields = [f for f in model._meta.concrete_fields
+              if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)]
+    saved = [(f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, (auto_now, auto_now_add) in zip(fields, saved):
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _insert(model, objects):
+    total = 0
+    with _generated_timestamps(model):
+        for batch in iter(lambda: list(itertools.islice(objects, BATCH_SIZE)), []):
+            total += len(model.objects.bulk_create(batch))
+    return total
+
+
+def seed(trainers=5, clients=200, bookings=10000, notifications=10000,
+         prefix='load', seed=None, today=None):
+    """
+    Insert a synthetic studio; returns a SeedResult.
+
+    Usernames are ``<prefix>-trainer-<n>`` / ``<prefix>-client-<n>``, with
+    an unusable password (log in with force_login). The same ``seed`` gives
+    the same data.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.date.today()
+    now = timezone.now()
+    password = make_password(None)
+
+    with transaction.atomic():
+        result = SeedResult(
+            trainers=_users(prefix, 'trainer', max(trainers, 1), True, password, rng),
+            clients=_users(prefix, 'client', max(clients, 1), False, password, rng),
+        )
+        result.bookings = _insert(Booking, _bookings(
+            result.trainers, result.clients, bookings, rng, today))
+        result.notifications = _insert(Notification, _notifications(
+            result.trainers, result.clients, notifications, rng, now))
+
+        stats.rebuild()
+        search.reindex(Booking)
+        search.reindex(Notification)
+    return result
+
+
+def clear(prefix='load'):
+    """Delete users made by seed() with ``prefix``, and their bookings."""
+    users = User.objects.filter(
+        username__regex=rf'^{re.escape(prefix)}-(trainer|client)-[0-9]+$')
+    with transaction.atomic():
+        # Their bookings and notifications go with them (on_delete=CASCADE)
+        deleted = users.delete()[0]
+        stats.rebuild()
+        search.reindex(Booking)
+        search.reindex(Notification)
+    return deleted
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from trainer import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move confirmed and cancelled sessions older than BOOKING_ARCHIVE_DAYS "
+        "out of the live Booking table into BookingArchive, in small batches. "
+        "Safe to stop and run again; it carries on where it left off."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Keep finished sessions live this many days (default: setting).")
+        parser.add_argument('--batch-size', type=int, default=archive.ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Count what would be archived without moving anything.")
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['days'])
+        moved = archive.archive_bookings(
+            before,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = "Would archive" if options['dry_run'] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {moved} finished sessions from before {before:%Y-%m-%d}."))
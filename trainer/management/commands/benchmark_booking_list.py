@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trainer import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time booking_list renders with cold and warm row fragment caches. "
+        "Seeds synthetic data in a rolled-back transaction against a private "
+        "cache, so it writes nothing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=benchmarks.DEFAULT_SIZES[0],
+                            help="Bookings to seed (default: %(default)s).")
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if options['size'] < 1 or options['repeat'] < 1:
+            raise CommandError("--size and --repeat must be at least 1.")
+
+        results = benchmarks.run(
+            sizes=[options['size']],
+            repeat=options['repeat'],
+            views=[benchmarks.COLD_BOOKING_LIST, 'trainer:booking_list'],
+            seed=options['seed'],
+        )
+        latency = {result['view']: result['latency_ms'] for result in results}
+        cold, warm = latency[benchmarks.COLD_BOOKING_LIST], latency['trainer:booking_list']
+
+        for label, summary in (('cold', cold), ('warm', warm)):
+            self.stdout.write(f"{label}: median {summary['p50']:.2f} ms, p95 {summary['p95']:.2f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Warm renders are {cold['p50'] / warm['p50']:.1f}x faster."))
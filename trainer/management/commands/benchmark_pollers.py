@@ -0,0 +1,79 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from trainer import benchmarks
+
+
+def _integers(value, name):
+    try:
+        numbers = [int(number) for number in value.split(',') if number.strip()]
+    except ValueError:
+        raise CommandError(f"{name} must be comma-separated integers.")
+    if not numbers or min(numbers) < 1:
+        raise CommandError(f"{name} must be positive.")
+    return numbers
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sync (WSGI) and async (ASGI) throughput of the polled views "
+        "with many concurrent pollers, and print the results as JSON. Runs "
+        "against a fresh test database that is destroyed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=benchmarks.DEFAULT_POLL_SIZE,
+            help="Bookings to seed (default: %(default)s).")
+        parser.add_argument(
+            '--concurrency', default=','.join(map(str, benchmarks.DEFAULT_CONCURRENCY)),
+            help="Comma-separated numbers of concurrent pollers (default: %(default)s).")
+        parser.add_argument(
+            '--polls', type=int, default=benchmarks.DEFAULT_POLLS,
+            help="Requests per poller (default: %(default)s).")
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help="Only this URL name, e.g. trainer:check_notifications (repeatable).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', default='', help="Free text stored with the results.")
+        parser.add_argument('--output', help="Write the JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        if options['size'] < 1:
+            raise CommandError("--size must be positive.")
+        if options['polls'] < 1:
+            raise CommandError("--polls must be at least 1.")
+        concurrency = _integers(options['concurrency'], '--concurrency')
+        unknown = set(options['views'] or ()) - set(benchmarks.POLL_VIEWS)
+        if unknown:
+            raise CommandError(
+                f"Unknown view(s): {', '.join(sorted(unknown))}. "
+                f"Choose from {', '.join(benchmarks.POLL_VIEWS)}.")
+
+        # The pollers need committed rows, so never the real database
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = benchmarks.run_pollers(
+                size=options['size'],
+                concurrency=concurrency,
+                polls=options['polls'],
+                views=options['views'],
+                seed=options['seed'],
+                progress=lambda line: self.stderr.write(line),
+            )
+            report = benchmarks.report(
+                options['label'], results, size=options['size'],
+                polls=options['polls'], seed=options['seed'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}."))
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trainer import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the main views at several data sizes and print latency "
+        "percentiles and query counts as JSON. Seeds synthetic data in a "
+        "rolled-back transaction, so it writes nothing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', default=','.join(map(str, benchmarks.DEFAULT_SIZES)),
+            help="Comma-separated booking counts to seed (default: %(default)s).")
+        parser.add_argument('--repeat', type=int, default=benchmarks.DEFAULT_REPEAT)
+        parser.add_argument(
+            '--view', action='append', dest='views',
+            help="Only this URL name, e.g. trainer:booking_list (repeatable).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--label', default='', help="Free text stored with the results.")
+        parser.add_argument('--output', help="Write the JSON here instead of stdout.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers.")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes must be positive.")
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        known = {scenario.name for scenario in benchmarks.SCENARIOS}
+        unknown = set(options['views'] or ()) - known
+        if unknown:
+            raise CommandError(
+                f"Unknown view(s): {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(known))}.")
+
+        results = benchmarks.run(
+            sizes=sizes,
+            repeat=options['repeat'],
+            views=options['views'],
+            seed=options['seed'],
+            progress=lambda line: self.stderr.write(line),
+        )
+        report = benchmarks.report(
+            options['label'], results, repeat=options['repeat'], seed=options['seed'])
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote {len(results)} results to {options['output']}."))
+        else:
+            self.stdout.write(output)
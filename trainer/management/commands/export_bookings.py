@@ -0,0 +1,35 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from trainer.booking_io import EXPORT_CHUNK_SIZE, EXPORT_FORMATS
+from trainer.models import Booking
+
+
+class Command(BaseCommand):
+    help = "Stream bookings out as CSV or NDJSON in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--trainer', help="Only this trainer's bookings (username).")
+        parser.add_argument('--output', help="File to write to (default: stdout).")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.all()
+        if options['trainer']:
+            try:
+                trainer = User.objects.get(username=options['trainer'], is_staff=True)
+            except User.DoesNotExist:
+                raise CommandError(f"No trainer called '{options['trainer']}'.")
+            bookings = bookings.filter(trainer=trainer)
+
+        lines, _ = EXPORT_FORMATS[options['format']]
+        out = open(options['output'], 'w', newline='') if options['output'] else sys.stdout
+        try:
+            for line in lines(bookings, options['chunk_size']):
+                out.write(line)
+        finally:
+            if out is not sys.stdout:
+                out.close()
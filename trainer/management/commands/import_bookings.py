@@ -0,0 +1,62 @@
+import csv
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from trainer.booking_io import IMPORT_BATCH_SIZE, BookingImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import bookings for one trainer from CSV or NDJSON. Columns: client "
+        "(username or email), client_name, client_contact, date, time, status, notes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--trainer', required=True, help="Username of the trainer to import for.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; write nothing.")
+        parser.add_argument('--report', help="Write rejected rows to this CSV (default: stderr).")
+
+    def handle(self, *args, **options):
+        try:
+            trainer = User.objects.get(username=options['trainer'], is_staff=True)
+        except User.DoesNotExist:
+            raise CommandError(f"No trainer called '{options['trainer']}'.")
+
+        fmt = options['format'] or ('ndjson' if options['path'].endswith(('.ndjson', '.jsonl')) else 'csv')
+        importer = BookingImporter(
+            trainer, batch_size=options['batch_size'], dry_run=options['dry_run'])
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as f:
+                created, errors = importer.run(read_rows(f, fmt))
+        except (OSError, csv.Error) as exc:
+            # Earlier batches are already committed; say how far it got
+            done = "" if options['dry_run'] else (
+                f" {importer.created} booking(s) from earlier lines were imported.")
+            raise CommandError(f"Couldn't read {options['path']}: {exc}.{done}")
+
+        self.write_report(errors, options['report'])
+        verb = "Would import" if options['dry_run'] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {created} booking(s); {len(errors)} row(s) rejected."))
+
+    def write_report(self, errors, path):
+        if not errors:
+            return
+        out = open(path, 'w', newline='') if path else sys.stderr
+        try:
+            writer = csv.writer(out)
+            writer.writerow(['line', 'field', 'error'])
+            for line_number, field_errors in sorted(errors, key=lambda e: e[0]):
+                for field, messages in field_errors.items():
+                    for message in messages:
+                        writer.writerow([line_number, field, message])
+        finally:
+            if out is not sys.stderr:
+                out.close()
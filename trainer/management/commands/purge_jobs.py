@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from trainer import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete done background jobs older than JOB_RETENTION_DAYS, in small "
+        "batches. Failed jobs are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Keep done jobs this many days (default: setting).")
+        parser.add_argument('--batch-size', type=int, default=jobs.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Count what would be purged without deleting.")
+
+    def handle(self, *args, **options):
+        before = jobs.cutoff(options['days'])
+        purged = jobs.purge(
+            before,
+            batch_size=options['batch_size'],
+            pause=options['pause'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = "Would purge" if options['dry_run'] else "Purged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {purged} done jobs from before {before:%Y-%m-%d}."))
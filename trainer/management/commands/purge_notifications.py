@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from trainer import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete read notifications older than NOTIFICATION_RETENTION_DAYS, in "
+        "small batches. Optionally archive them to an NDJSON file first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Keep read notifications this many days (default: setting).")
+        parser.add_argument('--batch-size', type=int, default=retention.PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches.")
+        parser.add_argument('--archive', help="Append purged rows to this NDJSON file.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Count what would be purged without deleting.")
+
+    def handle(self, *args, **options):
+        before = retention.cutoff(options['days'])
+        archive = open(options['archive'], 'a') if options['archive'] else None
+        try:
+            purged = retention.purge_notifications(
+                before,
+                batch_size=options['batch_size'],
+                archive=archive,
+                pause=options['pause'],
+                dry_run=options['dry_run'],
+            )
+        finally:
+            if archive is not None:
+                archive.close()
+
+        verb = "Would purge" if options['dry_run'] else "Purged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {purged} read notifications from before {before:%Y-%m-%d}."))
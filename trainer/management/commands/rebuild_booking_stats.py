@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from trainer import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the trainer utilisation summary (BookingStat) from every "
+        "booking. Only needed after writes that bypassed the app, e.g. raw SQL."
+    )
+
+    def handle(self, *args, **options):
+        rows = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt booking stats: {rows} rows."))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from trainer import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (notifications, SMS, email). Safe to run several at once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--sleep', type=float, default=2.0,
+                            help="Seconds to wait when no jobs are due.")
+        parser.add_argument('--once', action='store_true',
+                            help="Run whatever is due, then exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drop a connection the database has closed (or that is past
+            # CONN_MAX_AGE) so the next query reconnects instead of failing
+            close_old_connections()
+            ran = jobs.run_due(options['batch_size'])
+            if ran:
+                self.stdout.write(f"Ran {ran} job(s).")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
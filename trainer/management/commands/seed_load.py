@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+
+from trainer import loadgen
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic studio for load testing: trainers, "
+        "clients, bookings and notifications, inserted with bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trainers', type=int, default=5)
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--notifications', type=int, default=10000)
+        parser.add_argument(
+            '--prefix', default='load',
+            help="Username prefix for the generated users (default: load).")
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help="Random seed, for the same data on every run.")
+        parser.add_argument(
+            '--clear', action='store_true',
+            help="Delete users (and their bookings) from an earlier run with this prefix first.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['clear']:
+            deleted = loadgen.clear(prefix)
+            self.stdout.write(f"Removed {deleted} rows from an earlier '{prefix}' run.")
+        elif User.objects.filter(username__startswith=f'{prefix}-trainer-').exists():
+            raise CommandError(
+                f"Users with the prefix '{prefix}' already exist; use --clear or another --prefix.")
+
+        result = loadgen.seed(
+            trainers=options['trainers'],
+            clients=options['clients'],
+            bookings=options['bookings'],
+            notifications=options['notifications'],
+            prefix=prefix,
+            seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.trainers)} trainers, {len(result.clients)} clients, "
+            f"{result.bookings} bookings and {result.notifications} notifications."))
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from trainer import reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Queue SMS/email reminders for confirmed sessions coming up within "
+        "REMINDER_WINDOWS. Idempotent: safe to rerun or run several at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=reminders.BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=60.0,
+                            help="Seconds between sweeps.")
+        parser.add_argument('--once', action='store_true',
+                            help="Run one sweep, then exit.")
+
+    def handle(self, *args, **options):
+        while True:
+            # Drop a connection the database has closed (or that is past
+            # CONN_MAX_AGE) so the next query reconnects instead of failing
+            close_old_connections()
+            sent = reminders.sweep(batch_size=options['batch_size'])
+            if any(sent.values()):
+                summary = ", ".join(f"{count} × {label}" for label, count in sent.items())
+                self.stdout.write(f"Queued reminders: {summary}.")
+            if options['once']:
+                return
+            time.sleep(options['interval'])
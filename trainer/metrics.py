@@ -0,0 +1,349 @@
+# trainer/metrics.py
+"""
+Request, query and cache metrics in the Prometheus text format.
+
+MetricsMiddleware times every request and records, per URL name: latency
+and response size histograms, request counts by status, and the query
+count and SQL time that QueryCountMiddleware measured. The cache backends
+below count hits and misses per key namespace ("trainer:badge",
+"template.cache.booking_row", ...).
+
+Recording is a few dict updates under a lock, in the worker's memory. Every
+METRICS_FLUSH_SECONDS a worker writes its totals to its own JSON file in
+METRICS_DIR, and ``/metrics`` adds up the files of every worker started by
+the same server process, so a scrape sees the whole dyno whichever worker
+answers it. A worker's file outlives the worker, so counters never go
+backwards when gunicorn recycles one; directories left by servers that are
+no longer running are cleared away.
+"""
+import atexit
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.core.cache.backends.redis import RedisCache as BaseRedisCache
+from django.core.exceptions import MiddlewareNotUsed
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'theptapp_'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_FLUSH_SECONDS = 5
+# Requests that didn't resolve to a URL name share one label
+UNMATCHED = '<unmatched>'
+# Any other method a client sends shares one label, so they can't add series
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+OTHER_METHOD = 'other'
+
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        "Time to produce a response, by URL name.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    'response_size_bytes': (
+        "Size of non-streaming response bodies, by URL name.",
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576)),
+    'db_queries_per_request': (
+        "SQL queries run by one request, by URL name.",
+        (1, 2, 4, 8, 16, 32, 64)),
+}
+COUNTERS = {
+    'requests_total': "Responses, by URL name, method and status code.",
+    'db_queries_total': "SQL queries, by URL name.",
+    'db_query_seconds_total': "Time spent in SQL, by URL name.",
+    'cache_requests_total': "Cache reads, by key namespace and hit or miss.",
+}
+
+
+class Registry:
+    """One worker's totals since it started."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)
+        # (name, labels) -> [count per bucket..., +Inf count, sum]
+        self.histograms = {}
+        self.flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            series = self.histograms.get((name, labels))
+            if series is None:
+                series = self.histograms[name, labels] = [0] * (len(buckets) + 2)
+            series[bisect.bisect_left(buckets, value)] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'counters': [[name, list(labels), value]
+                             for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(series)]
+                               for (name, labels), series in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+# -- Files shared between workers --
+
+def _root():
+    return getattr(settings, 'METRICS_DIR', None) or os.path.join(
+        tempfile.gettempdir(), 'theptapp-metrics')
+
+
+def _server_dir():
+    # Workers of one gunicorn (or runserver) process share its pid
+    return os.path.join(_root(), str(os.getppid()))
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _prune():
+    """Remove the files of servers that have exited."""
+    try:
+        names = os.listdir(_root())
+    except FileNotFoundError:
+        return
+    for name in names:
+        if name.isdigit() and not _running(int(name)):
+            path = os.path.join(_root(), name)
+            # Another worker may be pruning the same directory
+            try:
+                for file in os.listdir(path):
+                    os.remove(os.path.join(path, file))
+                os.rmdir(path)
+            except OSError as exc:
+                logger.debug("Could not prune %s: %s", path, exc)
+
+
+def flush():
+    """Write this worker's totals to its file (atomically, so readers never see half)."""
+    directory = _server_dir()
+    if not registry.flushed_at:
+        _prune()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{os.getpid()}.json')
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(f.name, path)
+    registry.flushed_at = time.monotonic()
+
+
+def maybe_flush():
+    """flush() if it's due. Never raises: metrics must not fail a request."""
+    interval = getattr(settings, 'METRICS_FLUSH_SECONDS', DEFAULT_FLUSH_SECONDS)
+    if time.monotonic() - registry.flushed_at < interval:
+        return
+    try:
+        flush()
+    except OSError:
+        logger.exception("Could not write metrics to %s", _server_dir())
+        # Try again next interval rather than on every request
+        registry.flushed_at = time.monotonic()
+
+
+@atexit.register
+def _flush_on_exit():
+    if registry.counters or registry.histograms:
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def collect():
+    """Every worker's totals added together."""
+    try:
+        flush()
+    except OSError:
+        logger.exception("Could not write metrics to %s", _server_dir())
+    counters, histograms = defaultdict(float), {}
+    directory = _server_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # Gone or unreadable since listdir; it'll be back next scrape
+            continue
+        for metric, labels, value in data['counters']:
+            counters[metric, tuple(labels)] += value
+        for metric, labels, series in data['histograms']:
+            total = histograms.setdefault((metric, tuple(labels)), [0] * len(series))
+            for i, value in enumerate(series):
+                total[i] += value
+    return counters, histograms
+
+
+# -- Prometheus text format --
+
+LABELS = {
+    'requests_total': ('view', 'method', 'status'),
+    'db_queries_total': ('view',),
+    'db_query_seconds_total': ('view',),
+    'cache_requests_total': ('namespace', 'result'),
+    'request_duration_seconds': ('view',),
+    'response_size_bytes': ('view',),
+    'db_queries_per_request': ('view',),
+}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, **extra):
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render():
+    """The exposition text for a Prometheus scrape."""
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {PREFIX}{name} {help_text}', f'# TYPE {PREFIX}{name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{PREFIX}{name}{_labels(LABELS[name], labels)} {_number(value)}')
+
+    # Hit ratio per namespace, for dashboards that can't divide
+    reads = defaultdict(lambda: [0, 0])
+    for (metric, labels), value in counters.items():
+        if metric == 'cache_requests_total':
+            reads[labels[0]][labels[1] == 'hit'] += value
+    lines += [f'# HELP {PREFIX}cache_hit_ratio Share of cache reads that hit, by key namespace.',
+              f'# TYPE {PREFIX}cache_hit_ratio gauge']
+    for key_namespace, (misses, hits) in sorted(reads.items()):
+        lines.append(f'{PREFIX}cache_hit_ratio{_labels(("namespace",), (key_namespace,))} '
+                     f'{round(hits / (hits + misses), 4)}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {PREFIX}{name} {help_text}', f'# TYPE {PREFIX}{name} histogram']
+        for (metric, labels), series in sorted(histograms.items()):
+            if metric != name:
+                continue
+            names = LABELS[name]
+            cumulative = 0
+            for bound, count in zip((*buckets, '+Inf'), series):
+                cumulative += count
+                lines.append(f'{PREFIX}{name}_bucket{_labels(names, labels, le=bound)} {cumulative}')
+            lines.append(f'{PREFIX}{name}_sum{_labels(names, labels)} {_number(series[-1])}')
+            lines.append(f'{PREFIX}{name}_count{_labels(names, labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+# -- Recording --
+
+def namespace(key):
+    """A low-cardinality label for a cache key: its first two parts."""
+    if ':' in key:
+        return ':'.join(key.split(':', 2)[:2])
+    return '.'.join(key.split('.', 3)[:3])
+
+
+def record_cache(key, hit):
+    registry.inc('cache_requests_total', (namespace(str(key)), 'hit' if hit else 'miss'))
+
+
+class MetricsMiddleware:
+    """Record each request; first in MIDDLEWARE so the timing covers the rest."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        return self.record(request, response, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        return self.record(request, response, time.perf_counter() - started)
+
+    def record(self, request, response, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or UNMATCHED
+        method = request.method if request.method in METHODS else OTHER_METHOD
+        registry.inc('requests_total', (view, method, str(response.status_code)))
+        registry.observe('request_duration_seconds', (view,), elapsed)
+        if not response.streaming:
+            registry.observe('response_size_bytes', (view,), len(response.content))
+        stats = getattr(request, 'query_stats', None)
+        if stats is not None:
+            registry.inc('db_queries_total', (view,), stats.count)
+            registry.inc('db_query_seconds_total', (view,), stats.duration)
+            registry.observe('db_queries_per_request', (view,), stats.count)
+
+        maybe_flush()
+        return response
+
+
+# -- Cache backends that count hits and misses --
+
+_MISSING = object()
+
+
+class CacheMetricsMixin:
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        record_cache(key, value is not _MISSING)
+        return default if value is _MISSING else value
+
+
+class LocMemCache(CacheMetricsMixin, BaseLocMemCache):
+    # BaseCache.get_many() calls get(), so it's counted there
+    pass
+
+
+class RedisCache(CacheMetricsMixin, BaseRedisCache):
+
+    def get_many(self, keys, version=None):
+        found = super().get_many(keys, version)
+        for key in keys:
+            record_cache(key, key in found)
+        return found
@@ -0,0 +1,231 @@
+# trainer/middleware.py
+"""
+Request middleware for the trainer app.
+
+Every class here works both ways, like Django's own middleware: under WSGI
+it is called synchronously, and under ASGI ``__acall__`` awaits the next
+handler, so the async views (booking_list, client_detail,
+check_notifications) stay on the event loop instead of Django running the
+whole chain in a thread. WhiteNoiseMiddleware is a sync-only third-party
+class, so an async-capable subclass of it lives here too.
+"""
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+from . import routers
+
+logger = logging.getLogger(__name__)
+
+# Maximum SQL queries a GET (or HEAD) of each view may run, whatever the
+# number of rows it shows. Includes the session + user lookups done by the
+# auth middleware. Writes (e.g. admin actions posted to a changelist) have
+# no budget. trainer/tests.py enforces these, so bump them there deliberately.
+QUERY_BUDGETS = {
+    'trainer:booking_list': 3,
+    # Plus the archived history, once the live bookings run out
+    'trainer:client_detail': 5,
+    'trainer:notifications_list': 4,
+    'trainer:check_notifications': 4,
+    # One estimated count, the page, and two date_hierarchy queries
+    'admin:trainer_booking_changelist': 6,
+    'admin:trainer_notification_changelist': 6,
+}
+
+
+# Methods that only read, and so can be held to QUERY_BUDGETS
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_query_budget(view_name):
+    budgets = getattr(settings, 'QUERY_BUDGETS', QUERY_BUDGETS)
+    return budgets.get(view_name)
+
+
+class QueryStats:
+    """Counts queries and SQL time via connection.execute_wrapper."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# The QueryStats of the request being served. A context variable rather than
+# a per-request execute_wrapper: async views run their queries through
+# sync_to_async on another thread, with that thread's connections, and the
+# context (unlike the connections) follows them there
+_query_stats = ContextVar('query_stats', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    stats = _query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def _install_query_counter():
+    """Put _count_query on this thread's connections, once each."""
+    for conn in connections.all():
+        if _count_query not in conn.execute_wrappers:
+            # First, so execute_wrapper()'s pop() on exit never removes it
+            conn.execute_wrappers.insert(0, _count_query)
+
+
+class QueryCountMiddleware:
+    """
+    Record how many queries each request runs and how long they take.
+
+    The totals are attached to the request as ``request.query_stats``,
+    exposed in a ``Server-Timing`` header, and logged as a warning when a
+    view goes over its entry in QUERY_BUDGETS.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        _install_query_counter()
+        stats = request.query_stats = QueryStats()
+        token = _query_stats.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.report(request, response, stats)
+
+    async def __acall__(self, request):
+        # The thread sync_to_async runs the view's queries on
+        await sync_to_async(_install_query_counter)()
+        stats = request.query_stats = QueryStats()
+        token = _query_stats.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_stats.reset(token)
+        return self.report(request, response, stats)
+
+    def report(self, request, response, stats):
+        response['Server-Timing'] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else None
+        budget = None
+        if view_name and request.method in SAFE_METHODS:
+            budget = get_query_budget(view_name)
+
+        if budget is not None and stats.count > budget:
+            logger.warning(
+                "%s ran %d queries (budget %d) in %.1fms",
+                view_name, stats.count, budget, stats.duration * 1000,
+            )
+        else:
+            logger.debug(
+                "%s ran %d queries in %.1fms",
+                view_name or request.path, stats.count, stats.duration * 1000,
+            )
+
+        return response
+
+
+class ReadReplicaMiddleware:
+    """
+    Scope trainer.routers' replica reads to one request.
+
+    Unsafe methods and users pinned by a recent write read the primary.
+    When the request writes, the response pins the user to the primary for
+    REPLICA_PIN_SECONDS so their next pages show what they just did.
+    Streaming bodies are produced after this returns, so they read the
+    primary.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        routing = self.routing(request)
+        token = routers.begin_request(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(request, response, routing)
+
+    async def __acall__(self, request):
+        # A context variable, so it reaches the view's sync_to_async threads
+        routing = self.routing(request)
+        token = routers.begin_request(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end_request(token)
+        return self.pin(request, response, routing)
+
+    def routing(self, request):
+        return routers.RequestRouting(
+            primary=request.method not in SAFE_METHODS or routers.pinned(request))
+
+    def pin(self, request, response, routing):
+        if routing.wrote:
+            seconds = routers.pin_seconds()
+            response.set_cookie(
+                routers.PIN_COOKIE, str(time.time() + seconds), max_age=seconds,
+                secure=request.is_secure(), httponly=True, samesite='Lax')
+        return response
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    WhiteNoise, able to sit in an async middleware chain.
+
+    Static files are still served synchronously (in a thread, under ASGI);
+    every other request is passed straight on to the async handler.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
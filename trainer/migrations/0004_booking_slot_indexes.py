@@ -0,0 +1,21 @@
+# Generated by Django 4.2.26 on 2026-10-18 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0003_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['trainer', 'date', 'time'], name='booking_trainer_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client', 'date', 'time'], name='booking_client_slot_idx'),
+        ),
+    ]
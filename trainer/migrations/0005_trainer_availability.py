@@ -0,0 +1,56 @@
+# Generated by Django 4.2.26 on 2026-10-18 07:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trainer', '0004_booking_slot_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainerAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_minutes', models.PositiveSmallIntegerField(default=60, help_text='Length of one session; also how long a booking blocks the diary.')),
+                ('trainer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trainer Availability',
+                'verbose_name_plural': 'Trainer Availability',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('availability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hours', to='trainer.traineravailability')),
+            ],
+            options={
+                'verbose_name_plural': 'Working Hours',
+                'ordering': ['weekday', 'start_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AvailabilityException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField(blank=True, null=True)),
+                ('end_time', models.TimeField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=False, help_text='Tick to add extra hours; leave unticked to block time off.')),
+                ('availability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exceptions', to='trainer.traineravailability')),
+            ],
+            options={
+                'ordering': ['date', 'start_time'],
+            },
+        ),
+    ]
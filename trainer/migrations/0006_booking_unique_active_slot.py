@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-18 07:09
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def cancel_duplicate_slots(apps, schema_editor):
+    """Keep the oldest active booking in each clashing slot, cancel the rest."""
+    Booking = apps.get_model('trainer', 'Booking')
+    active = Booking.objects.filter(status__in=('pending', 'confirmed'))
+    clashes = (
+        active.values('trainer', 'date', 'time')
+        .annotate(n=Count('id'), keep=Min('id'))
+        .filter(n__gt=1)
+    )
+    for slot in clashes:
+        active.filter(
+            trainer=slot['trainer'], date=slot['date'], time=slot['time'],
+        ).exclude(id=slot['keep']).update(status='cancelled')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0005_trainer_availability'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='booking',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'confirmed'))), fields=('trainer', 'date', 'time'), name='booking_unique_active_slot'),
+        ),
+    ]
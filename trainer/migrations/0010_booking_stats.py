@@ -0,0 +1,48 @@
+# Generated by Django 4.2.26 on 2026-10-18 07:21
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    """Count the existing bookings so the dashboard starts out correct."""
+    Booking = apps.get_model('trainer', 'Booking')
+    BookingStat = apps.get_model('trainer', 'BookingStat')
+    rows = (
+        Booking.objects.filter(trainer__isnull=False)
+        .order_by()
+        .values('trainer_id', 'date', 'status', hour=ExtractHour('time'))
+        .annotate(count=Count('id'))
+    )
+    BookingStat.objects.bulk_create(
+        [BookingStat(**row) for row in rows.iterator()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trainer', '0009_booking_reminders'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('trainer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bookingstat',
+            constraint=models.UniqueConstraint(fields=('trainer', 'date', 'hour', 'status'), name='booking_stat_key'),
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
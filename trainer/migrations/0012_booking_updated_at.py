@@ -0,0 +1,27 @@
+# Generated by Django 4.2.26 on 2026-10-18 08:02
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def start_from_created_at(apps, schema_editor):
+    Booking = apps.get_model('trainer', 'Booking')
+    Booking.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0011_notification_inbox_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(start_from_created_at, migrations.RunPython.noop),
+    ]
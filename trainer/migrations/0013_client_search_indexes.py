@@ -0,0 +1,46 @@
+# Indexes on auth_user for trainer.clients.search_clients().
+#
+# istartswith compiles to UPPER(col) LIKE UPPER('term%') on PostgreSQL,
+# which a pg_trgm GIN index on UPPER(col) can answer; on SQLite it is a
+# plain LIKE, which uses an index declared COLLATE NOCASE.
+
+from django.db import migrations
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'username', 'email')
+
+
+def index_name(field):
+    return f'trainer_client_{field}_search_idx'
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(field)} ON auth_user '
+                f'USING gin (UPPER("{field}"::text) gin_trgm_ops)')
+    elif vendor == 'sqlite':
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index_name(field)} ON auth_user '
+                f'("{field}" COLLATE NOCASE)')
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('postgresql', 'sqlite'):
+        for field in SEARCH_FIELDS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(field)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('trainer', '0012_booking_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.26 on 2026-10-18 07:29
+
+from django.db import migrations, models
+import trainer.phones
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0013_client_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='client_phone',
+            field=trainer.phones.NormalizedPhoneField(blank=True, editable=False, max_length=16, source='client_contact'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['client_phone', 'date', 'time'], name='booking_phone_idx'),
+        ),
+    ]
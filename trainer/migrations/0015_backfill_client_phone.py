@@ -0,0 +1,58 @@
+# Fill Booking.client_phone for rows saved before the field existed.
+#
+# Runs outside a single transaction: each batch commits on its own, so a
+# large bookings table is never locked for the whole backfill and an
+# interrupted run picks up where it stopped (rows already filled are
+# skipped because only blank client_phone values are selected).
+#
+# The normalizer is a frozen copy of trainer.phones.normalize_phone as it
+# was when this migration was written, so later changes to that module
+# can't change what this backfill stores.
+
+import re
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+_SEPARATORS = re.compile(r'[\s\-().]')
+# +353 / 353 / 0 followed by the 9-digit national number
+_IRISH_NUMBER = re.compile(r'(?:\+353|353|0)([0-9]{9})')
+
+
+def normalize_phone(value):
+    if not value:
+        return ''
+    match = _IRISH_NUMBER.fullmatch(_SEPARATORS.sub('', value))
+    return f'+353{match.group(1)}' if match else ''
+
+
+def backfill_client_phone(apps, schema_editor):
+    Booking = apps.get_model('trainer', 'Booking')
+    pending = (
+        Booking.objects.filter(client_phone='').exclude(client_contact='')
+        .order_by('pk').only('pk', 'client_contact')
+    )
+    last_pk = 0
+    while True:
+        batch = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for booking in batch:
+            booking.client_phone = normalize_phone(booking.client_contact)
+        with transaction.atomic():
+            Booking.objects.bulk_update(
+                [b for b in batch if b.client_phone], ['client_phone'])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('trainer', '0014_booking_client_phone'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_client_phone, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Full-text search indexes for trainer.search: a GIN expression index per
+# model on PostgreSQL, FTS5 tables filled from the existing rows on SQLite.
+#
+# The searched columns are frozen here rather than read from
+# trainer.search.SEARCH_FIELDS, so later changes to the live module can't
+# change what this migration builds. Changing the searched columns needs a
+# new migration.
+
+from django.db import migrations
+
+SEARCH_FIELDS = {
+    'Booking': ('client_name', 'client_contact', 'notes'),
+    'Notification': ('client_name', 'message'),
+}
+
+
+def _gin_index(model, fields):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    return GinIndex(SearchVector(*fields, config='english'),
+                    name=f'{model._meta.db_table}_search_idx')
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('trainer', name)
+        if vendor == 'postgresql':
+            schema_editor.add_index(model, _gin_index(model, fields))
+        elif vendor == 'sqlite':
+            table, columns = model._meta.db_table, ', '.join(fields)
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts "
+                f"USING fts5({columns}, tokenize='porter unicode61')")
+            schema_editor.execute(
+                f"INSERT INTO {table}_fts(rowid, {columns}) SELECT id, {columns} FROM {table}")
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, fields in SEARCH_FIELDS.items():
+        model = apps.get_model('trainer', name)
+        if vendor == 'postgresql':
+            schema_editor.remove_index(model, _gin_index(model, fields))
+        elif vendor == 'sqlite':
+            schema_editor.execute(f"DROP TABLE IF EXISTS {model._meta.db_table}_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trainer', '0015_backfill_client_phone'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.26 on 2026-10-18 08:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('trainer', '0017_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('client_name', models.CharField(max_length=100)),
+                ('client_contact', models.CharField(blank=True, max_length=100)),
+                ('client_phone', models.CharField(blank=True, max_length=20)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('notes', models.TextField(blank=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('reason', models.CharField(choices=[('archived', 'Archived'), ('deleted', 'Deleted')], default='archived', max_length=10)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-date', '-time'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_status_slot_idx',
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'confirmed')), fields=['date', 'time'], name='booking_confirmed_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['client', '-created_at'], name='booking_client_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='bookingarchive',
+            name='client',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bookings_as_client', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='bookingarchive',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_bookings', to='trainer.bookingseries'),
+        ),
+        migrations.AddField(
+            model_name='bookingarchive',
+            name='trainer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['client', 'date', 'time'], name='archive_client_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['trainer', 'date', 'time'], name='archive_trainer_slot_idx'),
+        ),
+    ]
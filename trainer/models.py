@@ -1,8 +1,40 @@
 # trainer/models.py
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .phones import NormalizedPhoneField
+
+class BookingSeries(models.Model):
+    FREQUENCIES = [
+        ('weekly', 'Weekly'),
+        ('fortnightly', 'Fortnightly'),
+    ]
+    # Days between occurrences for each frequency
+    INTERVAL_DAYS = {'weekly': 7, 'fortnightly': 14}
+
+    trainer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='booking_series'
+    )
+    frequency = models.CharField(max_length=20, choices=FREQUENCIES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'Booking series'
+
+    def __str__(self):
+        return f"{self.get_frequency_display()} series #{self.pk}"
+
 
 class Booking(models.Model):
+    # Bookings that still hold the trainer's time slot
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+    # Fields whose previous values post_save receivers need
+    TRACKED_FIELDS = ('trainer_id', 'client_id', 'date', 'time', 'status', 'updated_at')
+    # Live rows; see BookingArchive
+    is_archived = False
+
     trainer = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -19,6 +51,8 @@ class Booking(models.Model):
     )
     client_name = models.CharField(max_length=100)
     client_contact = models.CharField(max_length=100, blank=True)
+    # client_contact in E.164 ("+353871234567"), '' if it isn't a phone number
+    client_phone = NormalizedPhoneField(source='client_contact')
     date = models.DateField()
     time = models.TimeField()
     notes = models.TextField(blank=True)
@@ -28,20 +62,134 @@ class Booking(models.Model):
         default='pending'
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every change; cached list rows are keyed by it. Bulk
+    # UPDATEs must set it themselves (auto_now only runs on save()).
+    updated_at = models.DateTimeField(auto_now=True)
+    series = models.ForeignKey(
+        BookingSeries,
+        on_delete=models.SET_NULL,
+        related_name='bookings',
+        null=True,
+        blank=True
+    )
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            # Back the keyset pagination in booking_list / client_detail
+            models.Index(fields=['trainer', 'date', 'time'], name='booking_trainer_slot_idx'),
+            models.Index(fields=['client', 'date', 'time'], name='booking_client_slot_idx'),
+            # The reminder sweep: confirmed sessions in an upcoming window.
+            # Partial, so finished and cancelled history doesn't bloat it
+            models.Index(fields=['date', 'time'], condition=models.Q(status='confirmed'),
+                         name='booking_confirmed_slot_idx'),
+            # Clients' pending badge: count and newest pending booking
+            models.Index(fields=['client', '-created_at'], condition=models.Q(status='pending'),
+                         name='booking_client_pending_idx'),
+            # Exact "bookings for this phone number" lookups
+            models.Index(fields=['client_phone', 'date', 'time'], name='booking_phone_idx'),
+            # Default ordering and the admin's date_hierarchy ranges
+            models.Index(fields=['date', 'time'], name='booking_date_idx'),
+        ]
+        constraints = [
+            # One active booking per trainer slot, enforced by the database
+            models.UniqueConstraint(
+                fields=['trainer', 'date', 'time'],
+                condition=models.Q(status__in=('pending', 'confirmed')),
+                name='booking_unique_active_slot',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so signals can undo the old state
+        # (the old client's badge, the old day's stats, the old cached row)
+        instance._loaded = instance.snapshot()
+        return instance
+
+    def snapshot(self):
+        return {name: self.__dict__.get(name) for name in self.TRACKED_FIELDS}
 
     def __str__(self):
-        trainer_name = self.trainer.get_full_name() or self.trainer.username if self.trainer else "Unassigned"
-        client_str = self.client.get_full_name() or self.client.username if self.client else self.client_name
+        # Names only from what's already loaded (select_related), so listing
+        # bookings never costs a query per row
+        if self.trainer_id is None:
+            trainer_name = "Unassigned"
+        elif Booking.trainer.is_cached(self):
+            trainer_name = self.trainer.get_full_name() or self.trainer.username
+        else:
+            trainer_name = f"trainer #{self.trainer_id}"
+        # client_name is kept in sync on save
+        client_str = self.client_name or (f"client #{self.client_id}" if self.client_id else "")
         return f"{client_str} → {trainer_name}"
 
 
+class BookingArchive(models.Model):
+    """
+    A booking moved out of the live table by trainer.archive.
+
+    Finished sessions (``manage.py archive_bookings``) and deleted ones keep
+    their original id, so they slot into the same (date, time, id) order as
+    live bookings when client_detail pages back into history.
+    """
+    REASONS = [
+        ('archived', 'Archived'),
+        ('deleted', 'Deleted'),
+    ]
+    is_archived = True
+
+    id = models.BigIntegerField(primary_key=True)
+    trainer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_bookings',
+        null=True,
+        blank=True
+    )
+    client = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        related_name='archived_bookings_as_client',
+        null=True,
+        blank=True
+    )
+    client_name = models.CharField(max_length=100)
+    client_contact = models.CharField(max_length=100, blank=True)
+    client_phone = models.CharField(max_length=20, blank=True)
+    date = models.DateField()
+    time = models.TimeField()
+    notes = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Booking._meta.get_field('status').choices)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    series = models.ForeignKey(
+        BookingSeries,
+        on_delete=models.SET_NULL,
+        related_name='archived_bookings',
+        null=True,
+        blank=True
+    )
+    reason = models.CharField(max_length=10, choices=REASONS, default='archived')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', '-time']
+        indexes = [
+            # client_detail's history pages, in the same order as the live table
+            models.Index(fields=['client', 'date', 'time'], name='archive_client_slot_idx'),
+            models.Index(fields=['trainer', 'date', 'time'], name='archive_trainer_slot_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_name} on {self.date} ({self.get_reason_display()})"
+
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('booking_cancelled', 'Booking Cancelled'),
         ('booking_created', 'New Booking'),
+        ('booking_updated', 'Booking Changed'),
     ]
     
     recipient = models.ForeignKey(
@@ -55,10 +203,184 @@ class Notification(models.Model):
     booking_date = models.DateField(null=True, blank=True)
     booking_time = models.TimeField(null=True, blank=True)
     is_read = models.BooleanField(default=False)
+    # Time of the latest event; a growing digest moves back to the top
     created_at = models.DateTimeField(auto_now_add=True)
+    # A notification is a digest of every event of its type for the
+    # recipient in one window (trainer.digests). client_name and
+    # booking_date/time describe the latest event; ``bookings`` lists the
+    # most recent ones
+    event_count = models.PositiveIntegerField(default=1)
+    bookings = models.JSONField(default=list, blank=True)
+    # Start of the window the digest collects while open. Marking it read
+    # or unread clears it, closing the digest, so a notification marked
+    # unread again can't clash with a newer one. Empty on older rows too
+    window_start = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge counts and the paginated inbox, newest first
+            models.Index(fields=['recipient', 'is_read', 'created_at'],
+                         name='notification_inbox_idx'),
+            # Default ordering, the admin's date_hierarchy and the purge
+            models.Index(fields=['created_at'], name='notification_created_idx'),
+        ]
+        constraints = [
+            # The upsert target: one unread digest per recipient, type and window
+            models.UniqueConstraint(
+                fields=['recipient', 'notification_type', 'window_start'],
+                condition=models.Q(is_read=False),
+                name='notification_open_digest',
+            ),
+        ]
     
     def __str__(self):
-        return f"{self.notification_type} for {self.recipient.username} - {self.created_at}"
\ No newline at end of file
+        # As Booking.__str__: the username only when it's already loaded
+        if Notification.recipient.is_cached(self):
+            recipient = self.recipient.username
+        else:
+            recipient = f"user #{self.recipient_id}"
+        return f"{self.notification_type} for {recipient} - {self.created_at}"
+
+
+class TrainerAvailability(models.Model):
+    WEEKDAYS = [
+        (0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'),
+        (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday'),
+    ]
+
+    trainer = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='availability'
+    )
+    session_minutes = models.PositiveSmallIntegerField(
+        default=60,
+        help_text="Length of one session; also how long a booking blocks the diary."
+    )
+
+    class Meta:
+        verbose_name = 'Trainer Availability'
+        verbose_name_plural = 'Trainer Availability'
+
+    def __str__(self):
+        return f"Availability for trainer #{self.trainer_id}"
+
+
+class WorkingHours(models.Model):
+    availability = models.ForeignKey(
+        TrainerAvailability,
+        on_delete=models.CASCADE,
+        related_name='hours'
+    )
+    weekday = models.PositiveSmallIntegerField(choices=TrainerAvailability.WEEKDAYS)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+
+    class Meta:
+        ordering = ['weekday', 'start_time']
+        verbose_name_plural = 'Working Hours'
+
+    def __str__(self):
+        return f"{self.get_weekday_display()} {self.start_time:%H:%M}–{self.end_time:%H:%M}"
+
+
+class AvailabilityException(models.Model):
+    availability = models.ForeignKey(
+        TrainerAvailability,
+        on_delete=models.CASCADE,
+        related_name='exceptions'
+    )
+    date = models.DateField()
+    # Leave both times empty to cover the whole day
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    is_available = models.BooleanField(
+        default=False,
+        help_text="Tick to add extra hours; leave unticked to block time off."
+    )
+
+    class Meta:
+        ordering = ['date', 'start_time']
+
+    def __str__(self):
+        kind = "Extra hours" if self.is_available else "Time off"
+        return f"{kind} on {self.date}"
+
+
+class BookingStat(models.Model):
+    """
+    How many bookings a trainer has per day, hour and status.
+
+    Kept up to date incrementally by trainer.stats; rebuild from scratch
+    with `manage.py rebuild_booking_stats`.
+    """
+    trainer = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='booking_stats'
+    )
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['trainer', 'date', 'hour', 'status'], name='booking_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.count} {self.status} for trainer #{self.trainer_id} on {self.date} {self.hour}:00"
+
+
+class Reminder(models.Model):
+    """Marks that a booking's reminder for one window has been queued."""
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='reminders'
+    )
+    window = models.CharField(max_length=10)
+    # Which sweep inserted the row; lets overlapping sweeps tell whose it is
+    claim = models.UUIDField()
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['booking', 'window'], name='reminder_once_per_window'),
+        ]
+
+    def __str__(self):
+        return f"{self.window} reminder for booking #{self.booking_id}"
+
+
+class Job(models.Model):
+    """A unit of background work, written in the same transaction as its cause."""
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            # The worker's "what's due?" query
+            models.Index(fields=['status', 'run_at'], name='job_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -0,0 +1,143 @@
+# trainer/notifications.py
+"""
+Navbar badge data, cached per user.
+
+The badge is polled by every open tab, so the payload is kept in Django's
+cache under a per-user version. Anything that changes a user's unread
+notifications or pending bookings calls ``badge_changed()`` after commit,
+which bumps the version; unchanged polls get a 304 on the version ETag
+without touching the database.
+
+The ``a``-prefixed functions do the same for async views, through the
+async ORM and cache APIs.
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+
+from . import events
+from .routers import use_primary
+from .models import Booking, Notification
+
+# Bounds staleness when the cache isn't shared between workers
+BADGE_CACHE_TIMEOUT = 120
+
+
+def _badge_rows(user):
+    """The rows the badge counts: unread notifications, or pending bookings."""
+    if user.is_staff:
+        # Unread notifications only (don't include pending bookings so the badge clears)
+        return Notification.objects.filter(recipient=user, is_read=False)
+    # For clients, still show pending bookings
+    return Booking.objects.filter(client=user, status='pending').order_by('-created_at')
+
+
+def _badge_payload(user, count, latest):
+    if not latest:
+        return {'count': 0}
+    if user.is_staff:
+        return {
+            'count': count,
+            'latest': {
+                'client_name': latest.client_name,
+                'date': latest.booking_date.strftime('%b %d') if latest.booking_date else '',
+                'time': latest.booking_time.strftime('%I:%M %p') if latest.booking_time else '',
+                'type': latest.notification_type,
+            }
+        }
+    return {
+        'count': count,
+        'latest': {
+            'client_name': latest.client_name or "Someone",
+            'date': latest.date.strftime('%b %d'),
+            'time': latest.time.strftime('%I:%M %p'),
+        }
+    }
+
+
+def badge_data(user):
+    """Build the notification badge payload shown in the navbar."""
+    rows = _badge_rows(user)
+    return _badge_payload(user, rows.count(), rows.first())
+
+
+async def abadge_data(user):
+    """badge_data() for async views."""
+    rows = _badge_rows(user)
+    return _badge_payload(user, await rows.acount(), await rows.afirst())
+
+
+def _version_key(user_id):
+    return f'trainer:badge:version:{user_id}'
+
+
+def badge_version(user_id):
+    """Current badge version for ``user_id`` (also used as the ETag)."""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Time-based so a version evicted from the cache is never reused
+        version = time.time_ns()
+        if not cache.add(key, version, BADGE_CACHE_TIMEOUT):
+            version = cache.get(key, version)
+    return str(version)
+
+
+async def abadge_version(user_id):
+    """badge_version() for async views."""
+    key = _version_key(user_id)
+    version = await cache.aget(key)
+    if version is None:
+        version = time.time_ns()
+        if not await cache.aadd(key, version, BADGE_CACHE_TIMEOUT):
+            version = await cache.aget(key, version)
+    return str(version)
+
+
+def cached_badge(user):
+    """Badge payload for ``user``, computed at most once per version."""
+    key = f'trainer:badge:{user.pk}:{badge_version(user.pk)}'
+    data = cache.get(key)
+    if data is None:
+        # A lagging replica would pin a stale badge to the new version
+        with use_primary():
+            data = badge_data(user)
+        cache.set(key, data, BADGE_CACHE_TIMEOUT)
+    return data
+
+
+async def acached_badge(user):
+    """cached_badge() for async views."""
+    key = f'trainer:badge:{user.pk}:{await abadge_version(user.pk)}'
+    data = await cache.aget(key)
+    if data is None:
+        with use_primary():
+            data = await abadge_data(user)
+        await cache.aset(key, data, BADGE_CACHE_TIMEOUT)
+    return data
+
+
+def badge_changed(user_id):
+    """
+    Invalidate the cached badge and push the new one to open streams.
+
+    Call after the change has committed (see transaction.on_commit) so the
+    recomputed badge can't be built from the old rows.
+    """
+    cache.set(_version_key(user_id), time.time_ns(), BADGE_CACHE_TIMEOUT)
+    if events.has_subscribers(user_id):
+        user = User.objects.get(pk=user_id)
+        events.publish(user_id, cached_badge(user))
+
+
+def badge_changed_on_commit(*user_ids):
+    """
+    Schedule badge_changed() for each user once the transaction commits.
+
+    Bulk writes (bulk_create, update, delete on a queryset) skip model
+    signals, so code doing them calls this directly.
+    """
+    for user_id in {uid for uid in user_ids if uid}:
+        transaction.on_commit(lambda uid=user_id: badge_changed(uid))
@@ -0,0 +1,215 @@
+# trainer/pagination.py
+"""
+Keyset (cursor) pagination for booking and notification lists.
+
+Offset pagination gets slower the deeper you page because the database has
+to walk past every skipped row. Keyset pagination instead remembers the
+last row shown and asks for rows "after" it, which the composite
+(trainer/client, date, time) indexes on Booking can answer directly — so
+page 1 and page 500 cost the same.
+
+apaginate_with_history() merges a second, archived queryset into the same
+order, one more indexed seek per page.
+
+The admin changelists keep Django's numbered pages but count with
+estimated_count(), so a page of a very large table is not a full scan.
+"""
+import base64
+from dataclasses import dataclass, field
+from operator import attrgetter
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+DEFAULT_PER_PAGE = 25
+BOOKING_KEYS = ('date', 'time', 'id')
+NOTIFICATION_KEYS = ('created_at', 'id')
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor string can't be decoded."""
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: str = ''
+    previous_cursor: str = ''
+    keys: tuple = field(default=BOOKING_KEYS, repr=False)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+
+def encode_cursor(obj, keys=BOOKING_KEYS):
+    raw = '|'.join(str(getattr(obj, key)) for key in keys)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, keys=BOOKING_KEYS):
+    """Turn a cursor back into a tuple of typed key values."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        parts = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+    if len(parts) != len(keys):
+        raise InvalidCursor(cursor)
+
+    try:
+        return tuple(
+            model._meta.get_field(key).to_python(value)
+            for key, value in zip(keys, parts)
+        )
+    except ValidationError as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+def _seek(keys, values, forward):
+    """
+    Build the row-value comparison ``(k1, k2, k3) > (v1, v2, v3)`` as a Q.
+
+    Expanded as k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... so it works on
+    every backend, including SQLite.
+    """
+    op = 'gt' if forward else 'lt'
+    condition = Q()
+    for i, key in enumerate(keys):
+        step = Q(**{f'{key}__{op}': values[i]})
+        for prev_key, prev_value in zip(keys[:i], values[:i]):
+            step &= Q(**{prev_key: prev_value})
+        condition |= step
+    return condition
+
+
+def _keyset_query(queryset, descending, after, before, per_page, keys):
+    """The sliced queryset for one page, and whether it walks backwards."""
+    model = queryset.model
+    if before:
+        values = decode_cursor(before, model, keys)
+        # Walk backwards from the cursor; _keyset_page flips the rows back
+        ordering = [key if descending else f'-{key}' for key in keys]
+        queryset = queryset.filter(_seek(keys, values, forward=descending))
+        return queryset.order_by(*ordering)[:per_page + 1], True
+    if after:
+        values = decode_cursor(after, model, keys)
+        queryset = queryset.filter(_seek(keys, values, forward=not descending))
+    ordering = [f'-{key}' if descending else key for key in keys]
+    return queryset.order_by(*ordering)[:per_page + 1], False
+
+
+def _keyset_page(rows, backwards, after, per_page, keys):
+    if backwards:
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = True
+    else:
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = bool(after)
+
+    return KeysetPage(
+        object_list=rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(rows[-1], keys) if rows else '',
+        previous_cursor=encode_cursor(rows[0], keys) if rows else '',
+        keys=keys,
+    )
+
+
+def paginate_keyset(queryset, *, descending=False, after=None, before=None,
+                    per_page=DEFAULT_PER_PAGE, keys=BOOKING_KEYS):
+    """
+    Return one KeysetPage of ``queryset`` ordered by ``keys``.
+
+    Pass the ``next_cursor`` of a page as ``after`` to get the following page,
+    or its ``previous_cursor`` as ``before`` to step back. Invalid cursors
+    raise InvalidCursor so the caller can decide to fall back to page one.
+    """
+    page, backwards = _keyset_query(queryset, descending, after, before, per_page, keys)
+    return _keyset_page(list(page), backwards, after, per_page, keys)
+
+
+async def apaginate_keyset(queryset, *, descending=False, after=None, before=None,
+                           per_page=DEFAULT_PER_PAGE, keys=BOOKING_KEYS):
+    """paginate_keyset() for async views."""
+    page, backwards = _keyset_query(queryset, descending, after, before, per_page, keys)
+    return _keyset_page([row async for row in page], backwards, after, per_page, keys)
+
+
+async def apaginate_with_history(queryset, history, *, descending=False, after=None,
+                                 before=None, per_page=DEFAULT_PER_PAGE, keys=BOOKING_KEYS):
+    """
+    One KeysetPage of ``queryset`` and ``history`` merged by ``keys``.
+
+    Archived rows keep their booking's id, so no key is in both lists and one
+    cursor positions both: each page reads up to ``per_page + 1`` rows from
+    each and keeps the first ``per_page + 1`` in order.
+    """
+    page, backwards = _keyset_query(queryset, descending, after, before, per_page, keys)
+    rows = [row async for row in page]
+    page, _ = _keyset_query(history, descending, after, before, per_page, keys)
+    rows += [row async for row in page]
+    # In the order both queries read: a backwards page reads against ``descending``
+    rows.sort(key=attrgetter(*keys), reverse=descending != backwards)
+    return _keyset_page(rows[:per_page + 1], backwards, after, per_page, keys)
+
+
+# -- Admin changelists --
+
+# Unfiltered tables at least this big get an estimated count in the admin
+ESTIMATED_COUNT_THRESHOLD = 100_000
+
+
+def estimated_count(queryset):
+    """
+    The row count of ``queryset``, estimated when the table is big.
+
+    An exact COUNT(*) reads every row, which is most of the cost of an admin
+    changelist page on a large table. For an unfiltered queryset this asks
+    for an estimate instead (the planner's pg_class.reltuples on PostgreSQL,
+    the span of row ids on SQLite), falling back to COUNT(*) in the same
+    query when the table is small or has never been analysed. Filtered
+    querysets always get an exact count, which the indexes keep bounded.
+    """
+    if queryset.query.is_sliced or queryset.query.where or queryset.query.distinct:
+        return queryset.count()
+    connection = connections[queryset.db]
+    table = connection.ops.quote_name(queryset.model._meta.db_table)
+    if connection.vendor == 'postgresql':
+        estimate = 'SELECT reltuples FROM pg_class WHERE oid = %s::regclass'
+        params = [queryset.model._meta.db_table]
+    elif connection.vendor == 'sqlite':
+        # Both ends of the rowid b-tree are one seek each. Ids are never
+        # reused and retention deletes the oldest rows, so the span is close
+        estimate = f'SELECT MAX(rowid) - MIN(rowid) + 1 FROM {table}'
+        params = []
+    else:
+        return queryset.count()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT CASE WHEN ({estimate}) >= %s THEN ({estimate}) '
+            f'ELSE (SELECT COUNT(*) FROM {table}) END',
+            [*params, ESTIMATED_COUNT_THRESHOLD, *params])
+        return int(cursor.fetchone()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Django's Paginator, counting with estimated_count()."""
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
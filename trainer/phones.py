@@ -0,0 +1,50 @@
+# trainer/phones.py
+"""
+Irish phone numbers, validated once and stored in E.164.
+
+``client_contact`` keeps whatever the trainer typed ("087 123 4567",
+"+353 87 123 4567", ...). ``Booking.client_phone`` holds the same number as
+"+353871234567", filled in by NormalizedPhoneField on every save and
+bulk_create, so a lookup by phone is an exact match on an indexed column
+instead of a substring scan over free text.
+"""
+import re
+
+from django.db import models
+
+_SEPARATORS = re.compile(r'[\s\-().]')
+# +353 / 353 / 0 followed by the 9-digit national number
+_IRISH_NUMBER = re.compile(r'(?:\+353|353|0)([0-9]{9})')
+
+
+def normalize_phone(value):
+    """``value`` as an E.164 string, or '' if it isn't an Irish number."""
+    if not value:
+        return ''
+    match = _IRISH_NUMBER.fullmatch(_SEPARATORS.sub('', value))
+    return f'+353{match.group(1)}' if match else ''
+
+
+class NormalizedPhoneField(models.CharField):
+    """
+    A CharField that copies ``source`` in E.164 form whenever the row is
+    written by save() or bulk_create(). QuerySet.update() skips it, so bulk
+    updates of the source field must set this one too.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('max_length', 16)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def pre_save(self, model_instance, add):
+        value = normalize_phone(getattr(model_instance, self.source))
+        setattr(model_instance, self.attname, value)
+        return value
@@ -0,0 +1,117 @@
+# trainer/reminders.py
+"""
+Session reminders for confirmed bookings.
+
+Bookings store a wall-clock ``date``/``time`` in the project time zone
+(Europe/Dublin). Each window is turned into a pair of wall-clock bounds
+from real instants, so a "24 hours ahead" sweep across a DST change still
+covers exactly 24 real hours.
+
+A sweep claims bookings by inserting Reminder rows stamped with its own
+UUID; the unique (booking, window) constraint means a booking can only be
+claimed once, however many sweeps overlap. The SMS/email jobs are queued
+in the same transaction as the claim, so a reminder is either recorded
+and queued or neither.
+"""
+import datetime
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .jobs import enqueue_many
+from .models import Booking, Reminder
+
+DEFAULT_WINDOWS = (24, 2)
+BATCH_SIZE = 500
+
+
+def windows():
+    """``[(label, hours)]`` from REMINDER_WINDOWS, widest first."""
+    hours = sorted(getattr(settings, 'REMINDER_WINDOWS', DEFAULT_WINDOWS), reverse=True)
+    return [(f'{h}h', h) for h in hours]
+
+
+def _after(moment):
+    """Bookings whose wall-clock start is at or after local ``moment``."""
+    return Q(date__gt=moment.date()) | Q(date=moment.date(), time__gte=moment.time())
+
+
+def _before(moment):
+    return Q(date__lt=moment.date()) | Q(date=moment.date(), time__lt=moment.time())
+
+
+def due(label, hours, next_hours, now):
+    """
+    Confirmed bookings starting between ``next_hours`` and ``hours`` from now.
+
+    Bands don't overlap, so a booking made at short notice gets only the
+    reminders that still make sense. Already-reminded bookings are skipped.
+    """
+    lower = timezone.localtime(now + datetime.timedelta(hours=next_hours))
+    upper = timezone.localtime(now + datetime.timedelta(hours=hours))
+    return (
+        Booking.objects
+        .filter(_after(lower) & _before(upper), status='confirmed')
+        .filter(Q(client_contact__gt='') | Q(client__email__gt=''))
+        .exclude(reminders__window=label)
+    )
+
+
+def _message(date, time):
+    return f"Reminder: you have a training session on {date:%a %b %d} at {time:%H:%M}."
+
+
+def send_batch(label, rows):
+    """
+    Claim ``rows`` for this window and queue their messages.
+
+    Returns how many bookings this call claimed (others may have been
+    claimed by an overlapping sweep in the meantime).
+    """
+    claim = uuid.uuid4()
+    with transaction.atomic():
+        Reminder.objects.bulk_create(
+            [Reminder(booking_id=row[0], window=label, claim=claim) for row in rows],
+            ignore_conflicts=True,
+        )
+        mine = set(
+            Reminder.objects.filter(claim=claim).values_list('booking_id', flat=True))
+
+        texts, emails = [], []
+        for booking_id, date, time, contact, email in rows:
+            if booking_id not in mine:
+                continue
+            body = _message(date, time)
+            if contact:
+                texts.append({'to': contact, 'body': body})
+            if email:
+                emails.append({'to': email, 'subject': "Session reminder", 'body': body})
+        enqueue_many('sms.send', texts)
+        enqueue_many('email.send', emails)
+    return len(mine)
+
+
+def sweep(now=None, batch_size=BATCH_SIZE):
+    """Queue every reminder that is due; returns ``{window: count}``."""
+    now = now or timezone.now()
+    sent = {}
+    bands = windows()
+    for i, (label, hours) in enumerate(bands):
+        next_hours = bands[i + 1][1] if i + 1 < len(bands) else 0
+        rows = (
+            due(label, hours, next_hours, now)
+            .order_by('id')
+            .values_list('id', 'date', 'time', 'client_contact', 'client__email')
+        )
+        sent[label] = 0
+        last_id = 0
+        while True:
+            batch = list(rows.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            sent[label] += send_batch(label, batch)
+            last_id = batch[-1][0]
+    return sent
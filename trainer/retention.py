@@ -0,0 +1,80 @@
+# trainer/retention.py
+"""
+Retention for read notifications.
+
+Old read notifications are removed a small batch at a time, each batch in
+its own short transaction, so the purge never holds locks on the table for
+long while trainers are using it. Batches walk forward by primary key, so
+each one starts where the last stopped instead of rescanning deleted rows.
+Rows can be written out as NDJSON first when they need to be kept.
+"""
+import datetime
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .models import Notification
+
+DEFAULT_RETENTION_DAYS = 90
+PURGE_BATCH_SIZE = 500
+
+ARCHIVE_FIELDS = [
+    'id', 'recipient_id', 'notification_type', 'message', 'client_name',
+    'booking_date', 'booking_time', 'created_at', 'event_count', 'bookings',
+]
+
+
+def cutoff(days=None, now=None):
+    """The instant before which read notifications may be purged."""
+    if days is None:
+        days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return (now or timezone.now()) - datetime.timedelta(days=days)
+
+
+def expired(before):
+    return Notification.objects.filter(is_read=True, created_at__lt=before)
+
+
+def _archive_line(row):
+    record = dict(zip(ARCHIVE_FIELDS, row))
+    for name in ('booking_date', 'booking_time', 'created_at'):
+        if record[name] is not None:
+            record[name] = record[name].isoformat()
+    return json.dumps(record) + '\n'
+
+
+def purge_notifications(before, batch_size=PURGE_BATCH_SIZE, archive=None,
+                        pause=0.0, dry_run=False):
+    """
+    Delete read notifications created before ``before``; returns the count.
+
+    ``archive`` is an optional text file that receives each batch as NDJSON
+    before it is deleted. ``pause`` sleeps between batches to leave room for
+    other writers.
+    """
+    rows = expired(before).order_by('id').values_list(*ARCHIVE_FIELDS)
+    purged = 0
+    last_id = 0
+    while True:
+        batch = list(rows.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return purged
+        last_id = batch[-1][0]
+
+        if dry_run:
+            purged += len(batch)
+            continue
+
+        if archive is not None:
+            archive.writelines(_archive_line(row) for row in batch)
+            archive.flush()
+        ids = [row[0] for row in batch]
+        with transaction.atomic():
+            purged += expired(before).filter(id__in=ids).delete()[0]
+            search.reindex(Notification, ids)
+        if pause:
+            time.sleep(pause)
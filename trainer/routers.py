@@ -0,0 +1,107 @@
+# trainer/routers.py
+"""
+Read replicas with read-your-writes.
+
+ReplicaRouter sends reads to one of the READ_REPLICAS and every write to
+the primary (``default``). Replicas lag the primary a little, so reads are
+only sent there when they can't trip over that lag:
+
+* only during a web request that ReadReplicaMiddleware is handling, and
+  only for safe methods (GET, HEAD, OPTIONS); commands, the job worker and
+  form POSTs always read the primary;
+* never inside a transaction, which lives on the primary;
+* never once the request has written anything, and, through a short-lived
+  cookie, not for REPLICA_PIN_SECONDS after the user's last write, so
+  someone who has just booked or signed up sees their own change.
+
+With no READ_REPLICAS configured the router changes nothing.
+"""
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+DEFAULT_PIN_SECONDS = 10
+
+
+class RequestRouting:
+    """Where the current request's reads go; the router flips it on a write."""
+
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+
+# A mutable object rather than a flag, so a write made in a thread
+# (sync_to_async) still pins the request that owns it
+_request = ContextVar('replica_routing', default=None)
+_force_primary = ContextVar('force_primary', default=False)
+
+
+def replicas():
+    return getattr(settings, 'READ_REPLICAS', [])
+
+
+def pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def pinned(request):
+    """Whether ``request`` carries an unexpired PIN_COOKIE."""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def begin_request(routing):
+    return _request.set(routing)
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside this block, e.g. to fill a cache."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        routing = _request.get()
+        if (not aliases or routing is None or routing.primary or _force_primary.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None:
+            routing.primary = routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        pool = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas copy the primary's schema; never migrate them directly
+        if db in replicas():
+            return False
+        return None
+
@@ -0,0 +1,140 @@
+# trainer/search.py
+"""
+Full-text search over bookings and notifications.
+
+One API, two engines:
+
+* PostgreSQL: a GIN index on ``to_tsvector('english', ...)`` of the
+  searched columns, queried with the identical SearchVector expression so
+  the planner uses it, and ranked with SearchRank. PostgreSQL keeps the
+  index up to date by itself.
+* SQLite: an FTS5 table per model, ranked with bm25(). Rows are re-indexed
+  one at a time from the post_save/post_delete signals, and code doing
+  bulk_create() or QuerySet.update() on searched fields calls
+  ``reindex()`` for the rows it touched. (Triggers would be tidier, but
+  an FTS5 write inside a trigger makes concurrent SQLite writers fail with
+  "database is locked" instead of waiting their turn.)
+
+Other backends fall back to ``icontains``. Queries are split into words and
+every word must match as a prefix, so "jo leg" finds "John" with "Leg day"
+on every engine.
+"""
+import re
+
+from django.db import connections, router
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Booking, Notification
+
+MAX_TERMS = 8
+REINDEX_BATCH_SIZE = 500
+_WORD = re.compile(r'\w+')
+
+# Searched columns per model. Migration 0016 built the FTS5 tables and GIN
+# indexes from a frozen copy of this, so changing it needs a new migration
+SEARCH_FIELDS = {
+    Booking: ('client_name', 'client_contact', 'notes'),
+    Notification: ('client_name', 'message'),
+}
+
+
+def terms(query):
+    return _WORD.findall(query.lower())[:MAX_TERMS]
+
+
+def _fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+# -- Index setup and maintenance --
+
+def _pg_vector(model):
+    # The same expression as the GIN index, so the planner can use it
+    from django.contrib.postgres.search import SearchVector
+    return SearchVector(*SEARCH_FIELDS[model], config='english')
+
+
+def reindex(model, pks=None, conn=None):
+    """
+    Refresh the SQLite index for ``pks`` (every row when None).
+
+    Rows that no longer exist are dropped from the index. A no-op on other
+    databases, whose indexes maintain themselves.
+    """
+    conn = conn or connections[router.db_for_write(model)]
+    if conn.vendor != 'sqlite' or model not in SEARCH_FIELDS:
+        return
+    pks = None if pks is None else list(pks)
+    if pks == []:
+        return
+    fts, table = _fts_table(model), model._meta.db_table
+    columns = ', '.join(SEARCH_FIELDS[model])
+    with conn.cursor() as cursor:
+        for start in range(0, 1 if pks is None else len(pks), REINDEX_BATCH_SIZE):
+            if pks is None:
+                where, params = '', []
+            else:
+                batch = pks[start:start + REINDEX_BATCH_SIZE]
+                where = f"WHERE {{}} IN ({', '.join(['%s'] * len(batch))})"
+                params = batch
+            cursor.execute(f"DELETE FROM {fts} {where.format('rowid')}", params)
+            cursor.execute(
+                f"INSERT INTO {fts}(rowid, {columns}) "
+                f"SELECT id, {columns} FROM {table} {where.format('id')}", params)
+
+
+# -- Queries --
+
+def _search_postgres(queryset, words):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+    query = SearchQuery(' & '.join(f'{w}:*' for w in words), search_type='raw', config='english')
+    vector = _pg_vector(queryset.model)
+    return (
+        queryset.annotate(search=vector)
+        .filter(search=query)
+        .annotate(rank=SearchRank(vector, query))
+        .order_by('-rank', '-pk')
+    )
+
+
+def _search_sqlite(queryset, words):
+    fts = _fts_table(queryset.model)
+    table = queryset.model._meta.db_table
+    match = ' '.join(f'"{w}"*' for w in words)
+    # bm25() is lower for better matches; negate so higher rank is better
+    rank = RawSQL(
+        f"SELECT -bm25({fts}) FROM {fts} WHERE {fts} MATCH %s AND {fts}.rowid = {table}.id",
+        [match], output_field=FloatField())
+    return (
+        queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [match]))
+        .annotate(rank=rank)
+        .order_by('-rank', '-pk')
+    )
+
+
+def _search_fallback(queryset, words):
+    for word in words:
+        condition = Q()
+        for field in SEARCH_FIELDS[queryset.model]:
+            condition |= Q(**{f'{field}__icontains': word})
+        queryset = queryset.filter(condition)
+    return queryset.annotate(rank=Value(0.0)).order_by('-pk')
+
+
+def search(queryset, query):
+    """
+    ``queryset`` narrowed to rows matching ``query``, best matches first.
+
+    Rows get a ``rank`` annotation (higher is better). An empty query
+    matches nothing.
+    """
+    words = terms(query)
+    if not words:
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgres(queryset, words)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, words)
+    return _search_fallback(queryset, words)
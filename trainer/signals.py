@@ -0,0 +1,76 @@
+# trainer/signals.py
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import archive, search, stats
+from .fragments import forget_row
+from .models import Booking, BookingArchive, Notification
+from .notifications import badge_changed_on_commit
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw=False, **kwargs):
+    """New or re-read notifications change the trainer's unread badge."""
+    badge_changed_on_commit(instance.recipient_id)
+    if created and not raw:
+        search.reindex(sender, [instance.pk])
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, raw=False, **kwargs):
+    """Refresh clients' pending badges, the trainer's stats and the cached row."""
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded', None) or {}
+    badge_changed_on_commit(instance.client_id, loaded.get('client_id'))
+    stats.booking_saved(instance, created)
+    forget_row(instance.pk, loaded.get('updated_at'))
+    search.reindex(sender, [instance.pk])
+    # The saved state is the baseline for the next save of this instance
+    instance._loaded = instance.snapshot()
+
+
+@receiver(post_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    if archive.is_moving():
+        # Still a session: archive_bookings() keeps it counted and reindexes per batch
+        return
+    loaded = getattr(instance, '_loaded', None) or {}
+    badge_changed_on_commit(instance.client_id, loaded.get('client_id'))
+    stats.booking_deleted(instance)
+    forget_row(instance.pk, loaded.get('updated_at', instance.updated_at))
+    search.reindex(sender, [instance.pk])
+
+
+# What booking rows and calendar feeds show of a user: the client's name and
+# email in the cached rows, the trainer's name in clients' feeds
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Note whether the save changes anything a booking row or feed shows."""
+    instance._display_changed = False
+    if raw or instance.pk is None:
+        return
+    fields = [name for name in DISPLAYED_USER_FIELDS
+              if update_fields is None or name in update_fields]
+    if not fields:
+        return
+    stored = User.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._display_changed = stored is not None and any(
+        stored[name] != getattr(instance, name) for name in fields)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """Re-render the booking rows and feeds that show a renamed user."""
+    if raw or created or not getattr(instance, '_display_changed', False):
+        return
+    instance._display_changed = False
+    now = timezone.now()
+    Booking.objects.filter(Q(client=instance) | Q(trainer=instance)).update(updated_at=now)
+    BookingArchive.objects.filter(client=instance).update(updated_at=now)
@@ -0,0 +1,55 @@
+# trainer/sms.py
+"""
+Pluggable SMS sending, modelled on Django's email backends.
+
+Set ``SMS_BACKEND`` to a dotted path. The console and file backends let
+everything run offline; ``LocmemBackend`` collects messages in ``outbox``
+for tests. A real provider only needs a class with ``send(to, body)``.
+"""
+import json
+import logging
+import sys
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Filled by LocmemBackend, like django.core.mail.outbox
+outbox = []
+
+
+class ConsoleBackend:
+    def send(self, to, body):
+        sys.stdout.write(f"SMS to {to}: {body}\n")
+
+
+class FileBackend:
+    """Append one JSON line per message to ``SMS_FILE_PATH``."""
+
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'SMS_FILE_PATH', 'sms.log')
+
+    def send(self, to, body):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'to': to,
+                'body': body,
+                'sent_at': timezone.now().isoformat(),
+            }) + '\n')
+
+
+class LocmemBackend:
+    def send(self, to, body):
+        outbox.append({'to': to, 'body': body})
+
+
+def get_backend():
+    path = getattr(settings, 'SMS_BACKEND', 'trainer.sms.ConsoleBackend')
+    return import_string(path)()
+
+
+def send_sms(to, body):
+    logger.info("Sending SMS to %s", to)
+    get_backend().send(to, body)
@@ -0,0 +1,202 @@
+# trainer/stats.py
+"""
+Trainer utilisation analytics.
+
+BookingStat holds booking counts per (trainer, day, hour, status). Single
+booking saves and deletes adjust it by ±1 from model signals; bulk writes
+(series, imports) call ``refresh_days()`` for just the days they touched;
+``rebuild()`` recomputes the lot. Sessions moved to BookingArchive stay
+counted, so both recomputes read the archive too. The dashboard reads only this table, then
+NumPy turns the rows into weekly totals and a weekday × hour heatmap.
+"""
+import datetime
+from collections import Counter
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .models import Booking, BookingArchive, BookingStat
+
+STATUSES = [status for status, _ in Booking._meta.get_field('status').choices]
+
+
+def _key(values):
+    """The BookingStat key for a Booking snapshot, or None if unassigned."""
+    date, time = values.get('date'), values.get('time')
+    if not values.get('trainer_id') or not date or time is None:
+        return None
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    if isinstance(time, str):
+        time = datetime.time.fromisoformat(time)
+    return {
+        'trainer_id': values['trainer_id'],
+        'date': date,
+        'hour': time.hour,
+        'status': values['status'],
+    }
+
+
+def adjust(key, delta):
+    """Add ``delta`` to one counter, creating the row on first use."""
+    if key is None or not delta:
+        return
+    counters = BookingStat.objects.filter(**key)
+    if counters.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            BookingStat.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Someone else created it between our UPDATE and INSERT
+        counters.update(count=F('count') + delta)
+
+
+def booking_saved(booking, created):
+    new = _key(booking.snapshot())
+    if created:
+        adjust(new, 1)
+        return
+
+    loaded = getattr(booking, '_loaded', None)
+    if loaded is None:
+        # Saved without being loaded first; we don't know what it was before
+        if new:
+            refresh_days(new['trainer_id'], [new['date']])
+        return
+
+    old = _key(loaded)
+    if old != new:
+        adjust(old, -1)
+        adjust(new, 1)
+
+
+def booking_deleted(booking):
+    adjust(_key(getattr(booking, '_loaded', None) or booking.snapshot()), -1)
+
+
+def _aggregate(bookings):
+    return (
+        bookings
+        .filter(trainer__isnull=False)
+        .order_by()
+        .values('trainer_id', 'date', 'status', hour=ExtractHour('time'))
+        .annotate(count=Count('id'))
+        .values_list('trainer_id', 'date', 'hour', 'status', 'count')
+    )
+
+
+def _with_archive(bookings, archived):
+    """Counter rows for live and archived bookings added together."""
+    # Deleted bookings were subtracted when they were deleted
+    archived = archived.filter(reason='archived')
+    totals = Counter()
+    for rows in (_aggregate(bookings).iterator(chunk_size=5000),
+                 _aggregate(archived).iterator(chunk_size=5000)):
+        for trainer_id, date, hour, status, count in rows:
+            totals[trainer_id, date, hour, status] += count
+    return [(*key, count) for key, count in totals.items()]
+
+
+def _insert(rows, batch_size=1000):
+    BookingStat.objects.bulk_create(
+        [
+            BookingStat(trainer_id=t, date=d, hour=h, status=s, count=n)
+            for t, d, h, s, n in rows
+        ],
+        batch_size=batch_size,
+    )
+
+
+def refresh_days(trainer_id, dates):
+    """
+    Recompute one trainer's counters for the given days.
+
+    Bulk writes skip model signals, so code doing them calls this in the
+    same transaction.
+    """
+    dates = set(dates)
+    if not trainer_id or not dates:
+        return
+    with transaction.atomic():
+        BookingStat.objects.filter(trainer_id=trainer_id, date__in=dates).delete()
+        _insert(_with_archive(
+            Booking.objects.filter(trainer_id=trainer_id, date__in=dates),
+            BookingArchive.objects.filter(trainer_id=trainer_id, date__in=dates)))
+
+
+def rebuild():
+    """Throw the summary away and recompute it from every booking, live or archived."""
+    with transaction.atomic():
+        BookingStat.objects.all().delete()
+        _insert(_with_archive(Booking.objects.all(), BookingArchive.objects.all()))
+    return BookingStat.objects.count()
+
+
+def dashboard(trainer, weeks=12, today=None):
+    """Utilisation figures for the last ``weeks`` weeks, from BookingStat only."""
+    today = today or timezone.localdate()
+    # Whole Monday-to-Sunday weeks ending with the current one
+    start = today - datetime.timedelta(days=today.weekday(), weeks=weeks - 1)
+    end = start + datetime.timedelta(weeks=weeks, days=-1)
+
+    rows = list(
+        BookingStat.objects
+        .filter(trainer=trainer, date__range=(start, end))
+        .values_list('date', 'hour', 'status', 'count')
+    )
+    counts = np.zeros((weeks * 7, 24, len(STATUSES)), dtype=np.int64)
+    if rows:
+        dates, hours, statuses, values = zip(*rows)
+        day = (np.array(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.intp)
+        status = np.array([STATUSES.index(s) for s in statuses], dtype=np.intp)
+        np.add.at(counts, (day, np.array(hours, dtype=np.intp), status), values)
+
+    booked = counts[..., STATUSES.index('pending')] + counts[..., STATUSES.index('confirmed')]
+    cancelled = counts[..., STATUSES.index('cancelled')]
+    total = int(counts.sum())
+
+    # (weeks, 7 weekdays, 24 hours) — days run Monday first from `start`
+    by_week = booked.reshape(weeks, 7, 24)
+    heatmap = by_week.sum(axis=0)
+    peak = heatmap.max()
+
+    past = np.arange(weeks * 7) < (today - start).days
+    per_status = counts.sum(axis=(0, 1))
+
+    weekly = by_week.sum(axis=(1, 2))
+    busiest_week = weekly.max()
+
+    return {
+        'start': start,
+        'end': end,
+        'weeks': [
+            {
+                'start': start + datetime.timedelta(weeks=w),
+                'sessions': int(n),
+                'share': float(n / busiest_week) if busiest_week else 0.0,
+            }
+            for w, n in enumerate(weekly)
+        ],
+        'total': total,
+        'cancellation_rate': float(cancelled.sum() / total) if total else 0.0,
+        'busiest_hours': [
+            {'hour': int(h), 'sessions': int(heatmap[:, h].sum())}
+            for h in np.argsort(heatmap.sum(axis=0))[::-1][:3]
+            if heatmap[:, h].sum()
+        ],
+        # One row per weekday, Monday first
+        'heatmap': [
+            [
+                {'count': int(n), 'intensity': float(n / peak) if peak else 0.0}
+                for n in heatmap[weekday]
+            ]
+            for weekday in range(7)
+        ],
+        # Completed confirmed sessions are ready to invoice
+        'billable': int(counts[past, :, STATUSES.index('confirmed')].sum()),
+        'by_status': dict(zip(STATUSES, (int(n) for n in per_status))),
+    }
@@ -1,3 +1,1691 @@
-from django.test import TestCase  # noqa: F401
+import asyncio
+import csv
+import datetime
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import SyncToAsync, async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection, connections, models
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    archive, benchmarks, booking_io, bulk, digests, events, fragments, ical, jobs, loadgen,
+    metrics, notifications, pagination, reminders, retention, routers, search, sms, stats, views,
+)
+
+from .availability import MAX_SEARCH_DAYS, free_slots, slots_outside_hours
+from .forms import BookingForm
+from .middleware import QUERY_BUDGETS
+from .models import (
+    Booking, BookingArchive, BookingStat, Job, Notification, Reminder, TrainerAvailability,
+)
+from .pagination import DEFAULT_PER_PAGE
+from .phones import normalize_phone
+
+
+# Plain HTTP and no collectstatic manifest in the test runner
+web_settings = override_settings(
+    SECURE_SSL_REDIRECT=False,
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+)
+
+
+def make_trainer(username='trainer', **kwargs):
+    return User.objects.create_user(
+        username, password='pass', is_staff=True, **kwargs)
+
+
+def make_client(username='client', **kwargs):
+    return User.objects.create_user(
+        username, password='pass', first_name=username.title(),
+        email=f'{username}@example.com', **kwargs)
+
+
+def make_bookings(trainer, clients, count, start=None):
+    if start is None:
+        # Carry on after the trainer's last booking so slots never clash
+        last = trainer.bookings.order_by('-date').values_list('date', flat=True).first()
+        start = max(last or datetime.date.today(), datetime.date.today())
+        start += datetime.timedelta(days=1)
+    return Booking.objects.bulk_create([
+        Booking(
+            trainer=trainer,
+            client=clients[i % len(clients)],
+            client_name=clients[i % len(clients)].username,
+            date=start + datetime.timedelta(days=i // 4),
+            time=datetime.time(8 + i % 4),
+            notes='Leg day',
+        )
+        for i in range(count)
+    ])
+
+
+@web_settings
+class QueryBudgetTests(TestCase):
+    """Each view must run a fixed number of queries whatever the row count."""
+
+    def setUp(self):
+        self.trainer = make_trainer(is_superuser=True)
+        self.clients = [make_client(f'client{i}') for i in range(5)]
+        self.client.force_login(self.trainer)
+
+    def add_rows(self, count):
+        make_bookings(self.trainer, self.clients, count)
+        Notification.objects.bulk_create([
+            Notification(
+                recipient=self.trainer,
+                notification_type='booking_cancelled',
+                message='Client has cancelled their booking',
+            )
+            for _ in range(count)
+        ])
+
+    def count_queries(self, url):
+        # bulk_create skips signals, so measure the uncached path every time
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertWithinBudget(self, view_name, url):
+        self.add_rows(2)
+        small = self.count_queries(url)
+        self.add_rows(20)
+        large = self.count_queries(url)
+
+        self.assertEqual(small, large, f'{view_name} scales with row count')
+        self.assertLessEqual(large, QUERY_BUDGETS[view_name])
+
+    def test_booking_list(self):
+        self.assertWithinBudget(
+            'trainer:booking_list', reverse('trainer:booking_list'))
+
+    def test_client_detail(self):
+        self.assertWithinBudget(
+            'trainer:client_detail',
+            reverse('trainer:client_detail', args=[self.clients[0].id]))
+
+    def test_notifications_list(self):
+        self.assertWithinBudget(
+            'trainer:notifications_list',
+            reverse('trainer:notifications_list'))
+
+    def test_check_notifications(self):
+        self.assertWithinBudget(
+            'trainer:check_notifications',
+            reverse('trainer:check_notifications'))
+
+    def test_booking_changelist(self):
+        self.assertWithinBudget(
+            'admin:trainer_booking_changelist',
+            reverse('admin:trainer_booking_changelist'))
+
+    def test_notification_changelist(self):
+        self.assertWithinBudget(
+            'admin:trainer_notification_changelist',
+            reverse('admin:trainer_notification_changelist'))
+
+    def test_str_never_loads_related_users(self):
+        self.add_rows(1)
+        booking, notification = Booking.objects.first(), Notification.objects.first()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(booking), f'client0 → trainer #{self.trainer.pk}')
+            self.assertIn(f'for user #{self.trainer.pk}', str(notification))
+
+        booking = Booking.objects.select_related('trainer').first()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(booking), 'client0 → trainer')
+
+    def test_only_reads_are_held_to_the_budget(self):
+        self.add_rows(20)
+        changelist = reverse('admin:trainer_booking_changelist')
+        with self.assertNoLogs('trainer.middleware', 'WARNING'):
+            self.client.post(changelist, {
+                'action': 'cancel_bookings',
+                '_selected_action': list(Booking.objects.values_list('pk', flat=True)),
+            })
+        self.assertFalse(Booking.objects.filter(status='pending').exists())
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('trainer:booking_list'))
+        self.assertIn('queries', response['Server-Timing'])
+
+
+@web_settings
+class NotificationBadgeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = make_trainer()
+        self.client.force_login(self.trainer)
+        self.url = reverse('trainer:check_notifications')
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(
+                recipient=self.trainer,
+                notification_type='booking_cancelled',
+                message='Client has cancelled their booking',
+                client_name='Client',
+            )
+
+    def test_unchanged_poll_is_not_modified_without_badge_queries(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        tables = ' '.join(q['sql'] for q in ctx.captured_queries)
+        self.assertNotIn('trainer_notification', tables)
+
+    def test_new_notification_changes_etag(self):
+        first = self.client.get(self.url)
+        self.notify()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+
+    def test_marking_read_clears_cached_count(self):
+        self.notify()
+        self.assertEqual(self.client.get(self.url).json()['count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('trainer:notifications_list'))
+
+        self.assertEqual(self.client.get(self.url).json()['count'], 0)
+
+
+@web_settings
+class NotificationInboxTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.client.force_login(self.trainer)
+        Notification.objects.bulk_create([
+            Notification(recipient=self.trainer, notification_type='booking_created',
+                         message=f'Booking {i}')
+            for i in range(DEFAULT_PER_PAGE + 5)
+        ])
+
+    def test_only_the_displayed_page_is_marked_read(self):
+        response = self.client.get(reverse('trainer:notifications_list'))
+
+        self.assertEqual(len(response.context['page']), DEFAULT_PER_PAGE)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 5)
+
+        self.client.get(reverse('trainer:notifications_list'),
+                        {'after': response.context['page'].next_cursor})
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_purge_removes_old_read_notifications_in_batches(self):
+        old = timezone.now() - datetime.timedelta(days=200)
+        Notification.objects.filter(message__in=['Booking 0', 'Booking 1', 'Booking 2']) \
+            .update(created_at=old, is_read=True)
+        Notification.objects.filter(message='Booking 3').update(created_at=old)
+
+        with CaptureQueriesContext(connection) as ctx:
+            purged = retention.purge_notifications(retention.cutoff(90), batch_size=2)
+
+        self.assertEqual(purged, 3)
+        deletes = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('DELETE FROM "trainer_notification"')]
+        self.assertEqual(len(deletes), 2)
+        # Unread notifications are kept however old they are
+        self.assertTrue(Notification.objects.filter(message='Booking 3').exists())
+
+
+@web_settings
+class BookingRowCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = make_trainer()
+        self.row_client = make_client()
+        self.booking = make_bookings(self.trainer, [self.row_client], 1)[0]
+        self.client.force_login(self.trainer)
+        self.url = reverse('trainer:booking_list')
+
+    def test_edit_replaces_cached_row(self):
+        self.client.get(self.url)
+        booking = Booking.objects.get()
+        old_keys = fragments.row_keys(booking.pk, booking.updated_at)
+        self.assertTrue(cache.get(old_keys[0]))
+
+        booking.notes = 'Upper body'
+        booking.save()
+
+        self.assertIsNone(cache.get(old_keys[0]))
+        self.assertContains(self.client.get(self.url), 'Upper body')
+
+    def test_client_rename_refreshes_their_rows(self):
+        self.client.get(self.url)
+        self.row_client.first_name = 'Renamed'
+        self.row_client.save()
+
+        self.assertContains(self.client.get(self.url), 'Renamed')
+
+    def test_only_displayed_user_fields_touch_bookings(self):
+        stamp = Booking.objects.get().updated_at
+        self.row_client.set_password('changed')
+        self.row_client.is_active = False
+        self.row_client.save()
+        self.row_client.first_name = self.row_client.first_name
+        self.row_client.save(update_fields=['first_name'])
+        self.assertEqual(Booking.objects.get().updated_at, stamp)
+
+        # The trainer's name is in their clients' calendar feeds
+        self.trainer.last_name = 'Renamed'
+        self.trainer.save()
+        self.assertGreater(Booking.objects.get().updated_at, stamp)
+
+
+@web_settings
+class ClientSearchTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer(first_name='Annie')
+        self.annie = make_client('annie', last_name='Murphy')
+        make_client('anna')
+        make_client('brian')
+        self.client.force_login(self.trainer)
+        self.url = reverse('trainer:client_search')
+
+    def search(self, q, **params):
+        return self.client.get(self.url, {'q': q, **params}).json()['results']
+
+    def test_prefix_search_over_names_and_email(self):
+        self.assertEqual([r['label'] for r in self.search('ann')], ['Anna', 'Annie Murphy'])
+        self.assertEqual([r['id'] for r in self.search('annie mur')], [self.annie.pk])
+        self.assertEqual(len(self.search('ann', limit=1)), 1)
+        # Too short to be useful, and trainers are never offered
+        self.assertEqual(self.search('a'), [])
+        self.assertNotIn(self.trainer.pk, [r['id'] for r in self.search('annie')])
+
+    def test_form_renders_no_client_options_but_still_validates(self):
+        response = self.client.get(reverse('trainer:booking_create'))
+        self.assertNotContains(response, '<option value="%d"' % self.annie.pk)
+
+        data = {
+            'date': datetime.date.today() + datetime.timedelta(days=1),
+            'time': '09:00', 'status': 'pending',
+        }
+        self.assertTrue(BookingForm(dict(data, client=self.annie.pk), user=self.trainer).is_valid())
+        form = BookingForm(dict(data, client=self.trainer.pk), user=self.trainer)
+        self.assertIn('client', form.errors)
+
+
+@web_settings
+class PhoneLookupTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer(is_superuser=True)
+        self.client.force_login(self.trainer)
+        first, second = make_bookings(self.trainer, [make_client()], 2)
+        first.client_contact = '087 123 4567'
+        first.save()
+        self.match = first
+
+    def test_contact_is_stored_in_e164(self):
+        self.assertEqual(Booking.objects.get(pk=self.match.pk).client_phone, '+353871234567')
+        self.assertEqual(normalize_phone('(01) 234-5678'), '')
+        self.assertEqual(normalize_phone('+353 87 123 4567'), '+353871234567')
+
+    def test_trainer_and_admin_find_bookings_by_any_format(self):
+        response = self.client.get(reverse('trainer:booking_list'), {'phone': '+353 87-123-4567'})
+        self.assertEqual([b.pk for b in response.context['page']], [self.match.pk])
+
+        response = self.client.get(
+            reverse('admin:trainer_booking_changelist'), {'q': '0871234567'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.match])
+
+
+@web_settings
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer(is_superuser=True)
+        self.client.force_login(self.trainer)
+        self.legs, self.arms, self.other = make_bookings(self.trainer, [make_client()], 3)
+        self.legs.notes = 'Leg day, then squats and lunges'
+        self.legs.save()
+        self.arms.notes = 'Arms; squat rack if free'
+        self.arms.save()
+
+    def test_ranked_prefix_search_follows_updates(self):
+        results = list(search.search(Booking.objects.all(), 'squat'))
+        self.assertEqual({b.pk for b in results}, {self.legs.pk, self.arms.pk})
+
+        self.assertEqual([b.pk for b in search.search(Booking.objects.all(), 'lung leg')],
+                         [self.legs.pk])
+        self.other.notes = 'Lunges only'
+        self.other.save()
+        self.assertEqual({b.pk for b in search.search(Booking.objects.all(), 'lunges')},
+                         {self.legs.pk, self.other.pk})
+        self.other.delete()
+        self.assertEqual([b.pk for b in search.search(Booking.objects.all(), 'only')], [])
+
+    def test_search_view_and_admin(self):
+        response = self.client.get(reverse('trainer:search'), {'q': 'leg lunges'})
+        self.assertEqual([b.pk for b in response.context['page']], [self.legs.pk])
+
+        response = self.client.get(reverse('admin:trainer_booking_changelist'), {'q': 'arms'})
+        self.assertEqual(list(response.context['cl'].result_list), [self.arms])
+
+
+@web_settings
+class AdminChangelistTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer(is_superuser=True)
+        self.client.force_login(self.trainer)
+        self.bookings = make_bookings(self.trainer, [make_client()], 6)
+        stats.rebuild()
+
+    def run_action(self, model, action, pks):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse(f'admin:trainer_{model}_changelist'),
+                {'action': action, '_selected_action': pks})
+        self.assertEqual(response.status_code, 302)
+        return [q['sql'] for q in ctx.captured_queries
+                if q['sql'].startswith(f'UPDATE "trainer_{model}"')]
+
+    def test_status_actions_are_one_update(self):
+        first, second = self.bookings[:2]
+        Booking.objects.filter(pk=second.pk).update(status='cancelled')
+
+        updates = self.run_action('booking', 'confirm_bookings', [b.pk for b in self.bookings])
+        self.assertEqual(len(updates), 1)
+        # Cancelled bookings are not revived by a bulk confirm
+        self.assertEqual(Booking.objects.get(pk=second.pk).status, 'cancelled')
+        self.assertEqual(Booking.objects.filter(status='confirmed').count(), 5)
+
+        updates = self.run_action('booking', 'cancel_bookings', [first.pk])
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Booking.objects.get(pk=first.pk).status, 'cancelled')
+
+        incremental = set(BookingStat.objects.filter(count__gt=0).values_list(
+            'date', 'hour', 'status', 'count'))
+        stats.rebuild()
+        self.assertEqual(incremental, set(BookingStat.objects.filter(count__gt=0).values_list(
+            'date', 'hour', 'status', 'count')))
+
+    def test_mark_read_action_is_one_update(self):
+        unread = Notification.objects.bulk_create([
+            Notification(recipient=self.trainer, notification_type='new_booking',
+                         message=f'Booking {i}')
+            for i in range(3)
+        ])
+        updates = self.run_action('notification', 'mark_read', [n.pk for n in unread])
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+
+    def test_large_tables_get_an_estimated_count(self):
+        self.bookings[2].delete()
+        bookings = Booking.objects.all()
+        self.assertEqual(pagination.estimated_count(bookings), 5)
+        with mock.patch.object(pagination, 'ESTIMATED_COUNT_THRESHOLD', 1):
+            # The id span, not an exact count
+            self.assertEqual(pagination.estimated_count(bookings), 6)
+            # Filtered querysets are always counted exactly
+            self.assertEqual(
+                pagination.estimated_count(bookings.filter(status='pending')), 5)
+
+    def test_date_hierarchy_drill_down_within_budget(self):
+        day = self.bookings[0].date
+        for view_name, params in [
+            ('admin:trainer_booking_changelist',
+             {'date__year': day.year, 'date__month': day.month, 'date__day': day.day}),
+            ('admin:trainer_notification_changelist',
+             {'created_at__year': day.year, 'created_at__month': day.month}),
+        ]:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(reverse(view_name), params)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(ctx.captured_queries), QUERY_BUDGETS[view_name])
+
+
+@web_settings
+class LoadGeneratorTests(TestCase):
+
+    def test_seed_is_repeatable_and_consistent(self):
+        result = loadgen.seed(trainers=2, clients=15, bookings=300, notifications=100,
+                              prefix='a', seed=7)
+        self.assertEqual((result.bookings, result.notifications), (300, 100))
+        first = list(Booking.objects.order_by('pk').values_list(
+            'client__username', 'date', 'time', 'status', 'created_at'))
+        # created_at is generated, not the time of the insert
+        self.assertLess(max(row[4] for row in first), timezone.now() - datetime.timedelta(hours=1))
+
+        loadgen.clear('a')
+        self.assertFalse(User.objects.filter(username__startswith='a-').exists())
+        loadgen.seed(trainers=2, clients=15, bookings=300, notifications=100, prefix='a', seed=7)
+        again = list(Booking.objects.order_by('pk').values_list(
+            'client__username', 'date', 'time', 'status', 'created_at'))
+        self.assertEqual(first, again)
+
+        # Bulk inserts still leave the summary and search index in step
+        self.assertEqual(BookingStat.objects.aggregate(n=models.Sum('count'))['n'], 300)
+        self.assertTrue(search.search(Booking.objects.all(), 'leg').exists())
+
+    def test_benchmark_reports_percentiles_and_queries(self):
+        results = benchmarks.run(sizes=[50], repeat=3)
+
+        self.assertEqual([r['view'] for r in results], [s.name for s in benchmarks.SCENARIOS])
+        for result in results:
+            self.assertEqual(result['size'], 50)
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+            self.assertGreater(result['queries']['max'], 0)
+        # The run is rolled back
+        self.assertFalse(Booking.objects.exists())
+
+    def test_booking_list_benchmark_compares_cold_and_warm_rows(self):
+        out = io.StringIO()
+        call_command('benchmark_booking_list', '--size', '50', '--repeat', '2', stdout=out)
+
+        self.assertRegex(out.getvalue(), r'cold: median [\d.]+ ms')
+        self.assertIn('Warm renders are', out.getvalue())
+        self.assertFalse(Booking.objects.exists())
+
+
+@web_settings
+@override_settings(READ_REPLICAS=['replica'])
+class ReadReplicaTests(TransactionTestCase):
+    """A snapshot of the test database stands in for a lagging replica."""
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.client.force_login(self.trainer)
+        self.old = make_bookings(self.trainer, [make_client()], 1)[0]
+
+        self.replica_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self.replica_dir.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as replica:
+            connection.connection.backup(replica)
+        connections.settings['replica'] = {**connection.settings_dict, 'NAME': path}
+
+        # Written after the snapshot, so only the primary has it
+        self.new = make_bookings(self.trainer, [self.old.client], 1)[0]
+        cache.clear()
+
+    def tearDown(self):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        self.replica_dir.cleanup()
+
+    def listed(self):
+        response = self.client.get(reverse('trainer:booking_list'))
+        return {booking.pk for booking in response.context['page']}
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.assertEqual(self.listed(), {self.old.pk})
+
+        response = self.client.post(reverse('trainer:booking_create'), {
+            'client': self.old.client_id,
+            'date': self.new.date + datetime.timedelta(days=1),
+            'time': '09:00',
+            'status': 'confirmed',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+        self.assertEqual(len(self.listed()), 3)
+
+        # Once the pin expires, reads go back to the replica
+        self.client.cookies[routers.PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.listed(), {self.old.pk})
+
+    def test_outside_requests_and_transactions_read_the_primary(self):
+        self.assertTrue(Booking.objects.filter(pk=self.new.pk).exists())
+        self.assertEqual(notifications.cached_badge(self.old.client)['count'], 2)
+
+
+@web_settings
+class BookingBatchApiTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.bookings = make_bookings(self.trainer, [self.booked_client], 4)
+        self.url = reverse('trainer:booking_batch')
+
+    def post(self, user, **payload):
+        self.client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, payload, content_type='application/json')
+        self.queries = [q['sql'] for q in ctx.captured_queries]
+        return response
+
+    def statements(self, prefix):
+        return [sql for sql in self.queries if sql.startswith(prefix)]
+
+    def test_trainer_confirms_a_batch_in_one_update(self):
+        other = make_bookings(make_trainer('other'), [self.booked_client], 1)[0]
+        ids = [b.pk for b in self.bookings] + [other.pk]
+
+        response = self.post(self.trainer, action='confirm', ids=ids)
+
+        self.assertEqual(response.json()['updated'], sorted(b.pk for b in self.bookings))
+        self.assertEqual(response.json()['skipped'], [other.pk])
+        self.assertEqual(len(self.statements('UPDATE "trainer_booking"')), 1)
+        self.assertEqual(Booking.objects.get(pk=other.pk).status, 'pending')
+        self.assertEqual(
+            BookingStat.objects.filter(status='confirmed').aggregate(n=models.Sum('count'))['n'], 4)
+
+    def test_client_cancel_notifies_the_trainer_in_one_insert(self):
+        ids = [b.pk for b in self.bookings[:2]]
+        self.assertEqual(
+            self.post(self.booked_client, action='confirm', ids=ids).status_code, 403)
+
+        response = self.post(self.booked_client, action='cancel', ids=ids)
+
+        self.assertEqual(response.json()['updated'], ids)
+        self.assertEqual(len(self.statements('INSERT INTO "trainer_notification"')), 1)
+        digest = Notification.objects.get(
+            recipient=self.trainer, notification_type='booking_cancelled')
+        self.assertEqual(digest.event_count, 2)
+        self.assertEqual([event['id'] for event in digest.bookings], ids)
+
+    def test_reschedule_is_all_or_nothing(self):
+        first, second = self.bookings[:2]
+        # Both bookings share a date (08:00, 09:00); moving both to 09:00 clashes
+        response = self.post(self.trainer, action='reschedule',
+                             ids=[first.pk, second.pk], time='09:00')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.get(pk=first.pk).time, first.time)
+
+        response = self.post(self.trainer, action='reschedule', ids=[first.pk, second.pk], days=7)
+        self.assertEqual(response.json()['updated'], [first.pk, second.pk])
+        self.assertEqual(Booking.objects.get(pk=first.pk).date,
+                         first.date + datetime.timedelta(days=7))
+        self.assertEqual(Job.objects.filter(kind='email.send').count(), 2)
+
+    def test_reschedule_onto_slots_the_batch_vacates(self):
+        # 08:00-11:00 on two consecutive days; a day later, every session
+        # but the last day's lands where another one was
+        next_day = self.bookings[0].date + datetime.timedelta(days=1)
+        bookings = self.bookings + make_bookings(
+            self.trainer, [self.booked_client], 4, start=next_day)
+        ids = sorted(b.pk for b in bookings)
+
+        response = self.post(self.trainer, action='reschedule', ids=ids, days=1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], ids)
+        self.assertEqual(
+            sorted(Booking.objects.values_list('date', 'time')),
+            sorted((b.date + datetime.timedelta(days=1), b.time) for b in bookings))
+
+        # Backwards too, onto the slots just vacated
+        response = self.post(self.trainer, action='reschedule', ids=ids, days=-1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(Booking.objects.values_list('date', 'time')),
+                         sorted((b.date, b.time) for b in bookings))
+
+
+@web_settings
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer(first_name='Pat')
+        self.booked_client = make_client()
+        self.bookings = make_bookings(self.trainer, [self.booked_client], 3)
+        self.old = make_bookings(self.trainer, [self.booked_client], 1,
+                                 start=datetime.date.today() - datetime.timedelta(days=90))[0]
+        self.url = reverse('trainer:calendar_feed', args=[ical.make_token(self.trainer)])
+
+    def fetch(self, url=None, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url or self.url, headers=headers)
+        self.queries = len(ctx.captured_queries)
+        return response
+
+    def test_feed_is_streamed_and_unchanged_polls_get_304(self):
+        response = self.fetch()
+        body = b''.join(response.streaming_content).decode()
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn(f'UID:booking-{self.bookings[0].pk}@theptapp', body)
+        # Outside the rolling window
+        self.assertNotIn(f'UID:booking-{self.old.pk}@', body)
+
+        response = self.fetch(if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.queries, 1)
+
+        etag = response['ETag']
+        self.bookings[0].delete()
+        self.assertEqual(self.fetch(if_none_match=etag).status_code, 200)
+
+    def test_client_feed_and_forged_tokens(self):
+        other = make_trainer('other')
+        make_bookings(other, [make_client('someone')], 1)
+        url = reverse('trainer:calendar_feed', args=[ical.make_token(self.booked_client)])
+
+        body = b''.join(self.fetch(url).streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('SUMMARY:Session with Pat', body)
+
+        forged = ical.make_token(self.booked_client).replace(f'c{self.booked_client.pk}', f't{other.pk}')
+        response = self.fetch(reverse('trainer:calendar_feed', args=[forged]))
+        self.assertEqual(response.status_code, 404)
+
+
+@web_settings
+class AsyncViewTests(TestCase):
+    """The polled views served through the ASGI handler, as in production."""
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.bookings = make_bookings(self.trainer, [self.booked_client], 3)
+        self.async_client.force_login(self.trainer)
+
+    async def test_check_notifications_etag_and_login(self):
+        url = reverse('trainer:check_notifications')
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'count': 0})
+        self.assertIn('private', response['Cache-Control'])
+
+        response = await self.async_client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(f'next={url}', response['Location'])
+
+    async def test_booking_list_and_client_detail(self):
+        response = await self.async_client.get(reverse('trainer:booking_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['bookings']), 3)
+
+        response = await self.async_client.get(
+            reverse('trainer:client_detail', args=[self.booked_client.pk]))
+        self.assertEqual(len(response.context['bookings']), 3)
+
+        response = await self.async_client.get(
+            reverse('trainer:client_detail', args=[self.trainer.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_middleware_chain_is_async(self):
+        # A sync-only middleware would make Django run the whole chain, views
+        # included, in a thread
+        self.assertNotIsInstance(ASGIHandler()._middleware_chain, SyncToAsync)
+
+    async def test_exports_stream_a_batch_at_a_time(self):
+        pulled = []
+        export_rows = booking_io.export_rows
+
+        def counting(*args, **kwargs):
+            for record in export_rows(*args, **kwargs):
+                pulled.append(record)
+                yield record
+
+        with mock.patch.object(booking_io, 'export_rows', counting), \
+                mock.patch.object(views, '_abatches', partial(views._abatches, batch=2)):
+            response = await self.async_client.get(reverse('trainer:booking_export'))
+            content = aiter(response.streaming_content)
+            # The header and one booking, with the other two still unread
+            first = await anext(content)
+            self.assertEqual(len(pulled), 1)
+            rest = [chunk async for chunk in content]
+        self.assertEqual(len(pulled), 3)
+        self.assertEqual(b''.join([first, *rest]).decode().count('\r\n'), 4)
+
+    async def test_calendar_feed_streams_over_asgi(self):
+        self.async_client.cookies.clear()
+        response = await self.async_client.get(
+            reverse('trainer:calendar_feed', args=[ical.make_token(self.trainer)]))
+        self.assertTrue(hasattr(response.streaming_content, '__aiter__'))
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR'))
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+    async def test_queries_are_counted_on_the_async_path(self):
+        response = await self.async_client.get(reverse('trainer:booking_list'))
+        count = int(response['Server-Timing'].split('desc="')[1].split()[0])
+        self.assertGreater(count, 0)
+        self.assertLessEqual(count, QUERY_BUDGETS['trainer:booking_list'])
+
+
+@web_settings
+class PollerBenchmarkTests(TransactionTestCase):
+
+    def test_sync_and_async_pollers(self):
+        results = benchmarks.run_pollers(size=50, concurrency=[3], polls=2,
+                                         views=['trainer:check_notifications'])
+
+        self.assertEqual([r['mode'] for r in results], ['sync', 'async'])
+        for result in results:
+            self.assertEqual(result['requests'], 6)
+            self.assertGreater(result['throughput_rps'], 0)
+
+
+@web_settings
+class BookingArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = make_trainer(is_superuser=True)
+        self.booked_client = make_client()
+        self.client.force_login(self.trainer)
+        long_ago = datetime.date.today() - datetime.timedelta(days=400)
+        self.old = make_bookings(self.trainer, [self.booked_client], 8, start=long_ago)
+        Booking.objects.filter(pk__in=[b.pk for b in self.old[:6]]).update(status='confirmed')
+        stats.rebuild()
+        self.recent = make_bookings(
+            self.trainer, [self.booked_client], 4,
+            start=datetime.date.today() - datetime.timedelta(days=10))
+        Reminder.objects.create(booking=self.old[0], window='24h', claim='00000000-0000-0000-0000-000000000001')
+
+    def test_archives_finished_sessions_in_resumable_batches(self):
+        before = archive.cutoff(days=180)
+        counters = list(BookingStat.objects.order_by('pk').values_list('date', 'hour', 'status', 'count'))
+
+        self.assertEqual(archive.archive_bookings(before, dry_run=True), 6)
+        # A run that dies in its second batch keeps the first; the next one finishes
+        with mock.patch.object(archive.search, 'reindex', side_effect=[None, RuntimeError]):
+            with self.assertRaises(RuntimeError):
+                archive.archive_bookings(before, batch_size=4)
+        self.assertEqual(BookingArchive.objects.count(), 4)
+        self.assertEqual(archive.archive_bookings(before, batch_size=4), 2)
+        self.assertEqual(archive.archive_bookings(before), 0)
+
+        self.assertEqual(BookingArchive.objects.count(), 6)
+        # Pending sessions stay live, whatever their age
+        self.assertEqual(set(Booking.objects.values_list('pk', flat=True)),
+                         {b.pk for b in self.old[6:] + self.recent})
+        self.assertFalse(Reminder.objects.exists())
+        # The dashboard still counts archived sessions, before and after a rebuild
+        self.assertEqual(
+            list(BookingStat.objects.order_by('pk').values_list('date', 'hour', 'status', 'count')),
+            counters)
+        stats.rebuild()
+        self.assertEqual(BookingStat.objects.aggregate(n=models.Sum('count'))['n'], 12)
+
+    def test_history_merges_with_the_live_bookings(self):
+        archive.archive_bookings(archive.cutoff(days=180))
+        live = Booking.objects.filter(client=self.booked_client)
+        history = archive.history(self.booked_client)
+        paginate = async_to_sync(pagination.apaginate_with_history)
+
+        with CaptureQueriesContext(connection) as ctx:
+            page = paginate(live, history, per_page=5)
+        # One seek into each table
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        pages = [page]
+        while page.has_next:
+            page = paginate(live, history, per_page=5, after=page.next_cursor)
+            pages.append(page)
+        seen = [b.pk for p in pages for b in p]
+        # Archived and pending old sessions interleave by date, as one list
+        self.assertEqual(seen, [b.pk for b in self.old + self.recent])
+        self.assertEqual([len(p) for p in pages], [5, 5, 2])
+
+        back = paginate(live, history, per_page=5, before=page.previous_cursor)
+        self.assertEqual([b.pk for b in back], [b.pk for b in pages[1]])
+        back = paginate(live, history, per_page=5, descending=True,
+                        after=pagination.encode_cursor(self.recent[0]))
+        self.assertEqual([b.pk for b in back], [b.pk for b in self.old[:2:-1]])
+
+    def test_client_detail_shows_archived_history(self):
+        archive.archive_bookings(archive.cutoff(days=180))
+        response = self.client.get(
+            reverse('trainer:client_detail', args=[self.booked_client.pk]), {'view': 'past'})
+
+        rows = [b.pk for b in response.context['page']]
+        self.assertEqual(rows[-6:], [b.pk for b in self.old[5::-1]])
+        self.assertContains(response, 'Archived', count=6)
+
+    def test_delete_keeps_the_booking_as_cancelled_history(self):
+        booking = self.recent[-1]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('trainer:booking_delete', args=[booking.pk]))
+
+        self.assertFalse(Booking.objects.filter(pk=booking.pk).exists())
+        kept = BookingArchive.objects.get(pk=booking.pk)
+        self.assertEqual((kept.status, kept.reason, kept.date), ('cancelled', 'deleted', booking.date))
+
+        # A recently deleted session sits among the recent ones, ahead of old history
+        archive.archive_bookings(archive.cutoff(days=180))
+        url = reverse('trainer:client_detail', args=[self.booked_client.pk])
+        past = [b.pk for b in self.client.get(url, {'view': 'past'}).context['page']]
+        self.assertEqual(past[:4], [b.pk for b in self.recent[::-1]])
+
+    def test_deleted_future_booking_leaves_the_upcoming_list(self):
+        soon = make_bookings(self.trainer, [self.booked_client], 3,
+                             start=datetime.date.today() + datetime.timedelta(days=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('trainer:booking_delete', args=[soon[0].pk]))
+
+        response = self.client.get(reverse('trainer:client_detail', args=[self.booked_client.pk]))
+        self.assertEqual([b.pk for b in response.context['page']], [b.pk for b in soon[1:]])
+
+
+@web_settings
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(METRICS_DIR=directory.name, METRICS_TOKEN='scrape')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        registry = mock.patch.object(metrics, 'registry', metrics.Registry())
+        registry.start()
+        self.addCleanup(registry.stop)
+        self.trainer = make_trainer(is_superuser=True)
+        self.client.force_login(self.trainer)
+
+    def scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return response.content.decode()
+
+    def test_records_latency_queries_sizes_and_cache(self):
+        self.client.get(reverse('trainer:booking_list'))
+        self.client.get(reverse('trainer:check_notifications'))
+        self.client.get(reverse('trainer:check_notifications'))
+
+        text = self.scrape()
+        self.assertIn('theptapp_request_duration_seconds_count{view="trainer:booking_list"} 1', text)
+        self.assertIn('theptapp_request_duration_seconds_bucket{view="trainer:booking_list",le="+Inf"} 1', text)
+        self.assertIn(
+            'theptapp_requests_total{view="trainer:check_notifications",method="GET",status="200"} 2', text)
+        self.assertRegex(text, r'theptapp_db_queries_total\{view="trainer:booking_list"\} [1-9]')
+        self.assertIn('theptapp_response_size_bytes_count{view="trainer:booking_list"} 1', text)
+        # The second poll found the badge cached
+        self.assertIn('theptapp_cache_requests_total{namespace="trainer:badge",result="hit"}', text)
+        self.assertIn('theptapp_cache_hit_ratio{namespace="trainer:badge"}', text)
+
+    def test_adds_up_every_workers_file(self):
+        self.client.get(reverse('trainer:booking_list'))
+        metrics.flush()
+        # Another worker of the same server, with its own totals
+        other = metrics.Registry()
+        other.inc('requests_total', ('trainer:booking_list', 'GET', '200'), 4)
+        with open(os.path.join(metrics._server_dir(), '999999.json'), 'w') as f:
+            json.dump(other.snapshot(), f)
+
+        text = self.scrape()
+        self.assertIn('theptapp_requests_total{view="trainer:booking_list",method="GET",status="200"} 5', text)
+
+    def test_superuser_or_token_only(self):
+        self.client.force_login(make_client())
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        # Signing up as a trainer makes you staff, which must not be enough
+        self.client.post(reverse('trainer:signup'), {
+            'username': 'newtrainer', 'password1': 'Sq7!kettlebell', 'password2': 'Sq7!kettlebell',
+            'role': 'trainer',
+        })
+        self.assertTrue(User.objects.get(username='newtrainer').is_staff)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertIn('# TYPE theptapp_requests_total counter',
+                      self.scrape(authorization='Bearer scrape'))
+
+    def test_a_failing_flush_never_fails_the_request(self):
+        with mock.patch.object(metrics, 'flush', side_effect=OSError("disk full")), \
+                self.assertLogs('trainer.metrics', 'ERROR'):
+            response = self.client.get(reverse('trainer:booking_list'))
+        self.assertEqual(response.status_code, 200)
+
+        # Two workers pruning the same dead server's directory
+        stale = os.path.join(metrics._root(), '999999999')
+        os.makedirs(stale)
+        open(os.path.join(stale, '1.json'), 'w').close()
+        with mock.patch.object(os, 'remove', side_effect=FileNotFoundError):
+            metrics._prune()
+
+    def test_unknown_methods_share_a_label(self):
+        self.client.generic('BREW', reverse('trainer:booking_list'))
+        self.client.generic('PROPFIND', reverse('trainer:booking_list'))
+        text = self.scrape()
+        self.assertIn('method="other"', text)
+        self.assertNotIn('BREW', text)
+
+
+@web_settings
+class DigestTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.bookings = make_bookings(self.trainer, [self.booked_client], 3)
+        self.now = timezone.now()
+
+    def record(self, booking, minutes=0, notification_type='booking_cancelled'):
+        return digests.record(notification_type, self.trainer.pk, [digests.event(booking)],
+                              now=digests.window_start(self.now) + datetime.timedelta(minutes=minutes))
+
+    def test_events_in_a_window_share_one_row(self):
+        for minutes, booking in enumerate(self.bookings):
+            self.record(booking, minutes)
+
+        digest = Notification.objects.get()
+        self.assertEqual(digest.event_count, 3)
+        self.assertEqual([event['id'] for event in digest.bookings],
+                         [b.pk for b in self.bookings])
+        self.assertEqual(digest.message, f"3 bookings cancelled ({self.booked_client.username})")
+        self.assertEqual(digest.booking_time, self.bookings[-1].time)
+
+    def test_reading_or_a_new_window_starts_a_new_digest(self):
+        first = self.record(self.bookings[0])
+        bulk.mark_read(Notification.objects.all())
+        second = self.record(self.bookings[1], 1)
+        third = self.record(self.bookings[2], digests.DEFAULT_DIGEST_MINUTES)
+
+        self.assertEqual(len({first.pk, second.pk, third.pk}), 3)
+        self.assertEqual(Notification.objects.get(pk=second.pk).event_count, 1)
+        # A read digest is closed, so it can be marked unread again
+        bulk.mark_read(Notification.objects.all(), is_read=False)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 3)
+
+    def test_marking_unread_next_to_an_open_digest(self):
+        read = self.record(self.bookings[0])
+        # Read without closing it, as a direct UPDATE would leave it
+        Notification.objects.filter(pk=read.pk).update(is_read=True)
+        self.record(self.bookings[1], 1)
+
+        bulk.mark_read(Notification.objects.filter(pk=read.pk), is_read=False)
+        self.assertEqual(Notification.objects.filter(is_read=False).count(), 2)
+        self.assertEqual(self.record(self.bookings[2], 2).event_count, 2)
+
+        self.client.force_login(make_trainer('manager', is_superuser=True))
+        Notification.objects.filter(pk=read.pk).update(is_read=True)
+        response = self.client.post(reverse('admin:trainer_notification_changelist'), {
+            'action': 'mark_unread', '_selected_action': [read.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Notification.objects.get(pk=read.pk).is_read)
+
+    def test_types_are_kept_apart(self):
+        self.record(self.bookings[0])
+        self.record(self.bookings[1], notification_type='booking_updated')
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_lost_insert_race_merges_into_the_winner(self):
+        winner = self.record(self.bookings[0])
+        select = Notification.objects.none()
+        with mock.patch.object(Notification.objects, 'select_for_update',
+                               side_effect=[select, Notification.objects.all()]):
+            merged = self.record(self.bookings[1])
+        self.assertEqual(merged.pk, winner.pk)
+        self.assertEqual(Notification.objects.get().event_count, 2)
+
+    def test_import_notifies_the_trainer_once(self):
+        rows = [(n, {'client_name': f'Walk-in {n}', 'date': '2031-03-0%d' % n, 'time': '10:00'})
+                for n in range(1, 4)]
+        created, errors = booking_io.BookingImporter(self.trainer).run(rows)
+
+        self.assertEqual((created, errors), (3, []))
+        digest = Notification.objects.get(notification_type='booking_created')
+        self.assertEqual(digest.event_count, 3)
+        self.assertIn("Walk-in 1, Walk-in 2, Walk-in 3", digest.message)
+
+    def test_admin_changes_notify_the_trainer_unless_they_made_them(self):
+        admin_user = make_trainer('manager', is_superuser=True)
+        changelist = reverse('admin:trainer_booking_changelist')
+        pks = [b.pk for b in self.bookings]
+
+        self.client.force_login(self.trainer)
+        self.client.post(changelist, {'action': 'cancel_bookings', '_selected_action': pks[:1]})
+        self.assertFalse(Notification.objects.exists())
+
+        self.client.force_login(admin_user)
+        self.client.post(changelist, {'action': 'confirm_bookings', '_selected_action': pks[1:]})
+        digest = Notification.objects.get(recipient=self.trainer)
+        self.assertEqual((digest.notification_type, digest.event_count), ('booking_updated', 2))
+
+        response = self.client.get(reverse('admin:trainer_notification_changelist'))
+        self.assertEqual(response.status_code, 200)
+
+
+@web_settings
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.client.force_login(self.trainer)
+
+    def page(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.context['page']
+
+    def walk(self, url, **params):
+        """Every booking id, following next cursors; and the pages seen."""
+        pages = [self.page(url, **params)]
+        while pages[-1].has_next:
+            pages.append(self.page(url, after=pages[-1].next_cursor, **params))
+        return [b.pk for page in pages for b in page], pages
+
+    def test_booking_list_pages_forward_and_back(self):
+        bookings = make_bookings(self.trainer, [self.booked_client], DEFAULT_PER_PAGE * 2 + 5)
+        url = reverse('trainer:booking_list')
+
+        ids, pages = self.walk(url)
+        self.assertEqual(ids, [b.pk for b in bookings])
+        self.assertEqual([len(page) for page in pages], [DEFAULT_PER_PAGE, DEFAULT_PER_PAGE, 5])
+        self.assertFalse(pages[0].has_previous)
+
+        back = self.page(url, before=pages[2].previous_cursor)
+        self.assertEqual([b.pk for b in back], [b.pk for b in pages[1]])
+        self.assertTrue(back.has_previous and back.has_next)
+
+    def test_ties_on_date_and_time_are_broken_by_id(self):
+        # Two trainers booking the same client into the same slots
+        start = datetime.date.today() + datetime.timedelta(days=1)
+        bookings = [
+            booking
+            for trainer in (self.trainer, make_trainer('other'))
+            for booking in make_bookings(trainer, [self.booked_client], DEFAULT_PER_PAGE, start=start)
+        ]
+        url = reverse('trainer:client_detail', args=[self.booked_client.pk])
+
+        ids, pages = self.walk(url)
+        expected = sorted(bookings, key=lambda b: (b.date, b.time, b.pk))
+        self.assertEqual(ids, [b.pk for b in expected])
+        back = self.page(url, before=pages[1].previous_cursor)
+        self.assertEqual([b.pk for b in back], [b.pk for b in pages[0]])
+
+    def test_tampered_cursor_falls_back_to_page_one(self):
+        make_bookings(self.trainer, [self.booked_client], DEFAULT_PER_PAGE + 1)
+        url = reverse('trainer:booking_list')
+        first = [b.pk for b in self.page(url)]
+        wrong_parts = pagination.encode_cursor(Booking.objects.first(), keys=('date',))
+
+        # Not base64, too few parts, and 'not|a|date'
+        for cursor in ('not a cursor!', wrong_parts, 'bm90fGF8ZGF0ZQ'):
+            self.assertEqual([b.pk for b in self.page(url, after=cursor)], first, cursor)
+            self.assertEqual([b.pk for b in self.page(url, before=cursor)], first, cursor)
+
+    def test_upcoming_and_past_are_split(self):
+        today = datetime.date.today()
+        past = make_bookings(self.trainer, [self.booked_client], 8,
+                             start=today - datetime.timedelta(days=3))
+        upcoming = make_bookings(self.trainer, [self.booked_client], 4)
+        url = reverse('trainer:booking_list')
+
+        self.assertEqual([b.pk for b in self.page(url)], [b.pk for b in upcoming])
+        # Most recent first
+        recent_first = sorted(past, key=lambda b: (b.date, b.time), reverse=True)
+        self.assertEqual([b.pk for b in self.page(url, view='past')], [b.pk for b in recent_first])
+        self.assertEqual([b.pk for b in self.page(url, view='nonsense')], [b.pk for b in upcoming])
+
+
+@web_settings
+class NotificationStreamTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.url = reverse('trainer:notification_stream')
+        self.async_client.force_login(self.trainer)
+        # Closing the response doesn't close the view's generator; drop any
+        # subscription a test leaves behind
+        self.addCleanup(events._subscribers.pop, self.trainer.pk, None)
+
+    async def next_event(self, content):
+        return (await asyncio.wait_for(anext(content), timeout=5)).decode()
+
+    async def test_published_badges_reach_the_open_stream(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await self.next_event(content)).startswith('retry:'))
+            self.assertEqual(await self.next_event(content), 'data: {"count": 0}\n\n')
+            self.assertTrue(events.has_subscribers(self.trainer.pk))
+
+            # A change committed by a sync view, in another thread
+            await Notification.objects.acreate(
+                recipient=self.trainer, notification_type='booking_cancelled', message='Gone')
+            await sync_to_async(notifications.badge_changed)(self.trainer.pk)
+            self.assertIn('"count": 1', await self.next_event(content))
+        finally:
+            await content.aclose()
+
+    async def test_a_closed_stream_unsubscribes(self):
+        stream = views._badge_events(self.trainer)
+        await anext(stream)
+        self.assertTrue(events.has_subscribers(self.trainer.pk))
+        await stream.aclose()
+        self.assertFalse(events.has_subscribers(self.trainer.pk))
+
+    async def test_a_slow_stream_keeps_only_the_latest_payloads(self):
+        subscription = events.subscribe(self.trainer.pk)
+        try:
+            for count in range(events.QUEUE_SIZE + 2):
+                self.assertEqual(events.publish(self.trainer.pk, {'count': count}), 1)
+            await asyncio.sleep(0)
+            queue = subscription[1]
+            self.assertEqual(queue.qsize(), events.QUEUE_SIZE)
+            self.assertEqual(queue.get_nowait(), {'count': 2})
+        finally:
+            events.unsubscribe(self.trainer.pk, subscription)
+        self.assertEqual(events.publish(self.trainer.pk, {'count': 0}), 0)
+
+    def test_wsgi_answers_204_so_the_page_polls(self):
+        self.client.force_login(self.trainer)
+        self.assertEqual(self.client.get(self.url).status_code, 204)
+
+    async def test_clients_may_not_stream(self):
+        await sync_to_async(self.async_client.force_login)(self.booked_client)
+        self.assertEqual((await self.async_client.get(self.url)).status_code, 403)
+
+
+@web_settings
+class BookingImportExportTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.bookings = make_bookings(self.trainer, [self.booked_client], 3)
+        make_bookings(make_trainer('other'), [make_client('someone')], 2)
+        self.date = (self.bookings[-1].date + datetime.timedelta(days=7)).isoformat()
+
+    def export(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('trainer:booking_export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_csv_and_ndjson_of_the_users_own_bookings(self):
+        response, body = self.export(self.trainer)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('filename="bookings.csv"', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([int(r['id']) for r in rows], [b.pk for b in self.bookings])
+        self.assertEqual(rows[0]['time'], '08:00')
+        self.assertEqual(rows[0]['client'], 'client')
+
+        response, body = self.export(self.booked_client, format='ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['id'] for r in records], [b.pk for b in self.bookings])
+        self.assertEqual(set(records[0]), set(booking_io.EXPORT_FIELDS))
+
+    def import_file(self, content, suffix, *args):
+        """Run import_bookings; returns its output and the rejected-rows report."""
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, f'bookings{suffix}')
+        report = os.path.join(directory.name, 'report.csv')
+        with open(path, 'w') as f:
+            f.write(content)
+        out = io.StringIO()
+        call_command('import_bookings', path, '--trainer', 'trainer', '--report', report, *args,
+                     stdout=out)
+        if not os.path.exists(report):
+            return out.getvalue(), ''
+        with open(report) as f:
+            return out.getvalue(), f.read()
+
+    def test_import_csv_with_a_report_of_rejected_rows(self):
+        out, err = self.import_file(
+            'client,client_name,date,time,status\n'
+            f'client,,{self.date},09:00,confirmed\n'
+            f',Walk-in,{self.date},10:00,\n'
+            f',Walk-in,{self.date},10:00,\n'
+            f'nobody,,{self.date},11:00,\n', '.csv')
+
+        self.assertIn("Imported 2 booking(s); 2 row(s) rejected.", out)
+        self.assertIn('4,time,', err)
+        self.assertIn("5,client,No client with username or email 'nobody'.", err)
+        imported = Booking.objects.filter(date=self.date)
+        self.assertEqual(sorted(imported.values_list('client_name', 'status')),
+                         [('Client', 'confirmed'), ('Walk-in', 'pending')])
+
+        out, _ = self.import_file(
+            f'client,client_name,date,time,status\n,Dry,{self.date},12:00,\n', '.csv', '--dry-run')
+        self.assertIn("Would import 1 booking(s)", out)
+        self.assertFalse(Booking.objects.filter(client_name='Dry').exists())
+
+    def test_import_ndjson_rejects_lines_that_are_not_objects(self):
+        row = {'client_name': 'Walk-in', 'date': self.date, 'time': '09:00'}
+        out, err = self.import_file('\n'.join([
+            json.dumps(row), '[1, 2]', '{"client_name": ', json.dumps(dict(row, time='10:00')),
+        ]) + '\n', '.ndjson')
+
+        self.assertIn("Imported 2 booking(s); 2 row(s) rejected.", out)
+        self.assertIn('2,row,Expected an object of column values.', err)
+        self.assertIn('3,row,Not valid JSON', err)
+
+    def test_a_read_error_reports_what_was_already_imported(self):
+        rows = [(1, {'client_name': 'Walk-in', 'date': self.date, 'time': '09:00'})]
+
+        def failing(fileobj, fmt):
+            yield from rows
+            raise csv.Error("line contains NUL")
+
+        with mock.patch('trainer.management.commands.import_bookings.read_rows', failing), \
+                self.assertRaisesMessage(CommandError, "1 booking(s) from earlier lines were imported"):
+            self.import_file('', '.csv', '--batch-size', '1')
+
+
+@web_settings
+class AvailabilityTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        today = datetime.date.today()
+        # A Monday at least a week out, so nothing has started yet
+        self.monday = today + datetime.timedelta(days=7 + (7 - today.weekday()) % 7)
+        self.set_hours(self.trainer, '09:00', '12:00')
+
+    def set_hours(self, trainer, start, end, weekday=0, session_minutes=60):
+        availability, _ = TrainerAvailability.objects.get_or_create(
+            trainer=trainer, defaults={'session_minutes': session_minutes})
+        availability.hours.create(weekday=weekday, start_time=start, end_time=end)
+        return availability
+
+    def book(self, time):
+        return Booking.objects.create(
+            trainer=self.trainer, client=self.booked_client, client_name='client',
+            date=self.monday, time=time)
+
+    def starts(self, trainer_id=None, **kwargs):
+        slots = free_slots([trainer_id or self.trainer.pk], self.monday, self.monday, **kwargs)
+        return [t.strftime('%H:%M') for t in slots[trainer_id or self.trainer.pk].get(self.monday, [])]
+
+    def test_whole_sessions_fit_around_bookings_and_time_off(self):
+        self.assertEqual(self.starts(), ['09:00', '09:30', '10:00', '10:30', '11:00'])
+
+        booking = self.book(datetime.time(10))
+        self.assertEqual(self.starts(), ['09:00', '11:00'])
+        self.assertIn('10:00', self.starts(exclude_booking=booking.pk))
+
+        self.trainer.availability.exceptions.create(
+            date=self.monday, start_time=datetime.time(11), end_time=datetime.time(12))
+        self.assertEqual(self.starts(), ['09:00'])
+        # No hours on Tuesday
+        tuesday = self.monday + datetime.timedelta(days=1)
+        self.assertEqual(free_slots([self.trainer.pk], tuesday, tuesday)[self.trainer.pk], {})
+
+    def test_several_trainers_in_one_search(self):
+        other = make_trainer('other')
+        self.set_hours(other, '14:00', '16:00', session_minutes=90)
+        unset = make_trainer('unset')
+
+        with self.assertNumQueries(4):
+            slots = free_slots([self.trainer.pk, other.pk, unset.pk], self.monday, self.monday)
+        self.assertEqual(set(slots), {self.trainer.pk, other.pk})
+        self.assertEqual(self.starts(other.pk), ['14:00', '14:30'])
+
+    def test_endpoint(self):
+        url = reverse('trainer:availability_slots')
+        self.client.force_login(self.trainer)
+        booking = self.book(datetime.time(9))
+
+        response = self.client.get(url, {'start': self.monday.isoformat()})
+        day = response.json()['trainers'][str(self.trainer.pk)][self.monday.isoformat()]
+        self.assertEqual(day, ['10:00', '10:30', '11:00'])
+        response = self.client.get(url, {'start': self.monday.isoformat(), 'exclude': booking.pk})
+        day = response.json()['trainers'][str(self.trainer.pk)][self.monday.isoformat()]
+        self.assertIn('09:00', day)
+
+        for params in ({}, {'start': 'monday'}, {'start': self.monday.isoformat(), 'trainer': 'x'},
+                       {'start': self.monday.isoformat(), 'exclude': 'x'},
+                       {'start': self.monday.isoformat(),
+                        'end': (self.monday + datetime.timedelta(days=MAX_SEARCH_DAYS)).isoformat()}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+    def test_form_needs_the_whole_session_inside_working_hours(self):
+        data = {'client': self.booked_client.pk, 'date': self.monday, 'status': 'pending'}
+        self.assertTrue(BookingForm(dict(data, time='11:00'), user=self.trainer).is_valid())
+        # Starts inside the hours but would run past 12:00
+        for start in ('11:30', '08:00'):
+            form = BookingForm(dict(data, time=start), user=self.trainer)
+            self.assertIn('time', form.errors, start)
+
+    def test_off_grid_start_is_checked_to_its_real_end(self):
+        TrainerAvailability.objects.filter(trainer=self.trainer).update(session_minutes=15)
+        slots = [(self.monday, datetime.time(11, 45)), (self.monday, datetime.time(11, 50)),
+                 (self.monday, datetime.time(8, 50))]
+        # 11:50 + 15 minutes runs past 12:00; 08:50 starts before 09:00
+        self.assertEqual(slots_outside_hours(self.trainer.pk, slots), slots[1:])
+
+    def test_month_across_many_trainers_is_fast(self):
+        trainers = User.objects.bulk_create(
+            User(username=f'trainer{n}', is_staff=True) for n in range(40))
+        for trainer in trainers:
+            for weekday in range(5):
+                self.set_hours(trainer, '07:00', '20:00', weekday=weekday)
+            make_bookings(trainer, [self.booked_client], 40, start=self.monday)
+        end = self.monday + datetime.timedelta(days=30)
+
+        started = time.perf_counter()
+        with self.assertNumQueries(4):
+            slots = free_slots([t.pk for t in trainers], self.monday, end)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(slots), 40)
+        # Milliseconds in practice; generous for slow CI machines
+        self.assertLess(elapsed, 0.5)
+
+
+@web_settings
+class DoubleBookingTests(TransactionTestCase):
+    """The database, not just the form, must stop two bookings per slot."""
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        self.slot = {
+            'client': self.booked_client.pk,
+            'date': datetime.date.today() + datetime.timedelta(days=3),
+            'time': '10:00',
+            'status': 'pending',
+        }
+
+    def test_form_rejects_taken_slot(self):
+        make_bookings(self.trainer, [self.booked_client], 1, start=self.slot['date'])
+        data = dict(self.slot, time='08:00')
+
+        form = BookingForm(data, user=self.trainer)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('time', form.errors)
+
+    def test_cancelled_booking_frees_slot(self):
+        make_bookings(self.trainer, [self.booked_client], 1, start=self.slot['date'])
+        Booking.objects.update(status='cancelled')
+
+        form = BookingForm(dict(self.slot, time='08:00'), user=self.trainer)
+
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_concurrent_creates_book_slot_once(self):
+        writers = 4
+        barrier = threading.Barrier(writers)
+        results = []
+
+        def book():
+            try:
+                form = BookingForm(self.slot, user=self.trainer)
+                valid = form.is_valid()
+                # Everyone has passed validation before anyone inserts
+                barrier.wait(timeout=5)
+                if valid:
+                    booking = form.save(commit=False)
+                    booking.trainer = self.trainer
+                    booking.client_name = self.booked_client.username
+                    results.append(form.save_booking(booking))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), [False] * (writers - 1) + [True])
+        self.assertEqual(
+            Booking.objects.filter(
+                trainer=self.trainer, status__in=Booking.ACTIVE_STATUSES,
+            ).count(),
+            1,
+        )
+
+
+@web_settings
+class BookingSeriesTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.series_client = make_client()
+        self.client.force_login(self.trainer)
+        self.start = datetime.date.today() + datetime.timedelta(days=1)
+
+    def create_series(self, **extra):
+        data = {
+            'client': self.series_client.pk,
+            'date': self.start,
+            'time': '09:00',
+            'status': 'confirmed',
+            'repeat': 'weekly',
+            'occurrences': 6,
+        }
+        data.update(extra)
+        return self.client.post(reverse('trainer:booking_create'), data)
+
+    def test_series_is_inserted_in_one_statement(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.create_series()
+
+        inserts = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('INSERT INTO "trainer_booking"')]
+        self.assertEqual(len(inserts), 1)
+        dates = list(Booking.objects.order_by('date').values_list('date', flat=True))
+        self.assertEqual(dates, [self.start + datetime.timedelta(weeks=i) for i in range(6)])
+
+    def test_clash_on_any_date_saves_nothing(self):
+        make_bookings(self.trainer, [self.series_client], 1,
+                      start=self.start + datetime.timedelta(weeks=3))
+        Booking.objects.update(time=datetime.time(9))
+
+        response = self.create_series()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_edit_this_and_following(self):
+        self.create_series()
+        third = Booking.objects.order_by('date')[2]
+
+        self.client.post(reverse('trainer:booking_edit', args=[third.pk]), {
+            'client': self.series_client.pk,
+            'date': third.date + datetime.timedelta(days=1),
+            'time': '18:00',
+            'status': 'confirmed',
+            'scope': 'following',
+        })
+
+        times = list(Booking.objects.order_by('date').values_list('time', flat=True))
+        self.assertEqual(times, [datetime.time(9)] * 2 + [datetime.time(18)] * 4)
+        self.assertEqual(Booking.objects.order_by('date').last().date,
+                         self.start + datetime.timedelta(weeks=5, days=1))
+
+    def test_cancel_this_and_following(self):
+        self.create_series()
+        fourth = Booking.objects.order_by('date')[3]
+
+        self.client.post(reverse('trainer:booking_delete', args=[fourth.pk]),
+                         {'scope': 'following'})
+
+        self.assertEqual(Booking.objects.count(), 3)
+
+
+@web_settings
+@override_settings(SMS_BACKEND='trainer.sms.LocmemBackend')
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        sms.outbox.clear()
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+        [self.booking] = make_bookings(self.trainer, [self.booked_client], 1)
+        Booking.objects.update(client_contact='087 123 4567')
+
+    def test_client_cancel_notifies_trainer_via_worker(self):
+        self.client.force_login(self.booked_client)
+        self.client.post(reverse('trainer:booking_delete', args=[self.booking.pk]))
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(jobs.run_due(), 1)
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, self.trainer)
+        self.assertEqual(notification.booking_date, self.booking.date)
+
+    def test_trainer_cancel_texts_and_emails_client(self):
+        self.client.force_login(self.trainer)
+        self.client.post(reverse('trainer:booking_delete', args=[self.booking.pk]))
+
+        jobs.run_due()
+
+        self.assertEqual(sms.outbox[0]['to'], '087 123 4567')
+        self.assertEqual(mail.outbox[0].to, [self.booked_client.email])
+
+    def test_failed_job_backs_off_then_gives_up(self):
+        job = jobs.enqueue('sms.send', to='087 123 4567', body='Hi')
+        Job.objects.update(max_attempts=2)
+
+        with override_settings(SMS_BACKEND='trainer.sms.NoSuchBackend'), \
+                self.assertLogs('trainer.jobs', 'ERROR'):
+            jobs.run_due()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            self.assertGreater(job.run_at, timezone.now())
+
+            # Not due yet, so the worker leaves it alone
+            self.assertEqual(jobs.run_due(), 0)
+            Job.objects.update(run_at=timezone.now())
+            jobs.run_due()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('NoSuchBackend', job.last_error)
+
+    def test_purge_removes_old_done_jobs_in_batches(self):
+        old = timezone.now() - datetime.timedelta(days=30)
+        jobs.enqueue_many('sms.send', [{'to': '087 123 4567', 'body': 'Hi'}] * 5)
+        done = list(Job.objects.order_by('id').values_list('id', flat=True))
+        Job.objects.filter(id__in=done[:3]).update(status='done', run_at=old)
+        Job.objects.filter(id=done[3]).update(status='failed', run_at=old)
+        Job.objects.filter(id=done[4]).update(status='done')
+
+        with CaptureQueriesContext(connection) as ctx:
+            purged = jobs.purge(jobs.cutoff(14), batch_size=2)
+
+        self.assertEqual(purged, 3)
+        deletes = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('DELETE FROM "trainer_job"')]
+        self.assertEqual(len(deletes), 2)
+        # Failed jobs are kept for inspection, recent done ones until they age out
+        self.assertEqual(sorted(Job.objects.values_list('id', flat=True)), done[3:])
+
+    def test_worker_loops_drop_stale_connections_each_pass(self):
+        for command in ('run_jobs', 'send_reminders'):
+            with self.subTest(command=command), mock.patch(
+                    f'trainer.management.commands.{command}.close_old_connections') as close:
+                call_command(command, '--once', stdout=io.StringIO())
+                close.assert_called_once_with()
+
+
+@web_settings
+class ReminderTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.booked_client = make_client()
+
+    def book(self, date, time):
+        return Booking.objects.create(
+            trainer=self.trainer, client=self.booked_client,
+            client_name='client', client_contact='087 123 4567',
+            date=date, time=time, status='confirmed',
+        )
+
+    def test_rerun_and_overlap_never_double_send(self):
+        now = timezone.now()
+        soon = timezone.localtime(now + datetime.timedelta(hours=5))
+        self.book(soon.date(), soon.time().replace(microsecond=0))
+
+        first = reminders.sweep(now)
+        second = reminders.sweep(now)
+
+        self.assertEqual(first, {'24h': 1, '2h': 0})
+        self.assertEqual(second, {'24h': 0, '2h': 0})
+        self.assertEqual(Job.objects.filter(kind='sms.send').count(), 1)
+        self.assertEqual(Job.objects.filter(kind='email.send').count(), 1)
+
+    def test_window_counts_real_hours_across_dst_end(self):
+        # Clocks go back at 02:00 IST on 27 Oct 2030, so 24 real hours after
+        # 13:00 IST on the 26th is 12:00 GMT on the 27th, not 13:00
+        now = datetime.datetime(2030, 10, 26, 12, 0, tzinfo=datetime.timezone.utc)
+        inside = self.book(datetime.date(2030, 10, 27), datetime.time(11, 30))
+        self.book(datetime.date(2030, 10, 27), datetime.time(12, 30))
+
+        reminders.sweep(now)
+
+        self.assertEqual(
+            list(Reminder.objects.values_list('booking_id', flat=True)), [inside.pk])
+
+
+@web_settings
+class BookingStatTests(TestCase):
+
+    def setUp(self):
+        self.trainer = make_trainer()
+        self.stats_client = make_client()
+        self.client.force_login(self.trainer)
+
+    def counters(self):
+        return set(BookingStat.objects.filter(count__gt=0).values_list(
+            'trainer_id', 'date', 'hour', 'status', 'count'))
+
+    def assertMatchesRebuild(self):
+        incremental = self.counters()
+        stats.rebuild()
+        self.assertEqual(incremental, self.counters())
+
+    def test_incremental_updates_match_rebuild(self):
+        tomorrow = datetime.date.today() + datetime.timedelta(days=1)
+        self.client.post(reverse('trainer:booking_create'), {
+            'client': self.stats_client.pk, 'date': tomorrow, 'time': '09:00',
+            'status': 'confirmed', 'repeat': 'weekly', 'occurrences': 4,
+        })
+        booking = Booking.objects.order_by('date').first()
+        self.client.post(reverse('trainer:booking_edit', args=[booking.pk]), {
+            'client': self.stats_client.pk, 'date': tomorrow, 'time': '17:00',
+            'status': 'cancelled', 'scope': 'this',
+        })
+        Booking.objects.order_by('date').last().delete()
+
+        self.assertEqual(
+            BookingStat.objects.get(date=tomorrow, hour=17, status='cancelled').count, 1)
+        self.assertMatchesRebuild()
+
+    def test_dashboard_reads_only_the_summary(self):
+        make_bookings(self.trainer, [self.stats_client], 8,
+                      start=datetime.date.today() - datetime.timedelta(days=1))
+        stats.rebuild()
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('trainer:dashboard'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats']['total'], 8)
+        self.assertFalse(any('"trainer_booking"' in q['sql'] for q in ctx.captured_queries))
@@ -7,14 +7,24 @@ app_name = 'trainer'
 urlpatterns = [
     path('bookings/', views.booking_list, name='booking_list'),
     path('new/', views.booking_create, name='booking_create'),
+    path('export/', views.booking_export, name='booking_export'),
+    path('calendar/<str:token>.ics', views.calendar_feed, name='calendar_feed'),
     path('<int:pk>/edit/', views.booking_edit, name='booking_edit'),
     path('<int:pk>/delete/', views.booking_delete, name='booking_delete'),
+    path('api/bookings/batch/', views.booking_batch, name='booking_batch'),
     path('client/<int:user_id>/', views.client_detail,
          name='client_detail'),
+    path('clients/search/', views.client_search, name='client_search'),
+    path('availability/', views.availability_slots,
+         name='availability_slots'),
+    path('dashboard/', views.dashboard, name='dashboard'),
+    path('search/', views.search_view, name='search'),
     path('signup/', views.signup, name='signup'),
     path('notifications/', views.notifications_list, name='notifications_list'),
     path('notifications/check/', views.check_notifications,
          name='check_notifications'),
+    path('notifications/stream/', views.notification_stream,
+         name='notification_stream'),
     path('login/', views.CustomLoginView.as_view(), name='login'),
     path('logout/', views.CustomLogoutView.as_view(), name='logout'),
 ]
@@ -1,30 +1,175 @@
 # trainer/views.py
+import asyncio
+import datetime
+import json
+from functools import partial
+from itertools import islice
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
 from django import forms
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from django.contrib.auth.views import LoginView, LogoutView
+from django.contrib.auth.views import LoginView, LogoutView, redirect_to_login
 from django.contrib.messages.views import SuccessMessageMixin
+from django.db import IntegrityError, transaction
 from django.db.models import Q
-from django.http import JsonResponse
+from django.conf import settings
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
-
+from django.urls import reverse, reverse_lazy
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_POST
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from . import archive, bulk, digests, events, ical, metrics, search, stats
+from .availability import MAX_SEARCH_DAYS, free_slots
+from .booking_io import EXPORT_FORMATS
+from .clients import DEFAULT_LIMIT, label, search_clients
+from .jobs import enqueue, enqueue_many
 from .models import Booking, Notification
 from .forms import BookingForm
+from .notifications import abadge_version, acached_badge, badge_changed_on_commit
+from .pagination import (
+    NOTIFICATION_KEYS, InvalidCursor, apaginate_keyset, apaginate_with_history, paginate_keyset,
+)
+from .phones import normalize_phone
+
+BOOKING_VIEWS = ('upcoming', 'past')
+
+# Batch booking API: most bookings one request may change
+MAX_BATCH_SIZE = 500
+
+# Notification stream timings (seconds, except the client retry hint)
+STREAM_CHECK_INTERVAL = 5
+STREAM_MAX_AGE = 300
+STREAM_RETRY_MS = 5000
+
+DASHBOARD_WEEKS = 12
+SEARCH_PER_PAGE = 20
+
+# Lines produced per trip to the worker thread when a sync generator is
+# streamed over ASGI
+STREAM_BATCH_LINES = 500
+
+
+async def _abatches(lines, batch=STREAM_BATCH_LINES):
+    """Stream the sync iterator ``lines`` from the event loop, ``batch`` lines per hop."""
+    lines = iter(lines)
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, batch)))
+    try:
+        while chunk := await next_batch():
+            yield chunk
+    finally:
+        # A client that hangs up mid-export still closes the DB cursor
+        if hasattr(lines, 'close'):
+            await sync_to_async(lines.close)()
+
+
+def _streaming_response(request, lines, **kwargs):
+    """
+    A StreamingHttpResponse of the generator ``lines`` under WSGI or ASGI.
+
+    Under ASGI, Django 4.2 reads a sync iterator with sync_to_async(list),
+    building the whole body in memory before the first byte goes out. An
+    async iterator that pulls a batch at a time keeps it streaming.
+    """
+    if isinstance(request, ASGIRequest):
+        lines = _abatches(lines)
+    return StreamingHttpResponse(lines, **kwargs)
+
+
+async def _auser(request):
+    """The signed-in user, or None; Django 4.2 has no request.auser()."""
+    return await sync_to_async(
+        lambda: request.user if request.user.is_authenticated else None)()
+
+
+async def _paginate_bookings(request, bookings, history=None):
+    """
+    Split bookings into upcoming/past and return one keyset page.
+
+    ``history`` (archived bookings) is merged in by date and time. Deleted
+    bookings only show under past: their slot is free again.
+    """
+    view = request.GET.get('view', 'upcoming')
+    if view not in BOOKING_VIEWS:
+        view = 'upcoming'
+
+    now = timezone.localtime()
+    upcoming = Q(date__gt=now.date()) | Q(date=now.date(), time__gte=now.time())
+
+    if view == 'upcoming':
+        # Soonest first
+        bookings = bookings.filter(upcoming)
+        history = (history.filter(upcoming).exclude(reason='deleted')
+                   if history is not None else None)
+    else:
+        # Most recent first
+        bookings = bookings.exclude(upcoming)
+        history = history.exclude(upcoming) if history is not None else None
+
+    if history is None:
+        paginate = apaginate_keyset
+    else:
+        paginate = partial(apaginate_with_history, history=history)
+    try:
+        page = await paginate(
+            bookings,
+            descending=(view == 'past'),
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+        )
+    except InvalidCursor:
+        page = await paginate(bookings, descending=(view == 'past'))
 
+    return page, view
 
-@login_required
-def booking_list(request):
-    if request.user.is_staff:
-        bookings = request.user.bookings.all().order_by('-date', 'time')
+
+async def booking_list(request):
+    user = await _auser(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+
+    if user.is_staff:
+        bookings = user.bookings.select_related('client')
     else:
-        bookings = request.user.bookings_as_client.all().order_by(
-            '-date', 'time')
-    return render(request, 'trainer/booking_list.html',
-                  {'bookings': bookings})
+        bookings = user.bookings_as_client.select_related('client')
+
+    # Trainers can look bookings up by phone number: an exact match on the
+    # indexed E.164 column, whatever format the number was typed in
+    phone = request.GET.get('phone', '').strip() if user.is_staff else ''
+    filter_query = ''
+    if phone:
+        normalized = normalize_phone(phone)
+        if normalized:
+            bookings = bookings.filter(client_phone=normalized)
+            filter_query = urlencode({'phone': phone}) + '&'
+        else:
+            messages.error(request, f"'{phone}' isn't a valid Irish phone number.")
+            phone = ''
+
+    page, view = await _paginate_bookings(request, bookings)
+    feed = request.build_absolute_uri(
+        reverse('trainer:calendar_feed', args=[ical.make_token(user)]))
+    return render(request, 'trainer/booking_list.html', {
+        'bookings': page,
+        'page': page,
+        'view': view,
+        'phone': phone,
+        'filter_query': filter_query,
+        'calendar_url': feed,
+        'webcal_url': 'webcal' + feed[feed.index('://'):],
+    })
 
 
 @login_required
@@ -47,10 +192,13 @@ def booking_create(request):
             booking.client_name = booking.client.get_full_name() or booking.client.username
             booking.client_contact = form.cleaned_data.get('client_contact', '').strip()
 
-            booking.save()
-
-            messages.success(request, f"Booking created for {booking.client_name}!")
-            return redirect('trainer:booking_list')
+            if form.save_booking(booking):
+                sessions = len(form.occurrence_dates)
+                if sessions > 1:
+                    messages.success(request, f"{sessions} bookings created for {booking.client_name}!")
+                else:
+                    messages.success(request, f"Booking created for {booking.client_name}!")
+                return redirect('trainer:booking_list')
 
     else:
         form = BookingForm(user=request.user)
@@ -78,9 +226,12 @@ def booking_edit(request, pk):
         if form.is_valid():
             updated = form.save(commit=False)
             updated.client_contact = form.cleaned_data.get('client_contact', '').strip()
-            updated.save()
-            messages.success(request, 'Booking updated!')
-            return redirect('trainer:booking_list')
+            if form.save_booking(updated):
+                if form.applies_to_following:
+                    messages.success(request, 'Booking and following sessions updated!')
+                else:
+                    messages.success(request, 'Booking updated!')
+                return redirect('trainer:booking_list')
     else:
         form = BookingForm(instance=booking, user=request.user)
 
@@ -99,26 +250,149 @@ def booking_delete(request, pk):
 
     if request.method == 'POST':
         client_name = booking.client_name or "Client"
-        trainer = booking.trainer
-        
-        # If a client is cancelling, notify the trainer
-        if not request.user.is_staff and trainer:
-            Notification.objects.create(
-                recipient=trainer,
-                notification_type='booking_cancelled',
-                message=f"{client_name} has cancelled their booking",
-                client_name=client_name,
-                booking_date=booking.date,
-                booking_time=booking.time
-            )
-        
-        booking.delete()
-        messages.success(request, f'Booking for {client_name} cancelled.')
+        following = booking.series_id and request.POST.get('scope') == 'following'
+
+        with transaction.atomic():
+            if following:
+                # This and later occurrences, in one DELETE
+                occurrences = Booking.objects.filter(
+                    Q(trainer=request.user) | Q(client=request.user),
+                    series_id=booking.series_id,
+                    date__gte=booking.date,
+                )
+                pending = [digests.event(row) for row in occurrences.order_by('date', 'time')
+                           .values('id', 'client_name', 'date', 'time')]
+                archive.keep_deleted(occurrences)
+                _, deleted = occurrences.delete()
+                cancelled = deleted.get(Booking._meta.label, 0)
+            else:
+                cancelled = 1
+                pending = [digests.event(booking)]
+                archive.keep_deleted(Booking.objects.filter(pk=booking.pk))
+                booking.delete()
+
+            # Notify the other side through the job queue, committed together
+            if not request.user.is_staff and booking.trainer_id:
+                enqueue(
+                    'notification.create',
+                    recipient_id=booking.trainer_id,
+                    notification_type='booking_cancelled',
+                    bookings=pending,
+                )
+            elif request.user.is_staff:
+                _tell_client_cancelled(booking, cancelled)
+
+        if cancelled > 1:
+            messages.success(request, f'{cancelled} bookings for {client_name} cancelled.')
+        else:
+            messages.success(request, f'Booking for {client_name} cancelled.')
         return redirect('trainer:booking_list')
 
     return render(request, 'trainer/booking_confirm_delete.html', {'booking': booking})
 
 
+def _tell_client_cancelled(booking, cancelled):
+    """Queue an SMS and/or email telling the client their session is off."""
+    when = f"{booking.date:%a %b %d} at {booking.time:%H:%M}"
+    if cancelled > 1:
+        body = f"Your {cancelled} sessions from {when} have been cancelled by your trainer."
+    else:
+        body = f"Your session on {when} has been cancelled by your trainer."
+
+    if booking.client_contact:
+        enqueue('sms.send', to=booking.client_contact, body=body)
+    if booking.client_id and booking.client.email:
+        enqueue('email.send', to=booking.client.email, subject="Session cancelled", body=body)
+
+
+@login_required
+@require_POST
+def booking_batch(request):
+    """
+    JSON API: confirm, cancel or reschedule many bookings at once.
+
+    POST ``{"action": "confirm" | "cancel" | "reschedule", "ids": [...]}``;
+    a reschedule also takes ``"days"`` (a shift, may be negative) and/or
+    ``"time"`` ("HH:MM"). Only bookings the user is trainer or client of are
+    touched, and only those the action applies to (pending ones to confirm,
+    active ones to cancel or move); the rest come back as ``skipped``.
+    Clients may only cancel. The batch is one UPDATE in one transaction, so
+    a clash or a slot outside working hours changes nothing (409).
+    """
+    try:
+        payload = json.loads(request.body)
+        action = payload['action']
+        ids = sorted({int(pk) for pk in payload['ids']})
+        shift = datetime.timedelta(days=int(payload.get('days', 0)))
+        time = datetime.time.fromisoformat(payload['time']) if payload.get('time') else None
+    except (ValueError, KeyError, TypeError, AttributeError, OverflowError):
+        return JsonResponse({'error': 'Send JSON with an action and a list of ids.'}, status=400)
+
+    if action not in ('confirm', 'cancel', 'reschedule'):
+        return JsonResponse({'error': 'Action must be confirm, cancel or reschedule.'}, status=400)
+    if not ids or len(ids) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'Send between 1 and {MAX_BATCH_SIZE} ids.'}, status=400)
+    if action == 'reschedule' and not (shift or time):
+        return JsonResponse({'error': 'A reschedule needs days and/or time.'}, status=400)
+    if action != 'cancel' and not request.user.is_staff:
+        return JsonResponse({'error': 'Only trainers can confirm or reschedule bookings.'}, status=403)
+
+    # Permission filtering in SQL, as in booking_edit
+    bookings = Booking.objects.filter(
+        Q(trainer=request.user) | Q(client=request.user), pk__in=ids)
+    try:
+        with transaction.atomic():
+            if action == 'confirm':
+                # Pending -> confirmed can't clash with another active booking
+                rows = bulk.apply(bookings.filter(status='pending'), status='confirmed')
+            elif action == 'cancel':
+                rows = bulk.apply(
+                    bookings.filter(status__in=Booking.ACTIVE_STATUSES), status='cancelled')
+            else:
+                rows = bulk.reschedule(
+                    bookings.filter(status__in=Booking.ACTIVE_STATUSES), shift=shift, time=time)
+            _tell_other_side(request.user, action, rows, shift, time)
+    except bulk.OutsideHours as exc:
+        return JsonResponse(
+            {'error': 'Some new times are outside working hours.', 'ids': exc.ids}, status=409)
+    except IntegrityError:
+        return JsonResponse({'error': 'Some new times are already booked.'}, status=409)
+
+    updated = sorted(row['pk'] for row in rows)
+    return JsonResponse({
+        'action': action,
+        'updated': updated,
+        'skipped': sorted(set(ids) - set(updated)),
+    })
+
+
+def _tell_other_side(user, action, rows, shift, time):
+    """Notify trainers (one digest each) or queue messages to clients (one INSERT)."""
+    if not user.is_staff:
+        digests.record_bookings(
+            'booking_cancelled', rows, recipient=lambda row: row['trainer_id'])
+        return
+    if action == 'confirm':
+        return
+
+    def body(row):
+        when = f"{row['date']:%a %b %d} at {row['time']:%H:%M}"
+        if action == 'cancel':
+            return f"Your session on {when} has been cancelled by your trainer."
+        moved = datetime.datetime.combine(row['date'] + shift, time or row['time'])
+        return f"Your session on {when} has moved to {moved:%a %b %d} at {moved:%H:%M}."
+
+    subject = "Session cancelled" if action == 'cancel' else "Session moved"
+    enqueue_many('sms.send', [
+        {'to': row['client_contact'], 'body': body(row)}
+        for row in rows if row['client_contact']
+    ])
+    enqueue_many('email.send', [
+        {'to': row['client__email'], 'subject': subject, 'body': body(row)}
+        for row in rows if row['client__email']
+    ])
+
+
 class SignUpForm(UserCreationForm):
     ROLE_CHOICES = [
         ('client', 'I am a Client (booking sessions)'),
@@ -162,82 +436,288 @@ def signup(request):
 
     return render(request, 'signup.html', {'form': form})
 
+async def check_notifications(request):
+    # login_required, condition and cache_control can't wrap async views
+    # in Django 4.2, so their work is done inline
+    user = await _auser(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+
+    etag = quote_etag(await abadge_version(user.pk))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse(await acached_badge(user))
+    if request.method in ('GET', 'HEAD'):
+        response.headers.setdefault('ETag', etag)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of badge updates for the logged-in trainer.
+
+    Needs the ASGI application (theptapp/asgi.py). Under WSGI we answer 204,
+    which tells EventSource to stop reconnecting so base.html falls back to
+    polling check_notifications.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    user = await _auser(request)
+    if user is None or not user.is_staff:
+        return HttpResponse(status=403)
+
+    response = StreamingHttpResponse(
+        _badge_events(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def _badge_events(user):
+    loop = asyncio.get_running_loop()
+    subscription = events.subscribe(user.pk)
+    _, queue = subscription
+    try:
+        yield f'retry: {STREAM_RETRY_MS}\n\n'
+        version = await abadge_version(user.pk)
+        yield _sse(await acached_badge(user))
+
+        # Close long-lived streams now and then; EventSource reconnects
+        deadline = loop.time() + STREAM_MAX_AGE
+        while loop.time() < deadline:
+            try:
+                payload = await asyncio.wait_for(
+                    queue.get(), timeout=STREAM_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                # Changes made in other processes (e.g. the run_jobs worker)
+                # only show up as a new badge version in the shared cache
+                latest = await abadge_version(user.pk)
+                if latest == version:
+                    yield ': keep-alive\n\n'
+                    continue
+                payload = await acached_badge(user)
+            version = await abadge_version(user.pk)
+            yield _sse(payload)
+    finally:
+        events.unsubscribe(user.pk, subscription)
+
+
+def _sse(data):
+    return f'data: {json.dumps(data)}\n\n'
+
+
 @login_required
-def check_notifications(request):
-    if request.user.is_staff:
-        # Unread notifications only (don't include pending bookings so the badge clears)
-        unread_qs = Notification.objects.filter(
-            recipient=request.user,
-            is_read=False
-        )
+def booking_export(request):
+    """Stream the user's bookings as CSV (default) or ``?format=ndjson``."""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    lines, content_type = EXPORT_FORMATS[fmt]
 
-        unread_count = unread_qs.count()
-        latest = unread_qs.first()
-
-        if latest:
-            data = {
-                'count': unread_count,
-                'latest': {
-                    'client_name': latest.client_name,
-                    'date': latest.booking_date.strftime('%b %d') if latest.booking_date else '',
-                    'time': latest.booking_time.strftime('%I:%M %p') if latest.booking_time else '',
-                    'type': latest.notification_type,
-                }
-            }
-        else:
-            data = {'count': 0}
+    if request.user.is_staff:
+        bookings = request.user.bookings.all()
     else:
-        # For clients, still show pending bookings
-        pending = Booking.objects.filter(client=request.user, status='pending').order_by('-created_at')
-        count = pending.count()
-        latest = pending.first()
-        if latest:
-            data = {
-                'count': count,
-                'latest': {
-                    'client_name': latest.client_name or "Someone",
-                    'date': latest.date.strftime('%b %d'),
-                    'time': latest.time.strftime('%I:%M %p'),
-                }
-            }
-        else:
-            data = {'count': 0}
+        bookings = request.user.bookings_as_client.all()
+
+    response = _streaming_response(request, lines(bookings), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="bookings.{fmt}"'
+    return response
+
+
+@cache_control(no_store=True)
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint: superusers, or METRICS_TOKEN as a bearer token.
+
+    Not staff: every trainer who signs up is staff.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not (request.user.is_superuser or (
+            token and constant_time_compare(
+                request.headers.get('Authorization', ''), f'Bearer {token}'))):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@cache_control(private=True, max_age=300)
+def calendar_feed(request, token):
+    """
+    A trainer's or client's sessions as an iCalendar subscription.
+
+    No login: calendar apps can't, so the signed token in the URL is the
+    credential. Unchanged polls are answered 304 from one aggregate query.
+    """
+    try:
+        kind, user_id = ical.read_token(token)
+    except signing.BadSignature:
+        raise Http404("Unknown calendar feed.")
+
+    etag, last_modified = ical.state(kind, user_id)
+    etag, last_modified = quote_etag(etag), http_date(last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _streaming_response(
+            request, ical.render(kind, user_id), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="sessions.ics"'
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    return response
+
 
-    return JsonResponse(data)
+@login_required
+def availability_slots(request):
+    """
+    JSON list of free session start times.
+
+    ``?start=YYYY-MM-DD&end=YYYY-MM-DD`` (``end`` defaults to ``start``),
+    plus any number of ``trainer=<id>`` params; trainers default to
+    themselves. ``exclude=<booking id>`` frees that booking's own slot.
+    """
+    try:
+        start = datetime.date.fromisoformat(request.GET.get('start', ''))
+        end = datetime.date.fromisoformat(request.GET.get('end') or str(start))
+        trainer_ids = [int(i) for i in request.GET.getlist('trainer')]
+        exclude = int(request.GET['exclude']) if request.GET.get('exclude') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start, end, trainer or exclude.'}, status=400)
+
+    if (end - start).days >= MAX_SEARCH_DAYS:
+        return JsonResponse(
+            {'error': f'Search at most {MAX_SEARCH_DAYS} days at a time.'}, status=400)
+    if not trainer_ids:
+        trainer_ids = [request.user.pk]
+
+    slots = free_slots(trainer_ids, start, end, exclude_booking=exclude)
+    return JsonResponse({
+        'trainers': {
+            str(trainer_id): {
+                day.isoformat(): [t.strftime('%H:%M') for t in times]
+                for day, times in days.items()
+            }
+            for trainer_id, days in slots.items()
+        }
+    })
 
 
 @login_required
-def client_detail(request, user_id):
+@cache_control(private=True, max_age=30)
+def client_search(request):
+    """
+    JSON autocomplete for the booking form's client field.
+
+    ``?q=<terms>&limit=<n>``; queries shorter than MIN_QUERY_LENGTH return
+    no results rather than the start of the client list.
+    """
     if not request.user.is_staff:
+        return JsonResponse({'error': 'Only trainers can search clients.'}, status=403)
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid limit.'}, status=400)
+
+    matches = search_clients(request.GET.get('q', ''), limit=max(limit, 1))
+    return JsonResponse({
+        'results': [
+            {'id': user.pk, 'label': label(user), 'email': user.email}
+            for user in matches
+        ]
+    })
+
+
+async def client_detail(request, user_id):
+    user = await _auser(request)
+    if user is None:
+        return redirect_to_login(request.get_full_path())
+    if not user.is_staff:
         msg = "You don't have permission to view client profiles."
         messages.error(request, msg)
         return redirect('trainer:booking_list')
 
     # Clients only
-    client = get_object_or_404(User, id=user_id, is_staff=False)
-    bookings = client.bookings_as_client.all().order_by('-date', 'time')
+    client = await User.objects.filter(id=user_id, is_staff=False).afirst()
+    if client is None:
+        raise Http404("No client matches the given query.")
+    page, view = await _paginate_bookings(
+        request, client.bookings_as_client.select_related('client'), archive.history(client))
 
     return render(request, 'trainer/client_detail.html', {
         'client': client,
-        'bookings': bookings,
+        'bookings': page,
+        'page': page,
+        'view': view,
+    })
+
+
+@login_required
+def dashboard(request):
+    """Utilisation for the signed-in trainer, read from BookingStat only."""
+    if not request.user.is_staff:
+        messages.error(request, "Only trainers can view the dashboard.")
+        return redirect('trainer:booking_list')
+
+    summary = stats.dashboard(request.user, weeks=DASHBOARD_WEEKS)
+    weekdays = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+    return render(request, 'trainer/dashboard.html', {
+        'stats': summary,
+        'heatmap': zip(weekdays, summary['heatmap']),
+        'hours': range(24),
+    })
+
+
+@login_required
+def search_view(request):
+    """Ranked full-text search over the trainer's bookings or notifications."""
+    if not request.user.is_staff:
+        messages.error(request, "Only trainers can search.")
+        return redirect('trainer:booking_list')
+
+    q = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', 'bookings')
+    if kind == 'notifications':
+        results = search.search(Notification.objects.filter(recipient=request.user), q)
+    else:
+        kind = 'bookings'
+        results = search.search(request.user.bookings.select_related('client'), q)
+
+    page = Paginator(results, SEARCH_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'trainer/search.html', {
+        'q': q,
+        'kind': kind,
+        'page': page,
     })
 
 
 @login_required
 def notifications_list(request):
-    """Display all notifications for trainers"""
+    """One page of a trainer's notifications, newest first."""
     if not request.user.is_staff:
         messages.error(request, "Only trainers can view notifications.")
         return redirect('trainer:booking_list')
-    
-    # Get all notifications for this trainer
+
     notifications = Notification.objects.filter(recipient=request.user)
-    
-    # Mark all as read
-    notifications.filter(is_read=False).update(is_read=True)
-    
+    try:
+        page = paginate_keyset(
+            notifications,
+            descending=True,
+            after=request.GET.get('after'),
+            before=request.GET.get('before'),
+            keys=NOTIFICATION_KEYS,
+        )
+    except InvalidCursor:
+        page = paginate_keyset(notifications, descending=True, keys=NOTIFICATION_KEYS)
+
+    # Only what's on screen counts as read; the rows keep their unread
+    # highlight for this render
+    unread = [n.pk for n in page if not n.is_read]
+    if unread and Notification.objects.filter(pk__in=unread).update(
+            is_read=True, window_start=None):
+        badge_changed_on_commit(request.user.pk)
+
     return render(request, 'trainer/notifications.html', {
-        'notifications': notifications
+        'notifications': page,
+        'page': page,
     })
 
 